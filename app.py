@@ -1,12 +1,30 @@
 import streamlit as st
-import openai
 from dotenv import load_dotenv
 import os
-import requests
-from bs4 import BeautifulSoup
+import json
+import time
 import re
-
-import streamlit as st
+from collections import deque
+from contextlib import ExitStack
+
+from bulk import parse_url_list, parse_csv_urls, parse_sitemap, fetch_sitemap, run_bulk_evaluation
+from compare import MAX_COMPARE_VERSIONS, content_diff, run_comparison, score_deltas, version_label
+from prompts import PROMPT_VARIANTS, PROMPT_VARIANT
+from report import CATEGORIES, CATEGORY_KEYS, CATEGORY_NAMES, report_to_row
+from jobs import ACTIVE_STATUSES, BULK_JOB_WORKERS, get_job_queue
+from eval_cache import get_cache
+from chunking import count_tokens
+from ratelimit import get_limiter
+from site_audit import AUDIT_CHANGE_THRESHOLD
+from dedup import find_duplicates, render_site_report
+from crawler import MAX_CRAWL_PAGES, Crawler, run_crawl_evaluation
+from prechecks import format_facts, precheck_findings
+from tiers import FAST_MODEL, ESCALATE_MIN_SCORE, ESCALATE_MAX_SCORE, estimate_cost, tier_summary
+from fanout import FANOUT
+from history import get_history, recording, result_scores
+from export import EXPORT_MIME_TYPES, ExportWriter, available_formats, export_format, export_path, export_row, history_export_row
+from metrics import METRICS_PORT, get_metrics
+from evaluator import MODEL, STRUCTURED_OUTPUT, new_usage, extract_content_from_url, select_evaluation, stream_evaluation
 
 # Allow iframe embedding
 st.set_page_config(
@@ -27,466 +45,433 @@ if (window.top !== window.self) {
 # Load environment variables
 load_dotenv()
 
-# Set up OpenAI client
-client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
-# Define the evaluation prompt
-EVALUATION_PROMPT = """You are an expert SEO content evaluator.  
-Your task is to rigorously evaluate web content using the **entirety** of both:  
-- Google Helpful Content Guidelines  
-- Google Search Quality Evaluator Guidelines  
-
-GOOGLE HELPFUL CONTENT GUIDELINES (Use these exact criteria):
-
-Google's automated ranking systems are designed to present helpful, reliable information that's primarily created to benefit people, not to gain search engine rankings.
-
-Content and quality questions:
-• Does the content provide original information, reporting, research, or analysis?
-• Does the content provide a substantial, complete, or comprehensive description of the topic?
-• Does the content provide insightful analysis or interesting information that is beyond the obvious?
-• If the content draws on other sources, does it avoid simply copying or rewriting those sources, and instead provide substantial additional value and originality?
-• Does the main heading or page title provide a descriptive, helpful summary of the content?
-• Does the main heading or page title avoid exaggerating or being shocking in nature?
-• Is this the sort of page you'd want to bookmark, share with a friend, or recommend?
-• Would you expect to see this content in or referenced by a printed magazine, encyclopedia, or book?
-• Does the content provide substantial value when compared to other pages in search results?
-• Does the content have any spelling or stylistic issues?
-• Is the content produced well, or does it appear sloppy or hastily produced?
-• Is the content mass-produced by or outsourced to a large number of creators, or spread across a large network of sites, so that individual pages or sites don't get as much attention or care?
-
-Expertise questions:
-• Does the content present information in a way that makes you want to trust it, such as clear sourcing, evidence of the expertise involved, background about the author or the site that publishes it, such as through links to an author page or a site's About page?
-• If someone researched the site producing the content, would they come away with an impression that it is well-trusted or widely-recognized as an authority on its topic?
-• Is this content written or reviewed by an expert or enthusiast who demonstrably knows the topic well?
-• Does the content have any easily-verified factual errors?
-
-People-first content questions:
-• Do you have an existing or intended audience for your business or site that would find the content useful if they came directly to you?
-• Does your content clearly demonstrate first-hand expertise and a depth of knowledge (for example, expertise that comes from having actually used a product or service, or visiting a place)?
-• Does your site have a primary purpose or focus?
-• After reading your content, will someone leave feeling they've learned enough about a topic to help achieve their goal?
-• Will someone reading your content leave feeling like they've had a satisfying experience?
-
-E-E-A-T (Experience, Expertise, Authoritativeness, Trustworthiness):
-• Trust is most important - the others contribute to trust
-• Content doesn't necessarily have to demonstrate all aspects
-• Higher standards for YMYL (Your Money or Your Life) topics affecting health, financial stability, safety
-
-"Who, How, and Why" evaluation:
-GOOGLE SEARCH QUALITY RATER GUIDELINES (Use these exact criteria):
-
-Google works with ~16,000 external Search Quality Raters globally who evaluate search results using the complete 181-page official guidelines. Use these comprehensive evaluation criteria:
-
-## Page Quality (PQ) Rating Process - How well the page achieves its purpose:
-
-**Step 1: Determine the purpose of the page**
-Common helpful purposes include:
-• Share information about a topic
-• Share personal experience, perspective, or feelings
-• Share pictures, videos, or other media
-• Demonstrate personal talent or skill
-• Express opinion or point of view
-• Entertain
-• Offer products or services
-• Allow people to post questions for others to answer
-• Allow people to share files or download software
-
-**Step 2: Assess if page is harmful or has harmful purpose**
-Pages with harmful purpose or potential to cause harm = Lowest rating immediately
-• Harmful to Self or Other Individuals: encourages/depicts/incites physical, mental, emotional, financial harm
-• Harmful to Specified Groups: promotes/condones/incites hatred against groups based on age, caste, disability, ethnicity, gender identity, immigration status, nationality, race, religion, sex/gender, sexual orientation, veteran status, victims of violence, or other marginalized characteristics
-• Harmfully Misleading Information: misleads in ways that could cause harm (clearly inaccurate harmful info, claims contradicting expert consensus, unsubstantiated theories not grounded in evidence)
-
-**Step 3: Determine PQ rating (Lowest to Highest scale):**
-• **HIGHEST**: Serves beneficial purpose, achieves purpose very well. Very high quality MC with very high effort/originality/talent/skill. Very positive reputation. Very high E-E-A-T
-• **HIGH**: Serves beneficial purpose, achieves purpose well. High quality MC with high effort/originality/talent/skill. Positive reputation. High E-E-A-T  
-• **MEDIUM**: Has beneficial purpose and achieves it, but doesn't merit High rating OR has strong High characteristics but also mild Low characteristics
-• **LOW**: Intended to serve beneficial purpose but doesn't achieve it well due to lacking important dimension. Inadequate E-E-A-T, low quality MC, mildly negative reputation, unsatisfying website information
-• **LOWEST**: Untrustworthy, deceptive, harmful to people/society, or other highly undesirable characteristics
-
-**Main Content (MC) Quality Assessment:**
-High quality MC requires:
-• **Effort**: Significant human work to create satisfying content
-• **Originality**: Unique content not available elsewhere, or original source
-• **Talent/Skill**: Created with enough talent/skill for satisfying experience
-• **Accuracy**: Factually accurate, consistent with expert consensus for YMYL topics
-
-**E-E-A-T Assessment (Experience, Expertise, Authoritativeness, Trust):**
-• **Trust** is most important - untrustworthy pages have low E-E-A-T regardless of other factors
-• **Experience**: First-hand or life experience for the topic
-• **Expertise**: Necessary knowledge or skill for the topic  
-• **Authoritativeness**: Known as go-to source for the topic
-• Different combinations relevant for different topics and purposes
-
-**YMYL (Your Money or Your Life) Topics:**
-Topics that could significantly impact health, financial stability, safety, or society welfare:
-• YMYL Health or Safety: mental/physical/emotional health, any form of safety
-• YMYL Financial Security: ability to support self and family
-• YMYL Society: groups of people, public interest, trust in institutions
-• YMYL Other: topics that could hurt people or negatively impact welfare
-Higher E-E-A-T standards required for YMYL topics
-
-**Untrustworthy/Lowest Quality Characteristics:**
-• Inadequate information about website/creator for pages requiring trust
-• Deceptive purpose, information, or design
-• Deliberately obstructed/obscured main content
-• Suspected malicious behavior or scams
-• Scaled content abuse (many pages with little effort/originality)
-• Hacked, defaced, or spammed pages
-• Expired domain abuse
-• Site reputation abuse
-
-## Needs Met (NM) Rating - How useful result is for given search:
-
-**Step 1: Determine user intent from query**
-Query types and intents:
-• **Know queries**: Find information or explore topic
-• **Know Simple queries**: Specific answer (fact, diagram) that's correct, complete, fits in 1-2 sentences
-• **Do queries**: Accomplish goal or engage in activity (download, buy, obtain, be entertained, interact)
-• **Website queries**: Locate specific website or webpage
-• **Visit-in-Person queries**: Find nearby businesses, locations, services
-
-**Query Interpretations:**
-• **Dominant**: What most users mean
-• **Common**: What many/some users mean  
-• **Reasonable Minor**: Fewer users but still helpful interpretations
-• **Unlikely Minor**: Very few users would have this in mind
-• **No Chance**: So unlikely almost no user would have this in mind
-
-**Step 2: Determine NM rating:**
-• **FULLY MEETS**: Special category - query has specific, clear, unambiguous intent for specific result that all/almost all users want, and result completely satisfies. Most queries cannot have Fully Meets result
-• **HIGHLY MEETS**: Very helpful result for any dominant, common, or reasonable minor interpretation/intent. Very satisfying, good "fit", may be entertaining, representative of real people's opinions, easy to understand, in-depth/insightful, fresh/up-to-date
-• **MODERATELY MEETS**: Helpful result for any reasonable interpretation/intent. Fewer valuable attributes than Highly Meets but still "fits" query
-• **SLIGHTLY MEETS**: Less helpful result for reasonable interpretation/intent OR helpful result for unlikely minor interpretation. May be related without fully addressing need, or have outdated information
-• **FAILS TO MEET**: Completely fails to meet needs of all/almost all users. Off-topic, addresses no-chance interpretation, has incorrect/very outdated information, harmful/misleading content when user not seeking it
-
-**Key Rating Principles:**
-• Rate based on how helpful result is for users in the rating locale
-• Consider both block content and landing page as appropriate
-• Results should help people accomplish their tasks
-• Accuracy required for informational results, especially YMYL topics
-• Fresh content important for time-sensitive queries
-• Multiple result types may be helpful (different formats, perspectives, depths)
-• Ratings don't directly impact individual page rankings - used in aggregate to measure algorithm performance
-• Represent cultural standards of rating locale, not personal opinions
-
-GOOGLE SEARCH TESTING AND EVALUATION PROCESS (Use these exact criteria):
-
-Google's rigorous testing ensures Search provides the most useful and relevant information through continuous improvement.
-
-Google's evaluation process (2023 data):
-• 4,781 launches - Every proposed change reviewed by experienced engineers and data scientists
-• 16,871 live traffic experiments - Testing with real users before full launch
-• 719,326 search quality tests - External Search Quality Raters assess content quality
-• 124,942 side-by-side experiments - Raters compare different result sets
-
-Search Quality Rater evaluation criteria:
-• Raters assess how well website content fulfills a search request
-• Evaluate quality based on expertise, authoritativeness, and trustworthiness (E-A-T)
-• Ratings don't directly impact ranking but help benchmark quality
-• Use Search Quality Rater Guidelines for consistent evaluation approach
-• Focus on usefulness and reliability of content for particular queries
-
-Key evaluation principles:
-• Changes must demonstrably make things better for people
-• Content quality measured by expertise, authoritativeness, trustworthiness
-• Results automatically surface most useful and reliable content
-• Systems consider query words, page content, source expertise, user language/location
-• Scalable improvements address broader issues, not just individual queries
-• Manual intervention only for policy-violating or illegal content in limited situations
-
-GOOGLE SEO STARTER GUIDE (Use these exact criteria):
-
-SEO is about helping search engines understand your content and helping users find your site and make decisions about visiting.
-
-Key SEO fundamentals:
-• Make content that people find compelling and useful
-• Text is easy-to-read and well organized
-• Content is unique - don't copy others' content
-• Content is up-to-date
-• Content is helpful, reliable, and people-first
-• Expect readers' search terms and write naturally
-• Avoid distracting advertisements
-
-Site organization and structure:
-• Use descriptive URLs that include useful words for users
-• Group topically similar pages in directories
-• Reduce duplicate content - each piece accessible through one URL
-• Check if Google can see your page the same way users do
-
-Links and resources:
-• Link to relevant resources when needed
-• Write good link text (anchor text) that describes the linked page
-• Use nofollow for user-generated content links
-• Links help connect users and search engines to relevant content
-
-Title links and snippets:
-• Write good titles: unique to page, clear, concise, accurately describes content
-• Control snippets through actual page content
-• Use good meta descriptions: short, unique, includes most relevant points
-
-Images and media optimization:
-• Add high-quality images near relevant text
-• Use descriptive alt text explaining image relationship to content
-• Create high-quality video content with descriptive titles and descriptions
-
-Common SEO misconceptions to avoid:
-• Meta keywords don't matter
-• Keyword stuffing is against spam policies
-• Content length alone doesn't matter for ranking
-• E-E-A-T is not a direct ranking factor
-• PageRank is just one of many ranking signals
-
-GOOGLE PAGE EXPERIENCE GUIDELINES (Use these exact criteria):
-
-Google's core ranking systems reward content that provides a good page experience. Site owners should provide an overall great page experience across many aspects.
-
-Page experience self-assessment questions:
-• Do your pages have good Core Web Vitals?
-• Are your pages served in a secure fashion?
-• Does your content display well on mobile devices?
-• Does your content avoid using an excessive amount of ads that distract from or interfere with the main content?
-• Do your pages avoid using intrusive interstitials?
-• Is your page designed so visitors can easily distinguish the main content from other content on your page?
-
-Key page experience factors:
-• Core Web Vitals are used by ranking systems
-• HTTPS security is important
-• Mobile-friendly design and usability
-• Ad placement that doesn't interfere with main content
-• Avoiding intrusive pop-ups and interstitials
-• Clear distinction between main content and other page elements
-• Page experience evaluated on page-specific basis (with some site-wide assessments)
-• Google shows most relevant content even if page experience is sub-par, but great page experience contributes to success when there's lots of helpful content available
-
-GOOGLE SEARCH RANKING SYSTEMS (Use these exact criteria):
-
-Google's ranking systems sort through hundreds of billions of webpages to present the most relevant, useful results.
-
-Key Search signals:
-MEANING: Systems build language models to decipher query intent, recognize spelling mistakes, use sophisticated synonym systems
-RELEVANCE: Content contains same keywords as search query, keywords in headings/body text, aggregated interaction data assessment
-QUALITY: Systems prioritize content that demonstrates expertise, authoritativeness, and trustworthiness. Links from prominent websites indicate trustworthiness
-USABILITY: Page experience aspects like mobile-friendly content that loads quickly, accessibility considerations
-CONTEXT: Location, past search history, search settings determine relevance
-
-Quality factors Google uses:
-• Understanding if other prominent websites link or refer to the content
-• Aggregated feedback from Search quality evaluation process
-• Content demonstrates expertise, authoritativeness, and trustworthiness
-• Page experience aspects (mobile-friendly, fast loading)
-• Content accessibility
-• Information relevance and authoritativeness balance
-
-WHO: Is it self-evident who authored the content? Do pages carry bylines? Do bylines lead to author information and background?
-HOW: Is it clear how the content was produced? For reviews, are test methods explained? For AI content, is automation disclosed?
-WHY: Is content created primarily to help people rather than manipulate search rankings?
-
-Your evaluation MUST be structured into the following categories with scores (1–10), identified problems, actionable fixes, and priority levels. Do not summarize or skip criteria. Be exhaustive and professional.
-
----
-
-### 1. Content Quality (Score 1–10)
-Assess:  
-- Originality, depth, and comprehensiveness.  
-- Substantial value vs other search results.  
-- Clear, accurate, helpful information.  
-- First-hand experience demonstrated.  
-- Up-to-date information, freshness.  
-- Written for people-first (not search-first).  
-
-Report:  
-- Problems (specific weaknesses).  
-- Fixes (actionable improvements).
-
----
-
-### 2. Credibility (Score 1–10)
-Assess:  
-- E-E-A-T (Experience, Expertise, Authoritativeness, Trustworthiness).  
-- Author information (bio, credentials, expertise).  
-- External references, citations, links to reliable sources.  
-- Transparency (who created, why created).  
-- Conflict of interest disclosures (ads, affiliate bias).  
-
-Report:  
-- Problems.  
-- Fixes.
-
----
-
-### 3. Engagement (Score 1–10)
-Assess:  
-- Clarity and readability (grammar, style, audience match).  
-- Layout and formatting (headings, lists, scannability).  
-- Multimedia use (images, charts, video, infographics).  
-- Interactivity (FAQ, tools, calculators).  
-- Calls to action and internal linking.  
-- Stickiness (time-on-page, reducing pogo-sticking).  
-
-Report:  
-- Problems.  
-- Fixes.
-
----
-
-### 4. Originality (Score 1–10)
-Assess:  
-- Unique insights, perspectives, and brand voice.  
-- Avoidance of generic or AI-patterned text.  
-- Added value (case studies, examples, comparisons).  
-- Distinctiveness compared to competitor content.  
-
-Report:  
-- Problems.  
-- Fixes.
-
----
-
-### 5. Structure (Score 1–10)
-Assess:  
-- Logical flow and narrative.  
-- Clear hierarchy (H1, H2, H3).  
-- Use of tables, bullets, visuals to break text.  
-- Page navigation and internal linking.  
-- User intent alignment (answers anticipated questions).  
-
-Report:  
-- Problems.  
-- Fixes.
-
----
-
-### 6. Trust (Score 1–10)
-Assess:  
-- Accuracy of claims.  
-- Evidence of research or methodology.  
-- Purpose clarity (why the content exists).  
-- YMYL (Your Money or Your Life) considerations — stricter standards for health, finance, safety.  
-- Safety, reliability, honesty, lack of deception.  
-- User-first vs commercial intent balance.  
-
-Report:  
-- Problems.  
-- Fixes.
-
----
-
-### 7. Metadata (Score 1–10)
-Assess:  
-- Title relevance and optimization.  
-- Meta description clarity, accuracy, length.  
-- URL readability and keyword use.  
-- Schema markup / structured data.  
-- Alt text for images.  
-- Alignment with search intent.  
-
-Report:  
-- Problems.  
-- Fixes.
-
----
-
-### 8. Page Quality & Needs Met (Cross-Cutting, Score 1–10)
-Assess:  
-- Page Quality rating signals (as per Search Quality Guidelines).  
-- Lowest, Low, Medium, High, Very High characteristics.  
-- Needs Met rating (Fully Meets, Highly Meets, Moderately Meets, Slightly Meets, Fails to Meet).  
-- How well the content satisfies the likely intent of searchers.  
-
-Report:  
-- Problems.  
-- Fixes.
-
----
-
-### Priorities
-Classify each recommended fix as:  
-- **High**: Critical issues impacting rankings or user trust (e.g., lack of E-E-A-T, inaccurate info, thin content).  
-- **Medium**: Valuable improvements but less urgent (e.g., formatting, extra visuals, internal links).  
-- **Low**: Polishing, nice-to-have, minor enhancements.  
-
----
+# History view periods, in days (None for all time)
+HISTORY_PERIODS = {"Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90, "All time": None}
+
+# How often the results area polls a running job
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '1'))
+# Latest finished rows a running bulk job publishes; progress carries counts and these, never every row
+BULK_PROGRESS_ROWS = 20
+# Fields an exporting bulk job leaves out of the rows it keeps: they are in its export and report files
+BULK_EXPORTED_FIELDS = ('evaluation', 'report', 'timings')
+
+def format_usage(result):
+    """One-line summary of an evaluation's token usage"""
+    if result.get('cache_hit'):
+        return "⚡ Served from evaluation cache (no tokens used)"
+    usage = result.get('usage') or new_usage()
+    uncached = usage['prompt_tokens'] - usage['cached_tokens']
+    summary = (
+        f"Prompt tokens: {usage['prompt_tokens']} ({usage['cached_tokens']} cached, {uncached} uncached) · "
+        f"Completion tokens: {usage['completion_tokens']} · Requests: {usage['requests']}"
+    )
+    if 'latency_seconds' in result:
+        summary += f" · {result['latency_seconds']}s"
+    tiers = result.get('tiers')
+    cost = sum(entry['cost_usd'] or 0.0 for entry in tiers.values()) if tiers else estimate_cost(result.get('model', MODEL), usage)
+    if cost:
+        summary += f" · ~${cost:.4f}"
+    if result.get('category_seconds'):
+        slowest = max(result['category_seconds'], key=result['category_seconds'].get)
+        summary += f" · Fanned out; slowest: {CATEGORY_NAMES[slowest]} ({result['category_seconds'][slowest]}s)"
+    if result.get('tier') == 'fast':
+        summary += f" · Triaged by {FAST_MODEL}, not escalated"
+    elif result.get('tier') == 'premium':
+        summary += f" · Escalated to {MODEL} ({result['escalation'].replace('_', ' ')})"
+    return summary
+
+def evaluation_job(payload, progress):
+    """Job handler: evaluate one page, publishing the partial text as it streams"""
+    content_data = payload['content_data']
+    if payload.get('precheck_only') or payload.get('cascade') or payload.get('structured') or payload.get('fanout'):
+        run = select_evaluation(payload.get('precheck_only'), payload.get('cascade'), fanout=payload.get('fanout'))
+        result = run(content_data, payload.get('prompt_variant'), payload.get('structured'))
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        get_history().record(content_data, result)
+        return result
+    
+    result = {}
+    evaluation = ''
+    for piece in stream_evaluation(content_data, payload.get('prompt_variant'), result):
+        evaluation += piece
+        progress({'evaluation': evaluation})
+    progress({'evaluation': evaluation})
+    result['evaluation'] = evaluation
+    get_history().record(content_data, result)
+    return result
+
+def bulk_progress_row(row):
+    """Short summary of a finished bulk row for progress updates: status and scores, no report text"""
+    scores, overall = result_scores(row) if row['status'] == 'ok' else ({}, None)
+    return {
+        **{key: row.get(key) for key in ('url', 'title', 'status', 'audit', 'tier', 'cache_hit')},
+        'overall_score': overall,
+        **{f'{key}_score': scores.get(key) for key in CATEGORY_KEYS},
+        'error': row.get('error'),
+    }
+
+def slim_bulk_row(row):
+    """A bulk row without its report text; structured reports keep their score columns"""
+    return {
+        **{key: value for key, value in row.items() if key not in BULK_EXPORTED_FIELDS},
+        'scores': report_to_row(row['report']) if row.get('report') else {},
+    }
+
+def bulk_job(payload, progress):
+    """Job handler: evaluate a list of URLs or a crawled site, publishing counts and the latest rows as they finish"""
+    # Incremental re-audits reuse the stored result of pages that haven't materially changed
+    run = select_evaluation(payload.get('precheck_only'), payload.get('cascade'), payload.get('incremental'), payload.get('fanout'))
+    evaluate = recording(lambda content_data: run(content_data, payload.get('prompt_variant'), payload.get('structured')), 'bulk')
+    site_report = {}
+    # Near-duplicate detection fetches the whole crawl before evaluating, so each page knows its cluster
+    annotate = (lambda pages: site_report.update(find_duplicates(pages))) if payload.get('dedup') else None
+    crawl = payload.get('crawl')
+    if crawl:
+        # Pages go to evaluation as the crawler finds them
+        crawler = Crawler(crawl['start'], extract_content_from_url, max_pages=crawl['max_pages'], resume=crawl['resume'])
+        results = run_crawl_evaluation(crawler, evaluate, annotate_fn=annotate)
+    else:
+        results = run_bulk_evaluation(payload['urls'], extract_content_from_url, evaluate, annotate_fn=annotate)
+    # Rows are exported and their reports written out as they finish, so the
+    # result keeps only slim rows and no file has to be built from memory
+    export = payload.get('export')
+    rows = []
+    failed = 0
+    latest = deque(maxlen=BULK_PROGRESS_ROWS)
+    with ExitStack() as files:
+        if export:
+            exporter = files.enter_context(ExportWriter(export['path'], export['format']))
+            reports = files.enter_context(open(export['reports_path'], 'w', encoding='utf-8'))
+            structured = files.enter_context(open(export['structured_path'], 'w', encoding='utf-8'))
+        for row in results:
+            failed += row['status'] == 'error'
+            latest.append(bulk_progress_row(row))
+            if export:
+                exporter.write(export_row(row, 'bulk'))
+                if row['status'] == 'ok':
+                    reports.write(("\n\n---\n\n" if reports.tell() else "") + f"# {row['url']}\n\n{row['evaluation']}")
+                    if row.get('report'):
+                        structured.write(json.dumps({'url': row['url'], 'title': row['title'], **row['report']}) + "\n")
+                row = slim_bulk_row(row)
+            rows.append(row)
+            progress({'done': len(rows), 'failed': failed, 'latest': list(latest)})
+    return {'rows': rows, 'duplicates': site_report or None}
+
+def compare_job(payload, progress):
+    """Job handler: evaluate every version of a page at once, publishing each version as it finishes"""
+    run = select_evaluation(cascade=payload.get('cascade'), fanout=payload.get('fanout'))
+    evaluate = recording(lambda content_data: run(content_data, payload.get('prompt_variant'), payload.get('structured')), 'compare')
+    versions = run_comparison(payload['sources'], extract_content_from_url, evaluate, payload.get('title', ''),
+                              payload.get('url', ''), lambda finished: progress({'versions': finished}))
+    return {'versions': versions}
+
+def get_jobs():
+    """The shared job queue with this script's handlers registered"""
+    queue = get_job_queue()
+    queue.register('evaluation', evaluation_job)
+    queue.register('bulk', bulk_job, workers=BULK_JOB_WORKERS)
+    queue.register('compare', compare_job)
+    return queue
+
+def start_job(kind, payload, key):
+    """Submit a job and remember it in the session and the page URL (survives reloads)"""
+    job_id = get_jobs().submit(kind, payload)
+    st.session_state[key] = job_id
+    st.query_params[key] = job_id
+    return job_id
+
+def load_evaluation_job(job):
+    """Copy a finished evaluation job into the session for display"""
+    result = job['result'] or {}
+    st.session_state['evaluation'] = result.get('evaluation') or (job['progress'] or {}).get('evaluation', '')
+    st.session_state['evaluation_stats'] = result
+    st.session_state['content_data'] = job['payload']['content_data']
+    if result.get('report'):
+        st.session_state['report'] = result['report']
+    else:
+        st.session_state.pop('report', None)
+    if job['status'] == 'error':
+        # Keep partial output visible alongside the failure
+        st.session_state['evaluation_error'] = job['error']
+    else:
+        st.session_state.pop('evaluation_error', None)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_evaluation_job(job_id):
+    """Show a running evaluation; reruns the page once it finishes"""
+    job = get_jobs().get(job_id)
+    if job is None or job['status'] not in ACTIVE_STATUSES:
+        st.rerun()
+    partial = (job['progress'] or {}).get('evaluation')
+    if partial:
+        st.markdown(partial + " ▌")
+    elif job['status'] == 'queued':
+        st.markdown("⏳ *Queued, waiting for a free worker...*")
+    else:
+        st.markdown("🤖 *Evaluating content with AI...*")
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_bulk_job(job_id):
+    """Show bulk progress; reruns the page once the job finishes"""
+    job = get_jobs().get(job_id)
+    if job is None or job['status'] not in ACTIVE_STATUSES:
+        st.rerun()
+    progress = job['progress'] or {}
+    done = progress.get('done', 0)
+    crawl = job['payload'].get('crawl')
+    if crawl:
+        # The crawl's size is only known when it ends; max_pages bounds it
+        st.progress(min(done / crawl['max_pages'], 1.0), text=f"{done} pages crawled and evaluated (max {crawl['max_pages']})")
+    else:
+        total = len(job['payload']['urls'])
+        st.progress(done / total, text=f"{done} / {total} URLs done")
+    render_bulk_progress_rows(progress)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_compare_job(job_id):
+    """Show comparison progress; reruns the page once every version is evaluated"""
+    job = get_jobs().get(job_id)
+    if job is None or job['status'] not in ACTIVE_STATUSES:
+        st.rerun()
+    finished = (job['progress'] or {}).get('versions', [])
+    total = len(job['payload']['sources'])
+    st.progress(len(finished) / total, text=f"{len(finished)} / {total} versions evaluated (all run at once)")
+
+def render_prechecks(signals):
+    """Deterministic metadata and structure findings, shown as soon as a page is fetched"""
+    findings = precheck_findings(signals)
+    with st.expander(f"🩺 Pre-checks: {len(findings)} issue(s) found", expanded=bool(findings)):
+        st.caption(format_facts(signals))
+        for category, severity, message in findings:
+            icon = {'High': '🔴', 'Medium': '🟠', 'Low': '🟡'}[severity]
+            st.markdown(f"{icon} **{category.title()}:** {message}")
+        if not findings:
+            st.markdown("✅ No metadata or structure issues found.")
+
+def render_timings(content_data, result):
+    """Seconds spent in each stage of fetching and evaluating one page"""
+    rows = [{'step': 'fetch', 'stage': stage, 'seconds': seconds} for stage, seconds in (content_data.get('timings') or {}).items()]
+    rows += [{'step': 'evaluation', 'stage': stage, 'seconds': seconds} for stage, seconds in (result.get('timings') or {}).items()]
+    if rows:
+        with st.expander("⏱️ Timing breakdown"):
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+
+def render_report_scores(report):
+    """Per-category score table for a structured report"""
+    st.dataframe(
+        [{'category': name, 'score': report[key]['score']} for key, name in CATEGORIES],
+        use_container_width=True,
+        hide_index=True
+    )
 
-Rules:  
-- Always provide a numeric score (1–10) for each category.  
-- Always list specific Problems and Fixes under each category.  
-- Always include a Priorities section at the end.  
-- Do not summarize; use the full depth of the guidelines.  
-- Keep language professional, concise, and actionable.
+def render_bulk_progress_rows(progress):
+    """The latest finished rows a bulk job published"""
+    latest = progress.get('latest')
+    if latest:
+        st.caption(f"Latest {len(latest)} finished ({progress.get('failed', 0)} failed so far)")
+        st.dataframe(latest, use_container_width=True)
+
+def bulk_table_row(row, columns):
+    """Table columns for a bulk row; structured reports add one column per category score"""
+    scores = report_to_row(row['report']) if row.get('report') else row.get('scores', {})
+    return {**{key: row.get(key) for key in columns}, **scores}
+
+def export_download_button(path, file_name):
+    """Download button for an export file written to disk"""
+    fmt = export_format(path)
+    with open(path, 'rb') as f:
+        st.download_button(
+            label=f"💾 Download Results ({fmt.upper()})",
+            data=f,
+            file_name=f"{file_name}.{fmt}",
+            mime=EXPORT_MIME_TYPES[fmt],
+            use_container_width=True
+        )
 
-Content to evaluate:
-"""
+def exported_text(path):
+    """Contents of a report file a bulk job wrote, or '' once it has been pruned"""
+    if not os.path.exists(path):
+        return ''
+    with open(path, encoding='utf-8') as f:
+        return f.read()
 
-def extract_content_from_url(url):
-    """Extract content from a given URL"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Extract title
-        title = soup.find('title')
-        title_text = title.get_text().strip() if title else "No title found"
-        
-        # Extract meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        meta_desc_text = meta_desc.get('content', '').strip() if meta_desc else "No meta description found"
-        
-        # Extract main content
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        # Clean up excessive whitespace
-        text = re.sub(r'\n{3,}', '\n\n', text)
+def render_bulk_results():
+    """Show the current bulk job: live progress while it runs, then the per-URL results"""
+    columns = ['url', 'title', 'status', 'audit', 'duplicate_cluster', 'tier', 'escalation', 'cache_hit', 'prompt_tokens', 'cached_tokens', 'completion_tokens', 'cost_usd', 'fetch_seconds', 'eval_seconds', 'error']
+    
+    job_id = st.session_state.get('bulk_job')
+    job = get_jobs().get(job_id) if job_id else None
+    if job is None:
+        st.info("Provide a list of URLs, a CSV, a sitemap or a site to crawl and run the bulk evaluation.")
+        return
+    if job['status'] in ACTIVE_STATUSES:
+        poll_bulk_job(job_id)
+        return
+    export = job['payload'].get('export')
+    if job['status'] == 'error':
+        progress = job['progress'] or {}
+        st.error(f"❌ Bulk evaluation failed after {progress.get('done', 0)} URL(s): {job['error']}")
+        render_bulk_progress_rows(progress)
+        # The export holds every row finished before the failure
+        if export and os.path.exists(export['path']):
+            export_download_button(export['path'], "bulk_evaluation_results")
+        return
+    
+    results = job['result']['rows']
+    failed = sum(1 for row in results if row['status'] == 'error')
+    unchanged = sum(1 for row in results if row.get('audit') == 'unchanged')
+    st.success(f"✅ {len(results) - failed} evaluated, {failed} failed" + (f", {unchanged} unchanged since the last audit" if unchanged else ""))
+    st.dataframe([bulk_table_row(row, columns) for row in results], use_container_width=True)
+    
+    tiers = tier_summary(results)
+    if tiers:
+        st.markdown("**Cost and latency by tier**")
+        st.dataframe(tiers, use_container_width=True)
+    
+    if export and os.path.exists(export['path']):
+        st.caption("The table keeps no report text: full per-page results are in the export, and every report in the downloads below.")
+        export_download_button(export['path'], "bulk_evaluation_results")
+    
+    site_report = (job['result'] or {}).get('duplicates')
+    if site_report:
+        with st.expander(f"🧬 Near-duplicate clusters: {len(site_report['clusters'])} "
+                         f"({site_report['duplicated_pages']} of {site_report['pages']} pages)"):
+            st.markdown(render_site_report(site_report))
+    
+    evaluated = [row for row in results if row['status'] == 'ok']
+    if evaluated:
+        selected = st.selectbox("View report:", [row['url'] for row in evaluated])
+        row = next(row for row in evaluated if row['url'] == selected)
+        # Exporting jobs keep slim rows; their reports are read back from the history one at a time
+        entry = get_history().get(row['history_id']) if 'evaluation' not in row and row.get('history_id') else row
+        if entry and 'evaluation' in entry:
+            st.markdown(entry['evaluation'])
+        else:
+            st.caption("This report isn't in the history; it is in Download All Reports below.")
         
-        return {
-            'title': title_text,
-            'meta_description': meta_desc_text,
-            'content': text[:8000],  # Limit content length for API
-            'url': url
-        }
-    except Exception as e:
-        return {'error': str(e)}
-
-def evaluate_content(content_data):
-    """Send content to OpenAI for evaluation"""
-    try:
-        if 'error' in content_data:
-            return f"Error extracting content: {content_data['error']}"
+        if export:
+            combined = exported_text(export['reports_path'])
+        else:
+            combined = "\n\n---\n\n".join(f"# {row['url']}\n\n{row['evaluation']}" for row in evaluated)
+        if site_report:
+            combined = render_site_report(site_report) + "\n\n---\n\n" + combined
+        st.download_button(
+            label="💾 Download All Reports",
+            data=combined,
+            file_name="bulk_evaluation_reports.md",
+            mime="text/markdown",
+            use_container_width=True
+        )
         
-        content_to_evaluate = f"""
-URL: {content_data['url']}
-Title: {content_data['title']}
-Meta Description: {content_data['meta_description']}
+        if export:
+            structured = exported_text(export['structured_path'])
+        else:
+            structured = "".join(json.dumps({'url': row['url'], 'title': row['title'], **row['report']}) + "\n"
+                                 for row in evaluated if row.get('report'))
+        if structured:
+            st.download_button(
+                label="💾 Download Reports (JSONL)",
+                data=structured,
+                file_name="bulk_evaluation_reports.jsonl",
+                mime="application/jsonl",
+                use_container_width=True
+            )
 
-Content:
-{content_data['content']}
-"""
-        
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": EVALUATION_PROMPT},
-                {"role": "user", "content": content_to_evaluate}
-            ],
-            max_tokens=2000,
-            temperature=0.1
+def render_comparison():
+    """Show the current comparison job: per-category score deltas, content diffs and each version's report"""
+    job_id = st.session_state.get('compare_job')
+    job = get_jobs().get(job_id) if job_id else None
+    if job is None:
+        st.info(f"Paste 2 to {MAX_COMPARE_VERSIONS} drafts or URLs of a page to evaluate them side by side.")
+        return
+    if job['status'] in ACTIVE_STATUSES:
+        poll_compare_job(job_id)
+        return
+    if job['status'] == 'error':
+        st.error(f"❌ Comparison failed: {job['error']}")
+        return
+    
+    versions = job['result']['versions']
+    for version in versions:
+        if 'error' in version['result']:
+            st.error(f"❌ Version {version['label']}: {version['result']['error']}")
+    slowest = max(version['seconds'] for version in versions)
+    st.caption(f"{len(versions)} versions evaluated in {slowest}s (the slowest version; they ran concurrently) · "
+               f"{sum(1 for version in versions if version['result'].get('cache_hit'))} served from the evaluation cache")
+    
+    st.markdown("**Scores** (Δ is the change from version A)")
+    st.dataframe(score_deltas(versions), use_container_width=True, hide_index=True)
+    
+    other = st.selectbox("Diff version A against:", [version['label'] for version in versions[1:]])
+    first, second = versions[0], next(version for version in versions if version['label'] == other)
+    diff, added, removed = content_diff(first['content_data']['content'], second['content_data']['content'], ('A', other))
+    with st.expander(f"📝 Content diff A → {other}: {added} line(s) added, {removed} removed", expanded=bool(diff)):
+        if diff:
+            st.code(diff, language='diff')
+        else:
+            st.markdown("The content is identical.")
+    
+    for tab, version in zip(st.tabs([f"Version {version['label']}" for version in versions]), versions):
+        with tab:
+            result = version['result']
+            if 'error' in result:
+                st.error(f"❌ {result['error']}")
+                continue
+            st.caption(f"{version['content_data'].get('title', '')} · {format_usage(result)}")
+            if result.get('report'):
+                render_report_scores(result['report'])
+            st.markdown(result.get('evaluation', ''))
+
+def render_history(filters):
+    """Filtered list of past evaluations, a per-URL score trend and any stored report"""
+    history = get_history()
+    total = history.count(**filters)
+    if not total:
+        st.info("No evaluations match. Every evaluation you run is recorded here.")
+        return
+    rows = history.query(**filters)
+    st.caption(f"{total} evaluations match" + (f" · showing the newest {len(rows)}" if total > len(rows) else ""))
+    columns = ['url', 'title', 'overall_score', 'model', 'tier', 'source', 'cost_usd', 'latency_seconds']
+    st.dataframe(
+        [{'evaluated': time.strftime('%Y-%m-%d %H:%M', time.localtime(row['evaluated_at'])), **{key: row[key] for key in columns}}
+         for row in rows],
+        use_container_width=True
+    )
+    
+    url = st.selectbox("Score trend for:", list(dict.fromkeys(row['url'] for row in rows)))
+    trend = history.trend(url)
+    scored = [point for point in trend if point['overall_score'] is not None]
+    if len(scored) > 1:
+        st.line_chart(
+            [{'evaluated': time.strftime('%Y-%m-%d %H:%M', time.localtime(point['evaluated_at'])), 'Overall': point['overall_score'],
+              **{name: point[f'{key}_score'] for key, name in CATEGORIES}} for point in scored],
+            x='evaluated'
         )
-        
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error during evaluation: {str(e)}"
+    else:
+        st.caption("Evaluate this URL again to see its scores over time.")
+    
+    with st.expander(f"💾 Export {total} evaluations"):
+        fmt = st.selectbox("Format:", available_formats(), key='history_export_format')
+        if st.button("Prepare export", use_container_width=True):
+            path = export_path('history', fmt)
+            # Streamed from the database to the file, one row at a time
+            with ExportWriter(path, fmt) as writer:
+                for entry in history.export(**filters):
+                    writer.write(history_export_row(entry))
+            st.session_state['history_export'] = path
+        path = st.session_state.get('history_export')
+        if path and os.path.exists(path):
+            export_download_button(path, "evaluation_history")
+    
+    labels = {point['id']: f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(point['evaluated_at']))} · {point['model']}"
+              for point in reversed(trend)}
+    selected = st.selectbox("Report:", list(labels), format_func=labels.get)
+    entry = history.get(selected)
+    if entry:
+        if entry['report']:
+            render_report_scores(entry['report'])
+        st.markdown(entry['evaluation'])
 
 def main():
     st.set_page_config(
@@ -514,11 +499,45 @@ def main():
     st.title("📊 Content Evaluation Tool")
     st.markdown("**Evaluate web content against Google's Helpful Content & Search Quality Guidelines**")
     
+    # Pick up jobs linked from the page URL (reloads, shared links)
+    for key in ('job', 'bulk_job', 'compare_job'):
+        if key not in st.session_state and key in st.query_params:
+            st.session_state[key] = st.query_params[key]
+    
     # Sidebar for input method selection
     st.sidebar.header("Input Method")
     input_method = st.sidebar.radio(
         "Choose input method:",
-        ["URL", "Raw Content"]
+        ["URL", "Raw Content", "Compare", "Bulk", "History"]
+    )
+    
+    st.sidebar.header("Prompt")
+    prompt_variant = st.sidebar.selectbox(
+        "Prompt variant:",
+        PROMPT_VARIANTS,
+        index=PROMPT_VARIANTS.index(PROMPT_VARIANT),
+        help="'compact' keeps the 8-category rubric but drops most guideline prose (fewer input tokens); "
+             "'adaptive' sends only the guideline sections that apply to the page's type and topic"
+    )
+    structured = st.sidebar.checkbox(
+        "Structured output (JSON)",
+        value=STRUCTURED_OUTPUT,
+        help="Return typed per-category scores, problems and fixes instead of free-form markdown (not streamed)"
+    )
+    cascade = st.sidebar.checkbox(
+        "Cascade (fast triage first)",
+        help=f"Triage every page with {FAST_MODEL}; only scores {ESCALATE_MIN_SCORE}–{ESCALATE_MAX_SCORE} and YMYL "
+             f"topics get the full {MODEL} evaluation (not streamed)"
+    )
+    fanout = st.sidebar.checkbox(
+        "Fan out per category",
+        value=FANOUT,
+        help="Evaluate each of the 8 categories in its own concurrent request: the report arrives about as fast as "
+             "its slowest category, and no category gets cut short (not streamed)"
+    )
+    precheck_only = st.sidebar.checkbox(
+        "Pre-check only (no AI call)",
+        help="Report only the metadata and structure checks measured from the HTML; instant and free"
     )
     
     # Main content area
@@ -537,25 +556,129 @@ def main():
                     
                     if 'error' not in content_data:
                         st.success("✅ Content extracted successfully!")
+                        if content_data.get('truncated'):
+                            st.warning(f"⚠️ The page hit the download {content_data['truncated']} limit; "
+                                       "only the part read so far was evaluated.")
                         
                         # Show extracted content preview
                         with st.expander("📄 Content Preview"):
                             st.write(f"**Title:** {content_data['title']}")
                             st.write(f"**Meta Description:** {content_data['meta_description']}")
-                            st.write(f"**Content Length:** {len(content_data['content'])} characters")
+                            content_tokens = count_tokens(content_data['content'], MODEL)
+                            st.write(f"**Content Length:** {len(content_data['content'])} characters (~{content_tokens} tokens)")
                             st.text_area("Content Preview:", content_data['content'][:500] + "...", height=200)
                         
-                        # Evaluate content
-                        with st.spinner("🤖 Evaluating content with AI..."):
-                            evaluation = evaluate_content(content_data)
+                        if content_data.get('signals'):
+                            render_prechecks(content_data['signals'])
                         
-                        st.session_state['evaluation'] = evaluation
-                        st.session_state['content_data'] = content_data
+                        # Evaluation runs as a background job and streams into the results column
+                        payload = {'content_data': content_data, 'prompt_variant': prompt_variant, 'structured': structured,
+                                   'cascade': cascade, 'fanout': fanout, 'precheck_only': precheck_only}
+                        start_job('evaluation', payload, 'job')
                     else:
                         st.error(f"❌ Error extracting content: {content_data['error']}")
                 else:
                     st.warning("⚠️ Please enter a URL")
         
+        elif input_method == "Bulk":
+            bulk_source = st.radio("URL source:", ["URL list", "CSV upload", "Sitemap", "Crawl site"], horizontal=True)
+            urls = []
+            crawl = None
+            
+            try:
+                if bulk_source == "URL list":
+                    url_text = st.text_area("URLs (one per line):", height=250, placeholder="https://example.com/page-1\nhttps://example.com/page-2")
+                    urls = parse_url_list(url_text)
+                elif bulk_source == "CSV upload":
+                    csv_file = st.file_uploader("CSV file with a 'url' column:", type=["csv"])
+                    if csv_file is not None:
+                        urls = parse_csv_urls(csv_file.getvalue())
+                elif bulk_source == "Crawl site":
+                    crawl_start = st.text_input("Start URL or sitemap:", placeholder="https://example.com/")
+                    max_pages = st.number_input("Max pages:", min_value=1, max_value=10000, value=MAX_CRAWL_PAGES)
+                    resume = st.checkbox("Resume the last crawl of this URL", help="Continue from its checkpoint instead of starting over")
+                    if crawl_start.strip():
+                        crawl = {'start': crawl_start.strip(), 'max_pages': int(max_pages), 'resume': resume}
+                        st.caption("Follows links within the site, honoring robots.txt and its crawl delay")
+                else:
+                    sitemap_url = st.text_input("Sitemap URL:", placeholder="https://example.com/sitemap.xml")
+                    sitemap_file = st.file_uploader("...or upload sitemap.xml:", type=["xml"])
+                    if sitemap_file is not None:
+                        urls = parse_sitemap(sitemap_file.getvalue())
+                    elif sitemap_url:
+                        urls = parse_sitemap(fetch_sitemap(sitemap_url))
+            except Exception as e:
+                st.error(f"❌ Error reading URLs: {str(e)}")
+            
+            if urls:
+                st.caption(f"{len(urls)} unique URLs found")
+            
+            incremental = st.checkbox(
+                "Incremental re-audit",
+                help="Keep the previous evaluation of pages whose main content changed by less than "
+                     f"{AUDIT_CHANGE_THRESHOLD:.0%} since they were last evaluated"
+            )
+            
+            dedup = st.checkbox(
+                "Detect near-duplicates",
+                help="Fetch every page first, cluster near-duplicate content across the crawl and tell the "
+                     "evaluator about each page's cluster (flags scaled or mass-produced content)"
+            )
+            
+            export_fmt = st.selectbox(
+                "Export results as:",
+                available_formats(),
+                help="One row per page (URL, title, category scores, priorities, model, tokens and timings), "
+                     "written to disk as evaluations finish; opens directly in BI tools"
+            )
+            
+            if st.button("🚀 Run Bulk Evaluation", type="primary", use_container_width=True):
+                if urls or crawl:
+                    # Results and report text are written to these files as pages finish
+                    export = {'format': export_fmt, 'path': export_path('bulk', export_fmt),
+                              'reports_path': export_path('bulk-reports', 'md'), 'structured_path': export_path('bulk-reports', 'jsonl')}
+                    payload = {'urls': urls, 'crawl': crawl, 'prompt_variant': prompt_variant, 'structured': structured,
+                               'incremental': incremental, 'dedup': dedup, 'cascade': cascade, 'fanout': fanout,
+                               'precheck_only': precheck_only, 'export': export}
+                    start_job('bulk', payload, 'bulk_job')
+                else:
+                    st.warning("⚠️ Please provide at least one URL or a site to crawl")
+        
+        elif input_method == "Compare":
+            version_count = st.number_input("Versions:", min_value=2, max_value=MAX_COMPARE_VERSIONS, value=2)
+            sources = [
+                st.text_area(f"Version {version_label(index)}:", height=180, key=f"compare_{index}",
+                             placeholder="Paste a draft, or a URL to fetch")
+                for index in range(int(version_count))
+            ]
+            compare_title = st.text_input("Title of the drafts (optional):", placeholder="Article title")
+            compare_url = st.text_input("URL of the drafts (optional):", placeholder="https://example.com")
+            st.caption("Every version is evaluated at the same time; versions evaluated before come from the cache")
+            
+            if st.button("⚖️ Compare Versions", type="primary", use_container_width=True):
+                if precheck_only:
+                    st.warning("⚠️ Pre-check only doesn't score content; turn it off to compare versions")
+                elif all(source.strip() for source in sources):
+                    payload = {'sources': sources, 'title': compare_title, 'url': compare_url, 'prompt_variant': prompt_variant,
+                               'structured': structured, 'cascade': cascade, 'fanout': fanout}
+                    start_job('compare', payload, 'compare_job')
+                else:
+                    st.warning("⚠️ Please fill in every version")
+        
+        elif input_method == "History":
+            history_filters = {'search': st.text_input("URL contains:", placeholder="example.com/blog")}
+            period = st.selectbox("Evaluated in:", list(HISTORY_PERIODS), index=1)
+            if HISTORY_PERIODS[period]:
+                history_filters['since'] = time.time() - HISTORY_PERIODS[period] * 86400
+            history_filters['min_score'], history_filters['max_score'] = st.slider(
+                "Overall score:", min_value=1.0, max_value=10.0, value=(1.0, 10.0), step=0.5
+            )
+            if history_filters['min_score'] == 1.0 and history_filters['max_score'] == 10.0:
+                # Keep unscored entries (such as free-form reports without parseable scores)
+                history_filters.update(min_score=None, max_score=None)
+            model = st.selectbox("Model:", ["All"] + get_history().models())
+            history_filters['model'] = None if model == "All" else model
+        
         else:  # Raw Content
             raw_content = st.text_area(
                 "Paste content to evaluate:",
@@ -567,7 +690,9 @@ def main():
             content_url = st.text_input("Content URL (optional):", placeholder="https://example.com")
             
             if st.button("🔍 Analyze Content", type="primary", use_container_width=True):
-                if raw_content.strip():
+                if precheck_only:
+                    st.warning("⚠️ Pre-checks need a page's HTML; analyze a URL or turn off pre-check only")
+                elif raw_content.strip():
                     content_data = {
                         'title': content_title or "User-provided content",
                         'meta_description': "Not provided",
@@ -575,11 +700,9 @@ def main():
                         'url': content_url or "Not provided"
                     }
                     
-                    with st.spinner("🤖 Evaluating content with AI..."):
-                        evaluation = evaluate_content(content_data)
-                    
-                    st.session_state['evaluation'] = evaluation
-                    st.session_state['content_data'] = content_data
+                    payload = {'content_data': content_data, 'prompt_variant': prompt_variant, 'structured': structured,
+                               'cascade': cascade, 'fanout': fanout}
+                    start_job('evaluation', payload, 'job')
                 else:
                     st.warning("⚠️ Please paste some content to evaluate")
     
@@ -587,28 +710,60 @@ def main():
         st.markdown("### 📊 Analysis Results")
         st.markdown('<div class="results-container">', unsafe_allow_html=True)
         
-        if 'evaluation' in st.session_state:
-            st.markdown(st.session_state['evaluation'])
-            
-            # Download button for the evaluation
-            # Create filename from content title if available
-            if 'evaluation' in st.session_state and 'content_data' in st.session_state:
-                title = st.session_state.get('content_data', {}).get('title', 'Content Evaluation')
-                # Clean title for filename (remove special characters)
-                import re
-                clean_title = re.sub(r'[^\w\s-]', '', title)
-                clean_title = re.sub(r'[-\s]+', '_', clean_title)
-                filename = f"{clean_title}_evaluation_report.txt"
+        if input_method == "Bulk":
+            render_bulk_results()
+        elif input_method == "Compare":
+            render_comparison()
+        elif input_method == "History":
+            render_history(history_filters)
+        elif 'job' in st.session_state or 'evaluation' in st.session_state:
+            job = get_jobs().get(st.session_state['job']) if 'job' in st.session_state else None
+            if job and job['status'] in ACTIVE_STATUSES:
+                poll_evaluation_job(job['id'])
+            elif job or 'evaluation' in st.session_state:
+                if job:
+                    load_evaluation_job(job)
+                if 'report' in st.session_state:
+                    render_report_scores(st.session_state['report'])
+                st.markdown(st.session_state['evaluation'])
+                
+                if st.session_state.get('evaluation_stats'):
+                    st.caption(format_usage(st.session_state['evaluation_stats']))
+                    render_timings(st.session_state.get('content_data', {}), st.session_state['evaluation_stats'])
+                
+                # Keep partial output visible alongside the failure
+                if 'evaluation_error' in st.session_state:
+                    st.error(f"❌ {st.session_state['evaluation_error']}")
+                
+                # Download button for the evaluation
+                # Create filename from content title if available
+                if 'evaluation' in st.session_state and 'content_data' in st.session_state:
+                    title = st.session_state.get('content_data', {}).get('title', 'Content Evaluation')
+                    # Clean title for filename (remove special characters)
+                    clean_title = re.sub(r'[^\w\s-]', '', title)
+                    clean_title = re.sub(r'[-\s]+', '_', clean_title)
+                    filename = f"{clean_title}_evaluation_report.txt"
+                else:
+                    filename = "content_evaluation_report.txt"
+                
+                st.download_button(
+                    label="💾 Download Professional Report",
+                    data=st.session_state['evaluation'],
+                    file_name=filename,
+                    mime="text/plain",
+                    use_container_width=True
+                )
+                
+                if 'report' in st.session_state:
+                    st.download_button(
+                        label="💾 Download Report (JSON)",
+                        data=json.dumps({'url': st.session_state['content_data'].get('url'), **st.session_state['report']}, indent=2),
+                        file_name=filename.rsplit('.', 1)[0] + ".json",
+                        mime="application/json",
+                        use_container_width=True
+                    )
             else:
-                filename = "content_evaluation_report.txt"
-            
-            st.download_button(
-                label="💾 Download Professional Report",
-                data=st.session_state['evaluation'],
-                file_name=filename,
-                mime="text/plain",
-                use_container_width=True
-            )
+                st.warning("⚠️ This evaluation job no longer exists")
         else:
             st.markdown("""
             <div style='text-align: center; padding: 3rem; color: #666;'>
@@ -626,6 +781,51 @@ def main():
         st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.sidebar.header("Recent Jobs")
+    for job in get_jobs().recent():
+        started = time.strftime('%H:%M', time.localtime(job['created_at']))
+        if st.sidebar.button(f"{job['kind']} · {job['status']} · {started}", key=f"open_{job['id']}", use_container_width=True):
+            key = {'bulk': 'bulk_job', 'compare': 'compare_job'}.get(job['kind'], 'job')
+            st.session_state[key] = job['id']
+            st.query_params[key] = job['id']
+            st.rerun()
+    
+    # Evaluation cache stats (rendered last so they include this run)
+    st.sidebar.header("Evaluation Cache")
+    cache_stats = get_cache().stats()
+    cache_hits, cache_misses, cache_entries = st.sidebar.columns(3)
+    cache_hits.metric("Hits", cache_stats['hits'])
+    cache_misses.metric("Misses", cache_stats['misses'])
+    cache_entries.metric("Entries", cache_stats['entries'])
+    if st.sidebar.button("🗑️ Clear Cache", use_container_width=True):
+        get_cache().clear()
+        st.rerun()
+    
+    st.sidebar.header("API Scheduler")
+    limiter_stats = get_limiter().stats()
+    queued, in_flight, concurrency = st.sidebar.columns(3)
+    queued.metric("Queued", limiter_stats['queue_depth'])
+    in_flight.metric("In flight", limiter_stats['in_flight'])
+    concurrency.metric("Limit", limiter_stats['concurrency_limit'])
+    st.sidebar.caption(
+        f"Mean wait {limiter_stats['mean_wait_seconds']}s · max {limiter_stats['max_wait_seconds']}s · "
+        f"{limiter_stats['retries']} retries ({limiter_stats['rate_limited']} rate limited)"
+    )
+    
+    st.sidebar.header("Performance")
+    # Only whole operations here; the timing breakdown of each result has the stages
+    totals = [row for row in get_metrics().summary() if row['stage'] == 'total']
+    if totals:
+        st.sidebar.dataframe(
+            [{key: row[key] for key in ('kind', 'count', 'p50_seconds', 'p95_seconds', 'p99_seconds')} for row in totals],
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.sidebar.caption("No fetches or evaluations yet in this process")
+    if METRICS_PORT:
+        st.sidebar.caption(f"Prometheus metrics on port {METRICS_PORT} at /metrics")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,250 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bulk import FETCH_WORKERS, result_row
+from eval_cache import get_cache, make_cache_key
+from evaluator import (
+    MODEL, TEMPERATURE, STRUCTURED_OUTPUT, get_client, new_usage, completion_request, prepare_user_message,
+    read_cached_evaluation, read_evaluation_response
+)
+from history import get_history
+from metrics import get_metrics, timed, rounded
+from prompts import PROMPT_VARIANT, get_prompt, build_content_to_evaluate, build_messages
+from report import STRUCTURED_INSTRUCTIONS
+from storage import data_path
+from tiers import tier_entry
+
+# Batch jobs run within this window at a discount, for large audits that don't need answers now
+BATCH_COMPLETION_WINDOW = os.getenv('BATCH_COMPLETION_WINDOW', '24h')
+BATCH_POLL_SECONDS = float(os.getenv('BATCH_POLL_SECONDS', '60'))
+# Requests that fail inside a batch go into a new one, up to this many attempts in all
+BATCH_MAX_ATTEMPTS = int(os.getenv('BATCH_MAX_ATTEMPTS', '3'))
+# Input files are kept here, one per submitted batch
+BATCH_DIR = os.getenv('BATCH_DIR', data_path('batches'))
+# Provider limits per input file
+BATCH_MAX_REQUESTS = 50000
+BATCH_MAX_BYTES = 190 * 1024 * 1024
+# Batch tokens cost half the synchronous price
+BATCH_PRICE_FACTOR = 0.5
+BATCH_ENDPOINT = '/v1/chat/completions'
+FINAL_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+
+def prepare_request(content_data, prompt_variant=None, structured=None):
+    """Prepare a page for a batch: (job, None), or (None, result) when it needs no request.
+
+    Cached evaluations and errors give a final result; a job holds the
+    request body and what is needed to read its response. Content over the budget is map-reduced here, with
+    synchronous calls, so only the final request goes into the batch.
+    """
+    start = time.perf_counter()
+    timings = {}
+    result = {'model': MODEL, 'prompt_variant': prompt_variant or PROMPT_VARIANT, 'usage': new_usage(), 'cache_hit': False}
+    structured = STRUCTURED_OUTPUT if structured is None else structured
+    try:
+        with timed(timings, 'prompt'):
+            prompt = get_prompt(prompt_variant, content_data)
+            content_to_evaluate = build_content_to_evaluate(content_data)
+        with timed(timings, 'cache_lookup'):
+            cache_key = make_cache_key(content_to_evaluate, MODEL, TEMPERATURE, prompt, 'json' if structured else 'markdown')
+            cached = get_cache().get(cache_key)
+        if cached is not None:
+            read_cached_evaluation(result, cached, structured)
+            return None, finish_result(content_data, result, timings, start, 'cache_hit')
+        user_message = prepare_user_message(content_data, content_to_evaluate, prompt, result['usage'], timings)
+        if structured:
+            user_message += STRUCTURED_INSTRUCTIONS
+    except Exception as e:
+        return None, finish_result(content_data, result, timings, start, 'error', f"Error during evaluation: {str(e)}")
+    job = {
+        'content_data': content_data,
+        'result': result,
+        'timings': timings,
+        'start': start,
+        'structured': structured,
+        'cache_key': cache_key,
+        'prompt': prompt,
+        'body': completion_request(build_messages(user_message, prompt), structured=structured),
+        'attempts': 0,
+    }
+    return job, None
+
+
+def finish_result(content_data, result, timings, start, outcome, error=None):
+    """Close out a page's result: timings, tier accounting, metrics and history (its entry's id is 'history_id')"""
+    timings['total'] = time.perf_counter() - start
+    get_metrics().observe('evaluation', timings, outcome, content_data.get('url'), MODEL, result['usage'])
+    if error:
+        return {'error': error}
+    result['latency_seconds'] = round(timings['total'], 2)
+    result['timings'] = rounded(timings)
+    result['tiers'] = {'premium': tier_entry(MODEL, result['usage'], result['latency_seconds'])}
+    if result.get('batch_id') and result['tiers']['premium']['cost_usd'] is not None:
+        result['tiers']['premium']['cost_usd'] = round(result['tiers']['premium']['cost_usd'] * BATCH_PRICE_FACTOR, 6)
+    result['history_id'] = get_history().record(content_data, result, 'batch')
+    return result
+
+
+def split_batches(jobs):
+    """Batch input lines for {custom_id: job}, split to stay within the provider's per-file limits"""
+    lines, size = [], 0
+    for custom_id, job in jobs.items():
+        line = json.dumps({'custom_id': custom_id, 'method': 'POST', 'url': BATCH_ENDPOINT, 'body': job['body']}) + '\n'
+        if lines and (len(lines) >= BATCH_MAX_REQUESTS or size + len(line) > BATCH_MAX_BYTES):
+            yield lines
+            lines, size = [], 0
+        lines.append(line)
+        size += len(line)
+    if lines:
+        yield lines
+
+
+def submit_batch(lines, name):
+    """Write a batch input file, upload it and start the batch; returns the batch"""
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    path = os.path.join(BATCH_DIR, name + '.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    client = get_client()
+    with open(path, 'rb') as f:
+        upload = client.files.create(file=f, purpose='batch')
+    return client.batches.create(input_file_id=upload.id, endpoint=BATCH_ENDPOINT,
+                                 completion_window=BATCH_COMPLETION_WINDOW, metadata={'name': name})
+
+
+def wait_for_batches(batches, poll_seconds=BATCH_POLL_SECONDS, progress_fn=None):
+    """Poll until every batch has ended, yielding each one as it does"""
+    pending = {batch.id: batch for batch in batches}
+    while pending:
+        for batch_id in list(pending):
+            batch = get_client().batches.retrieve(batch_id)
+            if progress_fn:
+                progress_fn(batch)
+            if batch.status in FINAL_STATUSES:
+                del pending[batch_id]
+                yield batch
+        if pending:
+            time.sleep(poll_seconds)
+
+
+def batch_results(batch):
+    """{custom_id: (response body, None) or (None, error)} for the requests a finished batch ran"""
+    results = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in get_client().files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get('response') or {}
+            if response.get('status_code') == 200:
+                results[entry['custom_id']] = (response['body'], None)
+                continue
+            error = entry.get('error') or (response.get('body') or {}).get('error') or {}
+            results[entry['custom_id']] = (None, error.get('message') or f"HTTP {response.get('status_code')}")
+    return results
+
+
+def batch_error(batch):
+    """Why a batch ended without running a request"""
+    errors = getattr(batch.errors, 'data', None) or []
+    details = '; '.join(error.message for error in errors if error.message)
+    return f"Batch {batch.id} {batch.status}" + (f": {details}" if details else "")
+
+
+def run_batch_evaluation(sources, extract_fn, prompt_variant=None, structured=None, fetch_workers=FETCH_WORKERS,
+                         poll_seconds=BATCH_POLL_SECONDS, progress_fn=None):
+    """Evaluate sources through the provider's batch API, yielding a bulk result row per source.
+
+    Pages are fetched and prepared concurrently; fetch errors and cached
+    evaluations are yielded right away. The remaining requests are
+    written to batch input files, submitted and polled every
+    poll_seconds (progress_fn, if given, sees each batch on every poll).
+    Rows for a batch are yielded when it ends. Requests that failed, or
+    that a failed or expired batch never ran, are resubmitted up to
+    BATCH_MAX_ATTEMPTS attempts in all. Evaluations are cached and
+    recorded in the history like synchronous ones.
+    """
+    # openai is slow to import; only batch runs need its response types
+    from openai.types.chat import ChatCompletion
+
+    jobs = {}
+    fetched = {}
+
+    def fetch(source):
+        start = time.perf_counter()
+        try:
+            content_data = extract_fn(source)
+        except Exception as e:
+            content_data = {'error': str(e)}
+        fetch_seconds = time.perf_counter() - start
+        if 'error' in content_data:
+            return source, content_data, fetch_seconds, None, None
+        return (source, content_data, fetch_seconds, *prepare_request(content_data, prompt_variant, structured))
+
+    with ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='fetch') as pool:
+        for index, (source, content_data, fetch_seconds, job, result) in enumerate(pool.map(fetch, sources)):
+            if 'error' in content_data:
+                yield result_row(source, '', fetch_seconds, error=content_data['error'])
+            elif job is None:
+                yield result_row(source, content_data.get('title', ''), fetch_seconds, result.get('latency_seconds', 0.0),
+                                 result.get('error', ''), result, fetch_timings=content_data.get('timings'))
+            else:
+                jobs[f'page-{index}'] = job
+                fetched[f'page-{index}'] = (source, fetch_seconds)
+
+    def row(custom_id, result):
+        source, fetch_seconds = fetched[custom_id]
+        content_data = jobs[custom_id]['content_data']
+        return result_row(source, content_data.get('title', ''), fetch_seconds, result.get('latency_seconds', 0.0),
+                          result.get('error', ''), result, fetch_timings=content_data.get('timings'))
+
+    def fail(custom_id, error):
+        job = jobs[custom_id]
+        return row(custom_id, finish_result(job['content_data'], job['result'], job['timings'], job['start'], 'error', error))
+
+    pending = dict(jobs)
+    while pending:
+        submitted = []
+        waiting = {}
+        retry = {}
+        for number, lines in enumerate(split_batches(pending), 1):
+            custom_ids = [json.loads(line)['custom_id'] for line in lines]
+            for custom_id in custom_ids:
+                jobs[custom_id]['attempts'] += 1
+                jobs[custom_id]['submitted'] = time.perf_counter()
+            try:
+                batch = submit_batch(lines, f"{time.strftime('%Y%m%d-%H%M%S')}-{number}")
+            except Exception as e:
+                retry.update((custom_id, f"Error submitting batch: {str(e)}") for custom_id in custom_ids)
+                continue
+            submitted.append(batch)
+            waiting.update((custom_id, batch.id) for custom_id in custom_ids)
+
+        for batch in wait_for_batches(submitted, poll_seconds, progress_fn):
+            responses = batch_results(batch)
+            for custom_id in [custom_id for custom_id, batch_id in waiting.items() if batch_id == batch.id]:
+                job = jobs[custom_id]
+                job['timings']['batch'] = job['timings'].get('batch', 0.0) + time.perf_counter() - job['submitted']
+                body, error = responses.get(custom_id, (None, batch_error(batch)))
+                if body is None:
+                    retry[custom_id] = error
+                    continue
+                job['result']['batch_id'] = batch.id
+                try:
+                    read_evaluation_response(job['result'], ChatCompletion.model_validate(body), job['structured'],
+                                             job['cache_key'], job['prompt'])
+                except Exception as e:
+                    retry[custom_id] = f"Error during evaluation: {str(e)}"
+                    continue
+                yield row(custom_id, finish_result(job['content_data'], job['result'], job['timings'], job['start'], 'ok'))
+
+        pending = {}
+        for custom_id, error in retry.items():
+            if jobs[custom_id]['attempts'] < BATCH_MAX_ATTEMPTS:
+                pending[custom_id] = jobs[custom_id]
+            else:
+                yield fail(custom_id, error)
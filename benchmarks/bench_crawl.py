@@ -0,0 +1,192 @@
+"""Check the crawler against the fixture site and measure its throughput and politeness.
+
+Usage: python benchmarks/bench_crawl.py [--pages N] [--latency S] [--workers W] [--json results.json]
+
+1. Crawls benchmarks/fixtures/site from a local HTTP server and compares the
+   pages found with fixtures/site/expected.txt. Disallowed, duplicate and
+   non-HTML URLs must never be fetched.
+2. Stops a crawl part way and resumes it from its checkpoint. Every page must
+   be found once, and no page may be fetched twice.
+3. Crawls a generated site of --pages pages with --latency seconds per
+   response, under several per-host concurrency limits and a robots.txt
+   Crawl-delay. Reports pages/s and the peak concurrency the server saw.
+
+Stores go to a temporary DATA_DIR.
+"""
+import argparse
+import functools
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench_crawl_')
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'site')
+
+
+class SiteHandler(http.server.SimpleHTTPRequestHandler):
+    """Static files with {origin} filled into robots.txt and sitemaps, a fixed
+    latency per page, and a log of requests and peak concurrency"""
+
+    latency = 0.0
+    requests = []
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests.append((time.perf_counter(), self.path))
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            if self.path.endswith(('.txt', '.xml')):
+                path = self.translate_path(self.path)
+                if not os.path.isfile(path):
+                    return self.send_error(404)
+                with open(path, encoding='utf-8') as f:
+                    body = f.read().replace('{origin}', f"http://{self.headers['Host']}").encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain' if self.path.endswith('.txt') else 'application/xml')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            time.sleep(cls.latency)
+            super().do_GET()
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(directory, latency=0.0):
+    """Start a server with a fresh handler class (its own request log)"""
+    handler_class = type('Handler', (SiteHandler,), {'latency': latency, 'requests': [], 'active': 0, 'peak': 0,
+                                                     'lock': threading.Lock()})
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(handler_class, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler_class, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def write_generated_site(directory, pages, crawl_delay=0):
+    """A site where page i links to pages 2i+1 and 2i+2 (a binary tree)"""
+    for index in range(pages):
+        links = ''.join(f'<a href="/page-{child}.html">Page {child}</a> ' for child in (2 * index + 1, 2 * index + 2) if child < pages)
+        with open(os.path.join(directory, f'page-{index}.html'), 'w', encoding='utf-8') as f:
+            f.write(f"<html><head><title>Page {index}</title></head><body><main><h1>Page {index}</h1>"
+                    f"<p>Generated page number {index} for the crawl benchmark.</p>{links}</main></body></html>")
+    with open(os.path.join(directory, 'robots.txt'), 'w', encoding='utf-8') as f:
+        f.write("User-agent: *\n" + (f"Crawl-delay: {crawl_delay}\n" if crawl_delay else "Disallow:\n"))
+
+
+def path_of(url):
+    return urlsplit(url).path
+
+
+def check_fixture(Crawler, extract):
+    with open(os.path.join(FIXTURE_DIR, 'expected.txt'), encoding='utf-8') as f:
+        expected = set(f.read().split())
+    server, handler, base = serve(FIXTURE_DIR)
+    crawler = Crawler(base + '/', extract, workers=4)
+    found = {path_of(page['url']) for page in crawler.crawl()}
+    requested = [path for _, path in handler.requests]
+    server.shutdown()
+    forbidden = [path for path in requested if path.startswith(('/private/', '/files/', '/images/', '/login'))]
+    result = {
+        'check': 'fixture site',
+        'ok': found == expected and not forbidden,
+        'missing': sorted(expected - found),
+        'unexpected': sorted(found - expected),
+        'forbidden_requests': forbidden,
+        **crawler.stats,
+    }
+
+    # Resume: stop after a few pages, then continue from the checkpoint
+    server, handler, base = serve(FIXTURE_DIR)
+    first = {path_of(page['url']) for page in Crawler(base + '/', extract, max_pages=4, workers=2).crawl()}
+    second = {path_of(page['url']) for page in Crawler(base + '/', extract, workers=2, resume=True).crawl()}
+    pages_requested = [path for _, path in handler.requests if not path.endswith(('.txt', '.xml'))]
+    server.shutdown()
+    refetched = sorted({path for path in pages_requested if pages_requested.count(path) > 1})
+    resume = {
+        'check': 'resume from checkpoint',
+        'ok': first | second == expected and not first & second and not refetched,
+        'first_run': len(first),
+        'second_run': len(second),
+        'refetched': refetched,
+    }
+    return [result, resume]
+
+
+def measure(Crawler, extract, directory, pages, latency, workers, host_concurrency):
+    server, handler, base = serve(directory, latency)
+    start = time.perf_counter()
+    crawler = Crawler(base + '/page-0.html', extract, max_pages=pages, max_depth=pages, workers=workers,
+                      host_concurrency=host_concurrency)
+    crawled = sum(1 for _ in crawler.crawl())
+    seconds = time.perf_counter() - start
+    page_times = [at for at, path in handler.requests if path.endswith('.html')]
+    server.shutdown()
+    gaps = [b - a for a, b in zip(page_times, page_times[1:])]
+    return {
+        'workers': workers,
+        'host_concurrency': host_concurrency,
+        'pages': crawled,
+        'seconds': round(seconds, 2),
+        'pages_per_second': round(crawled / seconds, 1),
+        'peak_concurrency': handler.peak,
+        'min_gap_seconds': round(min(gaps), 2) if gaps else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=120)
+    parser.add_argument('--latency', type=float, default=0.05, help='server latency per page in seconds')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    from crawler import Crawler
+    from evaluator import extract_content_from_url
+
+    checks = check_fixture(Crawler, extract_content_from_url)
+    for check in checks:
+        print(f"{check['check']:<24} {'OK' if check['ok'] else 'FAILED'}  "
+              + ', '.join(f"{key}={value}" for key, value in check.items() if key not in ('check', 'ok')))
+
+    site_dir = tempfile.mkdtemp(prefix='bench_crawl_site_')
+    write_generated_site(site_dir, args.pages)
+    runs = [measure(Crawler, extract_content_from_url, site_dir, args.pages, args.latency, args.workers, limit)
+            for limit in (1, 2, 4, args.workers)]
+    delayed_dir = tempfile.mkdtemp(prefix='bench_crawl_delayed_')
+    write_generated_site(delayed_dir, 5, crawl_delay=1)
+    runs.append({**measure(Crawler, extract_content_from_url, delayed_dir, 5, args.latency, args.workers, args.workers),
+                 'host_concurrency': 'Crawl-delay: 1'})
+
+    print(f"\n{args.pages}-page generated site, {args.latency}s per response, {args.workers} workers\n")
+    header = f"{'per-host limit':<16}{'pages':>7}{'seconds':>9}{'pages/s':>9}{'peak conc.':>12}{'min gap s':>11}"
+    print(header)
+    print('-' * len(header))
+    for run in runs:
+        print(f"{str(run['host_concurrency']):<16}{run['pages']:>7}{run['seconds']:>9}{run['pages_per_second']:>9}"
+              f"{run['peak_concurrency']:>12}{str(run['min_gap_seconds']):>11}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'checks': checks, 'runs': runs}, f, indent=2)
+    return 0 if all(check['ok'] for check in checks) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Compare the main-content extraction engine against the original get_text() extractor.
+
+Usage: python benchmarks/bench_extraction.py [--repeat N] [--large-copies N] [--nesting-depth N] [--json results.json]
+
+Every page in benchmarks/corpus/*.html has a matching *.expected.txt listing its
+main-content lines. For each page we report parse+extract time and, within the
+8,000 character budget sent to the model:
+
+- useful ratio: share of extracted characters that belong to the main content
+- coverage: share of main-content lines that made it into the budget
+
+A synthetic large page (the blog article body repeated --large-copies times,
+surrounded by the same chrome) shows how both extractors scale with page size,
+and deeply nested ones (the article body inside --nesting-depth divs, with no
+<article> landmark; plain, and with sidebar-like class names that make every
+wrapper a boilerplate candidate) how they scale with nesting depth.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from extraction import PARSER, extract_main_content, parse_html  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+CONTENT_BUDGET = 8000
+
+
+def legacy_extract(html):
+    """The extractor as it shipped before the engine existed"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+    return re.sub(r'\n{3,}', '\n\n', text)
+
+
+def engine_extract(html):
+    return extract_main_content(parse_html(html))
+
+
+def _normalize(line):
+    return ' '.join(line.lstrip('#').split()).lower()
+
+
+def score_output(text, expected_lines):
+    """(useful ratio, coverage) of extracted text against the expected main content"""
+    text = text[:CONTENT_BUDGET]
+    expected = [_normalize(line) for line in expected_lines if line.strip()]
+    expected_blob = '\n'.join(expected)
+    output = [_normalize(line) for line in text.splitlines() if line.strip()]
+
+    total = sum(len(line) for line in output) or 1
+    useful = sum(len(line) for line in output if line in expected_blob)
+    output_blob = '\n'.join(output)
+    covered = sum(1 for line in expected if line in output_blob)
+    return useful / total, covered / (len(expected) or 1)
+
+
+def time_extract(fn, html, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = fn(html)
+        timings.append(time.perf_counter() - start)
+    return text, statistics.median(timings)
+
+
+def load_corpus():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.html'))):
+        expected_path = path[:-len('.html')] + '.expected.txt'
+        if not os.path.exists(expected_path):
+            continue
+        with open(path, 'rb') as f:
+            html = f.read()
+        with open(expected_path, encoding='utf-8') as f:
+            expected = f.read().splitlines()
+        pages.append((os.path.basename(path), html, expected))
+    return pages
+
+
+def make_large_page(html, copies):
+    """Blow a corpus page up by repeating its <article> body"""
+    start = html.index(b'<article')
+    body_start = html.index(b'>', start) + 1
+    end = html.index(b'</article>')
+    return html[:body_start] + html[body_start:end] * copies + html[end:]
+
+
+def make_nested_page(html, depth, opening=b'<div>'):
+    """Replace a corpus page's <article> with its body wrapped in depth nested divs, so the
+    extractor has to find the content by scoring and climbing instead of by landmark"""
+    start = html.index(b'<article')
+    body_start = html.index(b'>', start) + 1
+    end = html.index(b'</article>')
+    return html[:start] + opening * depth + html[body_start:end] + b'</div>' * depth + html[end + len(b'</article>'):]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='timing repetitions per page (median is reported)')
+    parser.add_argument('--large-copies', type=int, default=200, help='article repetitions in the synthetic large page (0 to skip)')
+    parser.add_argument('--nesting-depth', type=int, default=5000, help='div nesting of the synthetic deep page (0 to skip)')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    pages = load_corpus()
+    if args.large_copies:
+        for name, html, expected in pages:
+            if name == 'blog_article.html':
+                pages.append(('large_synthetic.html', make_large_page(html, args.large_copies), expected))
+                break
+    if args.nesting_depth:
+        for name, html, expected in pages:
+            if name == 'blog_article.html':
+                pages.append(('nested_synthetic.html', make_nested_page(html, args.nesting_depth), expected))
+                pages.append(('nested_boilerplate.html',
+                              make_nested_page(html, args.nesting_depth, b'<div class="with-sidebar">'), expected))
+                break
+
+    results = []
+    for name, html, expected in pages:
+        row = {'page': name, 'bytes': len(html)}
+        repeat = max(1, args.repeat // 10) if len(html) > 500000 or name.startswith('nested_') else args.repeat
+        for label, fn in (('legacy', legacy_extract), ('engine', engine_extract)):
+            text, seconds = time_extract(fn, html, repeat)
+            useful, coverage = score_output(text, expected)
+            row[f'{label}_ms'] = round(seconds * 1000, 2)
+            row[f'{label}_useful'] = round(useful, 3)
+            row[f'{label}_coverage'] = round(coverage, 3)
+        results.append(row)
+
+    print(f"engine parser backend: {PARSER}\n")
+    header = f"{'page':<24}{'legacy ms':>10}{'engine ms':>10}{'legacy useful':>15}{'engine useful':>15}{'legacy cov':>12}{'engine cov':>12}"
+    print(header)
+    print('-' * len(header))
+    for row in results:
+        print(f"{row['page']:<24}{row['legacy_ms']:>10}{row['engine_ms']:>10}"
+              f"{row['legacy_useful']:>15.1%}{row['engine_useful']:>15.1%}"
+              f"{row['legacy_coverage']:>12.1%}{row['engine_coverage']:>12.1%}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'parser': PARSER, 'pages': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
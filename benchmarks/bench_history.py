@@ -0,0 +1,117 @@
+"""Measure evaluation history writes and the queries behind the history view.
+
+Usage: python benchmarks/bench_history.py [--rows N] [--urls N] [--repeat N] [--json results.json]
+
+Fills a temporary history store with --rows evaluations spread over --urls
+URLs and a year of dates. The first 1000 go through EvaluationHistory.record
+to time real writes, and the rest are bulk-inserted. It then times each
+query the history view runs on a page load, with median and worst of --repeat
+runs.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench_history_')
+
+from history import SCORE_COLUMNS, EvaluationHistory  # noqa: E402
+from mock_openai import CANNED_MARKDOWN  # noqa: E402
+from storage import sqlite_connection  # noqa: E402
+
+RECORDED_ROWS = 1000
+
+
+def fake_result(rng):
+    return {
+        'model': rng.choice(['gpt-4', 'gpt-4o-mini']),
+        'prompt_variant': 'full',
+        'evaluation': CANNED_MARKDOWN,
+        'usage': {'requests': 1, 'prompt_tokens': rng.randint(3000, 9000), 'cached_tokens': 0, 'completion_tokens': 900},
+        'latency_seconds': round(rng.uniform(5, 40), 2),
+        'cache_hit': False,
+    }
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(times), 2), round(max(times), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--urls', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    history = EvaluationHistory()
+    urls = [f"https://site-{index % 40}.example.com/page-{index}" for index in range(args.urls)]
+
+    start = time.perf_counter()
+    for _ in range(min(RECORDED_ROWS, args.rows)):
+        url = rng.choice(urls)
+        history.record({'url': url, 'title': url.rsplit('/', 1)[1]}, fake_result(rng), 'bench')
+    record_ms = (time.perf_counter() - start) * 1000 / min(RECORDED_ROWS, args.rows)
+
+    # Bulk-insert the rest with random URLs, dates (over a year) and scores
+    now = time.time()
+    with sqlite_connection(history.path) as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(evaluations)") if row[1] != 'id']
+        rows = []
+        for _ in range(args.rows - RECORDED_ROWS):
+            scores = [rng.randint(2, 9) for _ in SCORE_COLUMNS]
+            values = {
+                'url': rng.choice(urls), 'title': 'Page', 'evaluated_at': now - rng.uniform(0, 365 * 86400),
+                'model': rng.choice(['gpt-4', 'gpt-4o-mini']), 'prompt_variant': 'full', 'prompt_version': None,
+                'tier': None, 'source': 'bench', 'audit': None, 'cache_hit': 0,
+                'overall_score': round(sum(scores) / len(scores), 1), **dict(zip(SCORE_COLUMNS, scores)),
+                'prompt_tokens': 5000, 'cached_tokens': 0, 'completion_tokens': 900, 'cost_usd': 0.2, 'latency_seconds': 20.0,
+            }
+            rows.append([values[column] for column in columns])
+        conn.executemany(
+            f"INSERT INTO evaluations ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+        )
+        conn.execute("INSERT INTO reports SELECT id, ?, NULL FROM evaluations WHERE id NOT IN (SELECT id FROM reports)",
+                     (CANNED_MARKDOWN,))
+
+    url = urls[7]
+    month = now - 30 * 86400
+    queries = {
+        'count (no filter)': lambda: history.count(),
+        'newest 500 (no filter)': lambda: history.query(),
+        'last 30 days': lambda: history.query(since=month),
+        'URL substring': lambda: history.query(search='site-3.example.com/page-1'),
+        'score 2-4, last 30 days': lambda: history.query(since=month, min_score=2, max_score=4),
+        'count, URL substring': lambda: history.count(search='page-1'),
+        'trend for one URL': lambda: history.trend(url),
+        'open one report': lambda: history.get(history.trend(url)[-1]['id']),
+        'model list': lambda: history.models(),
+    }
+    results = [{'query': name, **dict(zip(('median_ms', 'max_ms'), timed(fn, args.repeat)))} for name, fn in queries.items()]
+
+    print(f"{args.rows} evaluations over {args.urls} URLs; record() {record_ms:.2f} ms per evaluation\n")
+    header = f"{'query':<28}{'median ms':>11}{'max ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in results:
+        print(f"{row['query']:<28}{row['median_ms']:>11}{row['max_ms']:>9}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'record_ms': round(record_ms, 2), 'queries': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Measure how much an incremental re-audit saves when only part of a site changed.
+
+Usage: python benchmarks/bench_incremental.py [--pages N] [--changed-share P] [--latency S] [--json results.json]
+
+Serves --pages variants of the corpus pages from a local HTTP server and audits
+them against benchmarks/mock_openai.py. Every page then gets a trivial edit (a
+new "last updated" line). --changed-share of them also get a rewritten half.
+The second pass runs twice: as a full audit and as an incremental re-audit.
+The report shows API requests and wall time for each pass. Stores go to a
+temporary DATA_DIR.
+"""
+import argparse
+import functools
+import glob
+import http.server
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench_incremental_')
+
+from mock_openai import start_server  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+def write_site(directory, templates, pages, changed=(), edit=False):
+    """Write pages as page-N.html, optionally with trivial or material edits"""
+    for index in range(pages):
+        html = templates[index % len(templates)].replace('</title>', f' #{index}</title>', 1)
+        # Keep every page's main content distinct so the evaluation cache can't short-circuit
+        html = re.sub(r'(<p[^>]*>)', rf'\1Page {index}: ', html)
+        if edit:
+            html = html.replace('</p>', f' Last updated {time.strftime("%B %d")}.</p>', 1)
+        if index in changed:
+            paragraphs = re.findall(r'<p[^>]*>.*?</p>', html, re.S)
+            for paragraph in paragraphs[len(paragraphs) // 2:]:
+                html = html.replace(paragraph, f'<p>Rewritten section {random.random()} with new advice, examples and sources.</p>', 1)
+        path = os.path.join(directory, f'page-{index}.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        if edit:
+            # Last-Modified has one-second resolution; move it so revalidation sees the edit
+            os.utime(path, (time.time() + 10, time.time() + 10))
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve(directory):
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--changed-share', type=float, default=0.1, help='share of pages with a material rewrite')
+    parser.add_argument('--latency', type=float, default=0.3, help='mock API latency in seconds')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    mock, mock_state, base_url = start_server(latency=args.latency)
+    os.environ['OPENAI_BASE_URL'] = base_url
+    os.environ.setdefault('OPENAI_API_KEY', 'mock')
+    from bulk import run_bulk_evaluation
+    from eval_cache import get_cache
+    from evaluator import extract_content_from_url, run_evaluation, run_incremental_evaluation
+
+    templates = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            templates.append(f.read())
+    site_dir = tempfile.mkdtemp(prefix='bench_site_')
+    site, site_url = serve(site_dir)
+    urls = [f"{site_url}/page-{index}.html" for index in range(args.pages)]
+
+    def audit(label, evaluate):
+        requests_before = mock_state.stats['completed']
+        start = time.perf_counter()
+        rows = list(run_bulk_evaluation(urls, extract_content_from_url, evaluate))
+        return {
+            'pass': label,
+            'api_requests': mock_state.stats['completed'] - requests_before,
+            'seconds': round(time.perf_counter() - start, 2),
+            'unchanged': sum(1 for row in rows if row['audit'] == 'unchanged'),
+            'failed': sum(1 for row in rows if row['status'] == 'error'),
+        }
+
+    random.seed(0)
+    results = []
+    write_site(site_dir, templates, args.pages)
+    results.append(audit('baseline (incremental)', run_incremental_evaluation))
+
+    changed = set(random.sample(range(args.pages), round(args.pages * args.changed_share)))
+    write_site(site_dir, templates, args.pages, changed, edit=True)
+    # Clear the evaluation cache before each pass so only the site audit can save work
+    get_cache().clear()
+    results.append(audit('re-audit (full)', run_evaluation))
+    get_cache().clear()
+    results.append(audit('re-audit (incremental)', run_incremental_evaluation))
+
+    print(f"{args.pages} pages, {len(changed)} materially changed, all with a trivial edit\n")
+    header = f"{'pass':<26}{'API requests':>14}{'seconds':>9}{'unchanged':>11}{'failed':>8}"
+    print(header)
+    print('-' * len(header))
+    for row in results:
+        print(f"{row['pass']:<26}{row['api_requests']:>14}{row['seconds']:>9}{row['unchanged']:>11}{row['failed']:>8}")
+
+    site.shutdown()
+    mock.shutdown()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+"""Offline end-to-end benchmark of fetching, extraction and evaluation, for comparing commits.
+
+Usage: python benchmarks/bench_pipeline.py [--repeat N] [--bulk-pages N] [--latency S] [--output-tokens N]
+                                           [--tokens-per-second N] [--huge-copies N] [--nest-depth N]
+                                           [--no-memory] [--json results.json] [--compare baseline.json]
+
+Serves a corpus from a local HTTP server and points the evaluator at
+benchmarks/mock_openai.py, so nothing leaves the machine and runs repeat.
+The corpus is benchmarks/corpus/*.html and benchmarks/corpus/stress/*.html
+(a tiny page and a malformed one), plus three generated pages: a huge one
+(the blog article body repeated --huge-copies times), a deeply nested one
+(--nest-depth wrapper divs) and one with thousands of links.
+
+Phases:
+1. fetch: extract_content_from_url on every page, --repeat times.
+2. evaluate: run_evaluation (what evaluate_content wraps) on every page,
+   with the evaluation cache cleared first.
+3. stream: stream_evaluation on every page, for time to first token.
+4. bulk: run_bulk_evaluation over --bulk-pages distinct copies of the corpus.
+
+Each phase reports throughput, per-operation and per-stage latency
+percentiles and its peak Python heap. Peak memory is measured with
+tracemalloc in a separate pass, so tracing doesn't skew the timings.
+--json writes the results with the git commit and settings, and --compare
+prints the change from an earlier results file.
+"""
+import argparse
+import glob
+import http.server
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench_pipeline_')
+
+from mock_openai import start_server  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BENCH_DIR, 'corpus')
+STAGES_SHOWN = 6
+
+
+class CorpusHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the in-memory corpus; /copy/<n>/<page> is the page with a distinct title.
+
+    No validators are sent, so the response cache never turns a fetch into a 304.
+    """
+
+    pages = {}
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        html = self.pages.get(parts[-1])
+        if html is None:
+            self.send_error(404)
+            return
+        if len(parts) == 3 and parts[0] == 'copy':
+            html = html.replace(b'<title>', f'<title>Copy {parts[1]}: '.encode('utf-8'), 1)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(html)))
+        self.end_headers()
+        self.wfile.write(html)
+
+    def log_message(self, *args):
+        pass
+
+
+def generated_pages(blog_html, huge_copies, nest_depth):
+    """Pages too big or too regular to keep in the repository"""
+    start = blog_html.index(b'<article')
+    body_start = blog_html.index(b'>', start) + 1
+    end = blog_html.index(b'</article>')
+    huge = blog_html[:body_start] + blog_html[body_start:end] * huge_copies + blog_html[end:]
+
+    paragraph = b'<p>' + b'A sentence deep inside the layout wrappers of a page builder theme. ' * 20 + b'</p>'
+    nested = (b'<html><head><title>Deeply nested page</title></head><body>' + b'<div class="wrap">' * nest_depth
+              + b'<h1>Deeply nested page</h1>' + paragraph * 5 + b'</div>' * nest_depth + b'</body></html>')
+
+    links = b''.join(b'<li><a href="/archive/%d">Archive page %d</a></li>' % (index, index) for index in range(5000))
+    link_heavy = (b'<html><head><title>Archive index</title></head><body><nav><ul>' + links + b'</ul></nav>'
+                  b'<main><h1>Archive</h1>' + paragraph * 3 + b'</main></body></html>')
+    return {'huge.html': huge, 'deeply_nested.html': nested, 'link_heavy.html': link_heavy}
+
+
+def load_corpus(huge_copies, nest_depth):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.html')) + glob.glob(os.path.join(CORPUS_DIR, 'stress', '*.html'))):
+        with open(path, 'rb') as f:
+            pages[os.path.basename(path)] = f.read()
+    pages.update(generated_pages(pages['blog_article.html'], huge_copies, nest_depth))
+    return pages
+
+
+def percentiles(seconds):
+    """p50/p95/p99/max in milliseconds (nearest rank)"""
+    if not seconds:
+        return {}
+    ordered = sorted(seconds)
+    at = lambda q: ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+    return {key: round(value * 1000, 2) for key, value in (('p50', at(0.5)), ('p95', at(0.95)), ('p99', at(0.99)), ('max', ordered[-1]))}
+
+
+def stage_percentiles(timings):
+    """percentiles() per stage over a list of timings dicts"""
+    stages = {}
+    for entry in timings:
+        for stage, seconds in entry.items():
+            stages.setdefault(stage, []).append(seconds)
+    return {stage: percentiles(values) for stage, values in stages.items()}
+
+
+def summarize(operations, seconds, totals, timings, errors):
+    return {
+        'operations': operations,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'per_second': round(operations / seconds, 2) if seconds else None,
+        'latency_ms': percentiles(totals),
+        'stages_ms': stage_percentiles(timings),
+    }
+
+
+def run_fetch(evaluator, urls, repeat):
+    totals, timings, errors = [], [], 0
+    per_page = {url: [] for url in urls}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url in urls:
+            content_data = evaluator.extract_content_from_url(url)
+            if 'error' in content_data:
+                errors += 1
+                continue
+            totals.append(content_data['timings']['total'])
+            timings.append(content_data['timings'])
+            per_page[url].append(content_data['timings']['total'])
+    result = summarize(len(urls) * repeat, time.perf_counter() - start, totals, timings, errors)
+    result['pages'] = {url.rsplit('/', 1)[1]: percentiles(values) for url, values in per_page.items()}
+    return result
+
+
+def run_evaluate(evaluator, pages, repeat):
+    totals, timings, errors = [], [], 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        evaluator.get_cache().clear()
+        for content_data in pages:
+            result = evaluator.run_evaluation(content_data)
+            if 'error' in result:
+                errors += 1
+                continue
+            totals.append(result['timings']['total'])
+            timings.append(result['timings'])
+    return summarize(len(pages) * repeat, time.perf_counter() - start, totals, timings, errors)
+
+
+def run_stream(evaluator, pages, repeat):
+    totals, timings, errors = [], [], 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        evaluator.get_cache().clear()
+        for content_data in pages:
+            result = {}
+            try:
+                for _ in evaluator.stream_evaluation(content_data, None, result):
+                    pass
+            except Exception:
+                errors += 1
+                continue
+            totals.append(result['timings']['total'])
+            timings.append(result['timings'])
+    return summarize(len(pages) * repeat, time.perf_counter() - start, totals, timings, errors)
+
+
+def run_bulk(evaluator, urls):
+    from bulk import run_bulk_evaluation
+    evaluator.get_cache().clear()
+    start = time.perf_counter()
+    rows = list(run_bulk_evaluation(urls, evaluator.extract_content_from_url, evaluator.run_evaluation))
+    seconds = time.perf_counter() - start
+    ok = [row for row in rows if row['status'] == 'ok']
+    result = summarize(len(rows), seconds, [row['fetch_seconds'] + row['eval_seconds'] for row in ok],
+                       [{**{f'fetch.{stage}': value for stage, value in row['timings']['fetch'].items()},
+                         **{f'evaluation.{stage}': value for stage, value in row['timings']['evaluation'].items()}} for row in ok],
+                       len(rows) - len(ok))
+    result['fetch_ms'] = percentiles([row['fetch_seconds'] for row in ok])
+    result['eval_ms'] = percentiles([row['eval_seconds'] for row in ok])
+    return result
+
+
+def peak_memory_mb(fn):
+    """Peak traced Python heap while fn runs"""
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_phase(name, phase):
+    latency = phase['latency_ms']
+    memory = f", peak {phase['peak_memory_mb']} MB" if 'peak_memory_mb' in phase else ""
+    print(f"\n{name}: {phase['operations']} in {phase['seconds']}s ({phase['per_second']}/s), {phase['errors']} errors{memory}")
+    print(f"  {'stage':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    stages = sorted(((stage, values) for stage, values in phase['stages_ms'].items() if stage != 'total'),
+                    key=lambda item: -item[1]['p95'])
+    rows = [('total', latency)] + stages[:STAGES_SHOWN]
+    for stage, values in rows:
+        if values:
+            print(f"  {stage:<28}{values['p50']:>10}{values['p95']:>10}{values['p99']:>10}{values['max']:>10}")
+
+
+def print_comparison(baseline, results):
+    print(f"\nChange from {baseline.get('commit') or 'baseline'} to {results.get('commit') or 'this run'}:")
+    for name, phase in results['phases'].items():
+        before = baseline.get('phases', {}).get(name)
+        if not before:
+            continue
+        changes = []
+        for label, old, new in (
+            ('throughput', before.get('per_second'), phase.get('per_second')),
+            ('p50', before['latency_ms'].get('p50'), phase['latency_ms'].get('p50')),
+            ('p95', before['latency_ms'].get('p95'), phase['latency_ms'].get('p95')),
+            ('peak memory', before.get('peak_memory_mb'), phase.get('peak_memory_mb')),
+        ):
+            if old and new is not None:
+                changes.append(f"{label} {old} -> {new} ({(new - old) / old:+.0%})")
+        print(f"  {name:<9}" + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='passes over the corpus in the fetch, evaluate and stream phases')
+    parser.add_argument('--bulk-pages', type=int, default=40, help='distinct URLs in the bulk phase')
+    parser.add_argument('--latency', type=float, default=0.05, help='mock API seconds to first token')
+    parser.add_argument('--output-tokens', type=int, default=0, help='mock reply length in tokens (0 = canned length)')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='mock output pacing (0 = instant)')
+    parser.add_argument('--huge-copies', type=int, default=200, help='article repetitions in the generated huge page')
+    parser.add_argument('--nest-depth', type=int, default=1000, help='wrapper divs around the deeply nested page')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc passes')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='earlier --json results to compare against')
+    args = parser.parse_args()
+
+    _, _, api_base = start_server(latency=args.latency, output_tokens=args.output_tokens,
+                                  tokens_per_second=args.tokens_per_second)
+    os.environ.update(OPENAI_BASE_URL=api_base, OPENAI_API_KEY='bench')
+    import evaluator
+    from extraction import PARSER
+
+    CorpusHandler.pages = load_corpus(args.huge_copies, args.nest_depth)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), CorpusHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/{name}" for name in CorpusHandler.pages]
+    copies = [name for name in CorpusHandler.pages if name not in ('huge.html', 'deeply_nested.html')]
+    bulk_urls = [f"{base}/copy/{index}/{copies[index % len(copies)]}" for index in range(args.bulk_pages)]
+
+    # Warm up imports, the client and connection pools outside the measurements
+    evaluator.run_evaluation(evaluator.extract_content_from_url(urls[0]))
+    pages = [evaluator.extract_content_from_url(url) for url in urls]
+
+    phases = {
+        'fetch': (lambda: run_fetch(evaluator, urls, args.repeat), lambda: run_fetch(evaluator, urls, 1)),
+        'evaluate': (lambda: run_evaluate(evaluator, pages, args.repeat), lambda: run_evaluate(evaluator, pages, 1)),
+        'stream': (lambda: run_stream(evaluator, pages, args.repeat), lambda: run_stream(evaluator, pages, 1)),
+        'bulk': (lambda: run_bulk(evaluator, bulk_urls), lambda: run_bulk(evaluator, bulk_urls)),
+    }
+    results = {
+        'commit': git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'parser': PARSER,
+        'args': {key: value for key, value in vars(args).items() if key not in ('json', 'compare')},
+        'corpus_bytes': {name: len(html) for name, html in CorpusHandler.pages.items()},
+        'phases': {},
+    }
+    for name, (measure, traced) in phases.items():
+        results['phases'][name] = measure()
+        if not args.no_memory:
+            results['phases'][name]['peak_memory_mb'] = peak_memory_mb(traced)
+        print_phase(name, results['phases'][name])
+
+    print("\nfetch latency per page (ms):")
+    for page, values in results['phases']['fetch']['pages'].items():
+        print(f"  {page:<24}{results['corpus_bytes'][page]:>10} bytes  p50 {values.get('p50')}  max {values.get('max')}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print_comparison(json.load(f), results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(phase['errors'] for phase in results['phases'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Drive concurrent evaluations through the rate limiter against the mock API.
+
+Usage: python benchmarks/bench_ratelimit.py [--requests N] [--workers N] [--rpm N] [--tpm N]
+                                            [--latency S] [--rate-limit-rate P] [--error-rate P]
+                                            [--json results.json]
+
+Runs the same burst twice against benchmarks/mock_openai.py: once with plain
+client calls (no retries, no throttling) and once through
+evaluator.request_completion and its rate limiter. Reports successes,
+failures, wall time and the limiter's queue/wait metrics. Nothing leaves the
+machine.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai  # noqa: E402
+
+import evaluator  # noqa: E402
+import ratelimit  # noqa: E402
+from mock_openai import start_server  # noqa: E402
+
+MESSAGES = [
+    {'role': 'system', 'content': 'You are a content evaluator.'},
+    {'role': 'user', 'content': 'Evaluate: ' + 'a short page about houseplants. ' * 20},
+]
+MAX_TOKENS = 200
+
+
+def run_burst(call, requests, workers):
+    """(successes, failures, seconds) for requests calls on workers threads"""
+    def attempt(_):
+        try:
+            call()
+            return True
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(attempt, range(requests)))
+    return sum(outcomes), outcomes.count(False), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=60)
+    parser.add_argument('--workers', type=int, default=16, help='caller threads (the limiter may allow fewer in flight)')
+    parser.add_argument('--rpm', type=int, default=120, help='mock requests-per-minute budget')
+    parser.add_argument('--tpm', type=int, default=100000, help='mock tokens-per-minute budget')
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    for label in ('plain', 'limiter'):
+        # A fresh mock per run so both start with the full per-minute budget
+        server, state, base_url = start_server(
+            rpm=args.rpm, tpm=args.tpm, latency=args.latency,
+            rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate
+        )
+        os.environ['OPENAI_BASE_URL'] = base_url
+        os.environ.setdefault('OPENAI_API_KEY', 'mock')
+        if label == 'plain':
+            client = openai.OpenAI(max_retries=0)
+            call = lambda: client.chat.completions.create(model='gpt-4', messages=MESSAGES, max_tokens=MAX_TOKENS)
+            limiter_stats = None
+        else:
+            # Start from the conservative defaults; the mock's headers teach the real limits
+            ratelimit._default_limiter = ratelimit.RateLimiter()
+            call = lambda: evaluator.request_completion(MESSAGES, max_tokens=MAX_TOKENS)
+        ok, failed, seconds = run_burst(call, args.requests, args.workers)
+        if label == 'limiter':
+            limiter_stats = ratelimit.get_limiter().stats()
+        results[label] = {'ok': ok, 'failed': failed, 'seconds': round(seconds, 2), 'mock': dict(state.stats), 'limiter': limiter_stats}
+        server.shutdown()
+
+    print(f"{args.requests} requests, {args.workers} callers, mock {args.rpm} RPM / {args.tpm} TPM, "
+          f"{args.rate_limit_rate:.0%} injected 429s, {args.error_rate:.0%} injected 5xx\n")
+    header = f"{'mode':<9}{'ok':>5}{'failed':>8}{'seconds':>9}{'429s':>6}{'5xx':>5}{'peak conc':>11}"
+    print(header)
+    print('-' * len(header))
+    for label, row in results.items():
+        print(f"{label:<9}{row['ok']:>5}{row['failed']:>8}{row['seconds']:>9}{row['mock']['rate_limited']:>6}"
+              f"{row['mock']['server_errors']:>5}{row['mock']['peak_concurrency']:>11}")
+    print(f"\nlimiter: {json.dumps(results['limiter']['limiter'])}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
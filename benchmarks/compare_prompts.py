@@ -0,0 +1,139 @@
+"""Compare prompt variants on a fixed set of pages: latency, input tokens and score agreement.
+
+Usage: python benchmarks/compare_prompts.py [--variants full,compact,adaptive] [--urls urls.txt]
+                                           [--runs N] [--model gpt-4] [--json results.json] [--dry-run]
+
+Pages default to the saved HTML in benchmarks/corpus; --urls takes a file with
+one URL per line instead. Each page is evaluated with every variant straight
+through the API (the local evaluation cache is bypassed), --runs times each so
+provider-side prompt caching shows up in the cached-token column. Scores are
+compared against the first variant listed. The adaptive variant's page
+classification and guideline sections are listed per page; --dry-run prints
+only those and each variant's system prompt size, without calling the API.
+OPENAI_API_KEY / OPENAI_BASE_URL are read from the environment as usual.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai  # noqa: E402
+import requests  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+from chunking import count_tokens  # noqa: E402
+from extraction import extract_page  # noqa: E402
+from guidelines import classify_page, select_sections  # noqa: E402
+from prompts import get_prompt, build_content_to_evaluate, build_messages  # noqa: E402
+from report import parse_scores  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+def load_pages(urls_file):
+    if urls_file:
+        with open(urls_file, encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip()]
+        return [extract_page(requests.get(url, timeout=10).content, url) for url in urls]
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(extract_page(f.read(), 'https://example.com/' + os.path.basename(path)))
+    return pages
+
+
+def evaluate(client, model, prompt, content_data):
+    start = time.perf_counter()
+    response = client.chat.completions.create(
+        model=model,
+        messages=build_messages(build_content_to_evaluate(content_data), prompt),
+        max_tokens=2000,
+        temperature=0.1
+    )
+    usage = response.usage
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return {
+        'latency_seconds': time.perf_counter() - start,
+        'prompt_tokens': usage.prompt_tokens if usage else 0,
+        'cached_tokens': (getattr(details, 'cached_tokens', None) or 0) if usage else 0,
+        'scores': parse_scores(response.choices[0].message.content),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--variants', default='full,compact,adaptive', help='comma-separated prompt variants; the first is the reference')
+    parser.add_argument('--urls', help='file with one URL per line (default: the saved corpus)')
+    parser.add_argument('--runs', type=int, default=2, help='evaluations per page and variant')
+    parser.add_argument('--model', default='gpt-4')
+    parser.add_argument('--json', help='also write results to this file')
+    parser.add_argument('--dry-run', action='store_true', help='only classify pages and size the prompts')
+    args = parser.parse_args()
+
+    variants = args.variants.split(',')
+    pages = load_pages(args.urls)
+
+    header = f"{'page':<40}{'type':<15}{'ymyl':<10}" + ''.join(f"{variant + ' tok':>14}" for variant in variants)
+    print(header)
+    print('-' * len(header))
+    for content_data in pages:
+        page = classify_page(content_data)
+        tokens = ''.join(f"{count_tokens(get_prompt(variant, content_data), args.model):>14}" for variant in variants)
+        print(f"{content_data['url'].rsplit('/', 1)[-1][:39]:<40}{page['page_type']:<15}"
+              f"{','.join(page['ymyl_topics']) or '-':<10}{tokens}")
+        print(f"    sections: {', '.join(select_sections(page))}")
+    print()
+    if args.dry_run:
+        return
+
+    load_dotenv()
+    client = openai.OpenAI()
+
+    runs = {variant: [] for variant in variants}
+    for content_data in pages:
+        for variant in variants:
+            for _ in range(args.runs):
+                run = evaluate(client, args.model, get_prompt(variant, content_data), content_data)
+                run['url'] = content_data['url']
+                runs[variant].append(run)
+
+    reference = variants[0]
+    summary = {}
+    for variant in variants:
+        differences = []
+        for run, reference_run in zip(runs[variant], runs[reference]):
+            for category, score in reference_run['scores'].items():
+                if category in run['scores']:
+                    differences.append(abs(run['scores'][category] - score))
+        prompt_tokens = sum(run['prompt_tokens'] for run in runs[variant])
+        summary[variant] = {
+            'mean_latency_seconds': round(statistics.mean(run['latency_seconds'] for run in runs[variant]), 2),
+            'mean_prompt_tokens': round(prompt_tokens / len(runs[variant])),
+            'cached_token_share': round(sum(run['cached_tokens'] for run in runs[variant]) / (prompt_tokens or 1), 3),
+            'score_mae': round(statistics.mean(differences), 2) if differences else None,
+            'within_one_point': round(sum(d <= 1 for d in differences) / len(differences), 3) if differences else None,
+        }
+
+    print(f"{len(pages)} pages x {args.runs} runs, model {args.model}, agreement vs '{reference}'\n")
+    header = f"{'variant':<10}{'latency s':>11}{'prompt tok':>12}{'cached':>9}{'score MAE':>11}{'within ±1':>11}"
+    print(header)
+    print('-' * len(header))
+    for variant, row in summary.items():
+        mae = '-' if row['score_mae'] is None else row['score_mae']
+        within = '-' if row['within_one_point'] is None else f"{row['within_one_point']:.0%}"
+        print(f"{variant:<10}{row['mean_latency_seconds']:>11}{row['mean_prompt_tokens']:>12}"
+              f"{row['cached_token_share']:>9.0%}{mae:>11}{within:>11}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'model': args.model, 'summary': summary, 'runs': runs}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,367 @@
+"""Local OpenAI-compatible chat completions server with injectable latency, 429s and 5xx errors.
+
+Usage: python benchmarks/mock_openai.py [--port 8799] [--rpm N] [--tpm N] [--latency S]
+                                        [--rate-limit-rate P] [--error-rate P]
+                                        [--output-tokens N] [--tokens-per-second N]
+                                        [--batch-delay S] [--batch-fail-rate P]
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8799/v1 (any API key).
+Requests over the per-minute --rpm/--tpm budgets get a 429 with retry-after-ms
+and x-ratelimit-* headers, like the real API; --rate-limit-rate and
+--error-rate inject 429s and 500/503s at random on top. Replies are canned
+evaluations (markdown, streamed markdown, or a submit_evaluation tool call).
+--latency is the wait before the first token. --output-tokens pads markdown
+replies to about that many completion tokens, and --tokens-per-second paces
+the output after the first token, like a real model generating.
+submit_triage calls get a score derived from a hash of the page, so a
+cascade sees a stable mix of clear and uncertain pages, and pages that
+mention health or money come back flagged YMYL. submit_category calls
+(fan-out mode) get one category with a score derived from the same hash.
+The files and batches endpoints run uploaded batch input files: a batch
+completes --batch-delay seconds after it is created, and each of its
+requests fails with a 500 in the error file with probability --batch-fail-rate.
+GET /stats returns request counters and the peak number of concurrent requests.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report import CATEGORIES  # noqa: E402
+
+CANNED_REPORT = {
+    key: {'score': 5 + index % 4, 'problems': [f"{name} could be stronger."], 'fixes': [f"Improve {name.lower()}."]}
+    for index, (key, name) in enumerate(CATEGORIES)
+}
+CANNED_REPORT['priorities'] = [{'level': 'High', 'category': 'trust', 'fix': "Add author credentials."}]
+CANNED_MARKDOWN = '\n\n'.join(
+    f"### {number}. {name} (Score: {CANNED_REPORT[key]['score']}/10)\n\n"
+    f"**Problems:**\n- {CANNED_REPORT[key]['problems'][0]}\n\n**Fixes:**\n- {CANNED_REPORT[key]['fixes'][0]}"
+    for number, (key, name) in enumerate(CATEGORIES, 1)
+) + "\n\n### Priorities\n\n**High:**\n- Add author credentials."
+
+
+YMYL_WORDS = ('health', 'medical', 'doctor', 'loan', 'mortgage', 'invest', 'tax', 'insurance')
+
+
+def canned_evaluation(output_tokens=0):
+    """The canned markdown, padded to about output_tokens completion tokens (4 characters each)"""
+    text = CANNED_MARKDOWN
+    filler = "\n\nAdditional observation: the page would benefit from clearer sourcing and more first-hand detail."
+    while len(text) // 4 < output_tokens:
+        text += filler
+    return text
+
+
+def canned_triage(body):
+    """Deterministic triage of the request's page content"""
+    content = str(body['messages'][-1].get('content') or '')
+    score = int(hashlib.md5(content.encode('utf-8')).hexdigest(), 16) % 10 + 1
+    return {'score': score, 'ymyl': any(word in content.lower() for word in YMYL_WORDS), 'page_type': 'article',
+            'verdict': f"Mock triage score {score}.", 'problems': ["Mock problem."]}
+
+
+def canned_category(body):
+    """Deterministic evaluation of the one category a fan-out request asks for"""
+    content = ''.join(str(message.get('content') or '') for message in body['messages'][1:])
+    score = int(hashlib.md5(content.encode('utf-8')).hexdigest(), 16) % 10 + 1
+    return {'score': score, 'problems': ["Mock problem."],
+            'fixes': [{'fix': f"Mock fix for a score of {score}.", 'level': 'High' if score <= 4 else 'Medium'}]}
+
+
+class MockState:
+    """Per-minute budgets and counters shared by all request threads"""
+
+    def __init__(self, rpm, tpm, latency, rate_limit_rate, error_rate, output_tokens=0, tokens_per_second=0.0,
+                 batch_delay=0.0, batch_fail_rate=0.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.evaluation = canned_evaluation(output_tokens)
+        self.tokens_per_second = tokens_per_second
+        self.batch_delay = batch_delay
+        self.batch_fail_rate = batch_fail_rate
+        self.files = {}
+        self.batches = {}
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_requests = 0
+        self.window_tokens = 0
+        self.active = 0
+        self.stats = {'requests': 0, 'completed': 0, 'rate_limited': 0, 'server_errors': 0, 'peak_concurrency': 0,
+                      'batches': 0, 'batch_requests': 0, 'batch_failures': 0}
+
+    def admit(self, tokens):
+        """(status, headers) for a new request: 200, or the injected/over-budget error"""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 60:
+                self.window_start, self.window_requests, self.window_tokens = now, 0, 0
+            self.stats['requests'] += 1
+            reset = 60 - (now - self.window_start)
+            over_budget = self.window_requests + 1 > self.rpm or self.window_tokens + tokens > self.tpm
+            if over_budget or random.random() < self.rate_limit_rate:
+                self.stats['rate_limited'] += 1
+                retry_after = reset if over_budget else random.uniform(0.05, 0.5)
+                return 429, {**self._headers(reset), 'retry-after-ms': str(int(retry_after * 1000))}
+            if random.random() < self.error_rate:
+                self.stats['server_errors'] += 1
+                return random.choice((500, 503)), {}
+            self.window_requests += 1
+            self.window_tokens += tokens
+            self.active += 1
+            self.stats['peak_concurrency'] = max(self.stats['peak_concurrency'], self.active)
+            return 200, self._headers(reset)
+
+    def finish(self):
+        with self.lock:
+            self.active -= 1
+            self.stats['completed'] += 1
+
+    def _headers(self, reset):
+        return {
+            'x-ratelimit-limit-requests': str(self.rpm),
+            'x-ratelimit-remaining-requests': str(max(0, self.rpm - self.window_requests)),
+            'x-ratelimit-reset-requests': f"{reset:.3f}s",
+            'x-ratelimit-limit-tokens': str(self.tpm),
+            'x-ratelimit-remaining-tokens': str(max(0, self.tpm - self.window_tokens)),
+            'x-ratelimit-reset-tokens': f"{reset:.3f}s",
+        }
+
+
+def canned_completion(state, body):
+    """The reply message and usage for a chat completion request"""
+    prompt_tokens = sum(len(str(message.get('content') or '')) for message in body.get('messages', [])) // 4
+    if body.get('tools'):
+        name = body['tools'][0]['function']['name']
+        tool_replies = {'submit_triage': canned_triage, 'submit_category': canned_category}
+        arguments = json.dumps(tool_replies[name](body) if name in tool_replies else CANNED_REPORT)
+        call = {'id': 'call_mock', 'type': 'function', 'function': {'name': name, 'arguments': arguments}}
+        message = {'role': 'assistant', 'content': None, 'tool_calls': [call]}
+        completion_tokens = len(arguments) // 4
+    else:
+        message = {'role': 'assistant', 'content': state.evaluation}
+        completion_tokens = len(state.evaluation) // 4
+    usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+             'total_tokens': prompt_tokens + completion_tokens,
+             'prompt_tokens_details': {'cached_tokens': 0}}
+    return message, usage
+
+
+def completion_body(model, message, usage):
+    return {
+        'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+        'choices': [{'index': 0, 'message': message, 'finish_reason': 'stop'}], 'usage': usage,
+    }
+
+
+def add_file(state, content, filename, purpose):
+    """Store an uploaded or generated file; returns its file object"""
+    file = {'id': f'file-{uuid.uuid4().hex[:12]}', 'object': 'file', 'bytes': len(content), 'created_at': int(time.time()),
+            'filename': filename, 'purpose': purpose, 'status': 'processed'}
+    with state.lock:
+        state.files[file['id']] = (file, content)
+    return file
+
+
+def run_batch(state, batch):
+    """Answer every request in a batch's input file, after the configured delay"""
+    with state.lock:
+        _, content = state.files[batch['input_file_id']]
+        batch.update(status='in_progress', in_progress_at=int(time.time()))
+    time.sleep(state.batch_delay)
+    outputs, errors = [], []
+    for line in content.decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        entry = {'id': f'batch_req_{uuid.uuid4().hex[:12]}', 'custom_id': request['custom_id']}
+        if random.random() < state.batch_fail_rate:
+            error = {'error': {'message': 'mock 500', 'type': 'server_error'}}
+            errors.append({**entry, 'response': {'status_code': 500, 'request_id': entry['id'], 'body': error}, 'error': None})
+            continue
+        message, usage = canned_completion(state, request['body'])
+        body = completion_body(request['body'].get('model', 'mock'), message, usage)
+        outputs.append({**entry, 'response': {'status_code': 200, 'request_id': entry['id'], 'body': body}, 'error': None})
+    files = {}
+    for key, entries in (('output_file_id', outputs), ('error_file_id', errors)):
+        if entries:
+            data = ''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8')
+            files[key] = add_file(state, data, f"{batch['id']}_{key.split('_')[0]}.jsonl", 'batch_output')['id']
+    with state.lock:
+        state.stats['batch_requests'] += len(outputs) + len(errors)
+        state.stats['batch_failures'] += len(errors)
+        batch.update(status='completed', completed_at=int(time.time()), **files,
+                     request_counts={'total': len(outputs) + len(errors), 'completed': len(outputs), 'failed': len(errors)})
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = ['', ''] + self.path.split('?', 1)[0].rstrip('/').split('/')
+            if parts[-1] == 'stats':
+                with state.lock:
+                    self._send_json(200, dict(state.stats))
+            elif parts[-2] == 'batches' and parts[-1] in state.batches:
+                with state.lock:
+                    self._send_json(200, dict(state.batches[parts[-1]]))
+            elif parts[-1] == 'content' and parts[-2] in state.files:
+                content = state.files[parts[-2]][1]
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+            else:
+                self._send_json(404, {'error': {'message': 'not found'}})
+
+        def do_POST(self):
+            data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            path = self.path.split('?', 1)[0].rstrip('/')
+            if path.endswith('/files'):
+                self._upload(data)
+                return
+            body = json.loads(data or b'{}')
+            if path.endswith('/batches'):
+                self._create_batch(body)
+                return
+            if not path.endswith('/chat/completions'):
+                self._send_json(404, {'error': {'message': 'not found'}})
+                return
+
+            prompt_tokens = sum(len(str(message.get('content') or '')) for message in body.get('messages', [])) // 4
+            status, headers = state.admit(prompt_tokens + body.get('max_tokens', 0))
+            if status != 200:
+                error_type = 'rate_limit_exceeded' if status == 429 else 'server_error'
+                self._send_json(status, {'error': {'message': f'mock {status}', 'type': error_type, 'code': error_type}}, headers)
+                return
+
+            try:
+                time.sleep(max(0.0, random.gauss(state.latency, state.latency / 4)))
+                self._complete(body, headers)
+            finally:
+                state.finish()
+
+        def _upload(self, data):
+            # multipart/form-data with 'file' and 'purpose' fields, as the SDK sends it
+            header = b'Content-Type: ' + self.headers.get('Content-Type', '').encode('latin-1') + b'\r\n\r\n'
+            fields = {}
+            for part in BytesParser(policy=HTTP).parsebytes(header + data).iter_parts():
+                fields[part.get_param('name', header='content-disposition')] = (part.get_filename(), part.get_payload(decode=True))
+            filename, content = fields.get('file', ('upload.jsonl', b''))
+            purpose = fields.get('purpose', (None, b'batch'))[1].decode('utf-8')
+            self._send_json(200, add_file(state, content, filename or 'upload.jsonl', purpose))
+
+        def _create_batch(self, body):
+            if body.get('input_file_id') not in state.files:
+                self._send_json(404, {'error': {'message': 'input file not found'}})
+                return
+            batch = {
+                'id': f'batch_{uuid.uuid4().hex[:12]}', 'object': 'batch', 'endpoint': body.get('endpoint'),
+                'input_file_id': body['input_file_id'], 'completion_window': body.get('completion_window', '24h'),
+                'status': 'validating', 'created_at': int(time.time()), 'metadata': body.get('metadata'),
+                'output_file_id': None, 'error_file_id': None, 'request_counts': {'total': 0, 'completed': 0, 'failed': 0},
+            }
+            with state.lock:
+                state.batches[batch['id']] = batch
+                state.stats['batches'] += 1
+            self._send_json(200, dict(batch))
+            threading.Thread(target=run_batch, args=(state, batch), daemon=True).start()
+
+        def _complete(self, body, headers):
+            model = body.get('model', 'mock')
+            message, usage = canned_completion(state, body)
+            completion_tokens = usage['completion_tokens']
+            # Seconds per output token after the first one
+            pace = 1 / state.tokens_per_second if state.tokens_per_second else 0.0
+
+            if not body.get('stream'):
+                time.sleep(pace * completion_tokens)
+                self._send_json(200, completion_body(model, message, usage), headers)
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            chunk = {'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model}
+            for index, word in enumerate(state.evaluation.split(' ')):
+                if pace and index:
+                    time.sleep(pace * (len(word) + 1) / 4)
+                delta = {'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}
+                self.wfile.write(b'data: ' + json.dumps({**chunk, 'choices': [delta]}).encode('utf-8') + b'\n\n')
+                if pace:
+                    self.wfile.flush()
+            self.wfile.write(b'data: ' + json.dumps({**chunk, 'choices': [], 'usage': usage}).encode('utf-8') + b'\n\n')
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.close_connection = True
+
+    return Handler
+
+
+def start_server(port=0, rpm=10000, tpm=10000000, latency=0.0, rate_limit_rate=0.0, error_rate=0.0, output_tokens=0,
+                 tokens_per_second=0.0, batch_delay=0.0, batch_fail_rate=0.0):
+    """Run the mock in a background thread; returns (server, state, base_url)"""
+    state = MockState(rpm, tpm, latency, rate_limit_rate, error_rate, output_tokens, tokens_per_second, batch_delay,
+                      batch_fail_rate)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--rpm', type=int, default=10000, help='requests per minute before 429s')
+    parser.add_argument('--tpm', type=int, default=10000000, help='tokens per minute (prompt + max_tokens) before 429s')
+    parser.add_argument('--latency', type=float, default=0.5, help='mean response latency in seconds')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='probability of an injected 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probability of an injected 500/503')
+    parser.add_argument('--output-tokens', type=int, default=0, help='pad markdown replies to about this many tokens')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='output pacing after the first token (0 = instant)')
+    parser.add_argument('--batch-delay', type=float, default=5.0, help='seconds before a batch completes')
+    parser.add_argument('--batch-fail-rate', type=float, default=0.0, help='probability that a batch request fails')
+    args = parser.parse_args()
+
+    server, _, base_url = start_server(args.port, args.rpm, args.tpm, args.latency, args.rate_limit_rate, args.error_rate,
+                                       args.output_tokens, args.tokens_per_second, args.batch_delay, args.batch_fail_rate)
+    print(f"mock OpenAI API at {base_url}", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+import csv
+import io
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from http_cache import get_session
+
+# Worker pool sizes for the bulk pipeline (network fetches vs. LLM calls)
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '8'))
+EVAL_WORKERS = int(os.getenv('EVAL_WORKERS', '4'))
+
+URL_PATTERN = re.compile(r'https?://[^\s,;"\'<>]+')
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+MAX_SITEMAP_DEPTH = 3
+
+
+def _unique(urls):
+    seen = set()
+    result = []
+    for url in urls:
+        url = url.strip().rstrip('.')
+        if url and url not in seen:
+            seen.add(url)
+            result.append(url)
+    return result
+
+
+def parse_url_list(text):
+    """Extract URLs from pasted text (one per line, or comma/space separated)"""
+    return _unique(URL_PATTERN.findall(text or ''))
+
+
+def parse_csv_urls(data):
+    """Extract URLs from CSV data, preferring a 'url' column if there is one"""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig', errors='replace')
+
+    rows = list(csv.reader(io.StringIO(data)))
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    if 'url' in header:
+        index = header.index('url')
+        return _unique(row[index] for row in rows[1:] if len(row) > index and URL_PATTERN.match(row[index].strip()))
+
+    return _unique(match for row in rows for cell in row for match in URL_PATTERN.findall(cell))
+
+
+def fetch_sitemap(url, timeout=10):
+    """Download a sitemap and return the raw XML"""
+    response = get_session().get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+
+def parse_sitemap(xml, fetch_fn=fetch_sitemap, depth=0):
+    """Return page URLs from sitemap XML, following nested sitemap indexes"""
+    root = ET.fromstring(xml)
+    locs = [loc.text.strip() for loc in root.iter(f'{SITEMAP_NS}loc') if loc.text]
+    if not locs:
+        # Sitemaps without the standard namespace
+        locs = [loc.text.strip() for loc in root.iter('loc') if loc.text]
+
+    if not root.tag.endswith('sitemapindex'):
+        return _unique(locs)
+
+    urls = []
+    if depth < MAX_SITEMAP_DEPTH:
+        for child in locs:
+            try:
+                urls.extend(parse_sitemap(fetch_fn(child), fetch_fn, depth + 1))
+            except Exception:
+                # One broken child sitemap shouldn't sink the whole index
+                continue
+    return _unique(urls)
+
+
+def _timed(fn, arg):
+    start = time.perf_counter()
+    result = fn(arg)
+    return result, time.perf_counter() - start
+
+
+def result_row(url, title, fetch_seconds, eval_seconds=0.0, error='', result=None, duplicates=None, fetch_timings=None):
+    """One output row of a bulk run: the evaluation, its tiers, tokens, cost and timings"""
+    result = result or {}
+    usage = result.get('usage') or {}
+    tiers = result.get('tiers') or {}
+    return {
+        'url': url,
+        'title': title,
+        'status': 'error' if error else 'ok',
+        'error': error,
+        'evaluation': result.get('evaluation', ''),
+        'report': result.get('report'),
+        'history_id': result.get('history_id'),
+        'model': result.get('model', ''),
+        'prompt_variant': result.get('prompt_variant', ''),
+        'cache_hit': result.get('cache_hit', False),
+        'audit': result.get('audit', ''),
+        'duplicate_cluster': (duplicates or {}).get('cluster_size', 0),
+        'tier': result.get('tier', ''),
+        'escalation': result.get('escalation') or '',
+        'tiers': tiers,
+        'prompt_tokens': usage.get('prompt_tokens', 0),
+        'cached_tokens': usage.get('cached_tokens', 0),
+        'completion_tokens': usage.get('completion_tokens', 0),
+        'cost_usd': round(sum(entry['cost_usd'] or 0.0 for entry in tiers.values()), 6),
+        'fetch_seconds': round(fetch_seconds, 2),
+        'eval_seconds': round(eval_seconds, 2),
+        'timings': {'fetch': fetch_timings or {}, 'evaluation': result.get('timings') or {}},
+    }
+
+
+def run_bulk_evaluation(urls, extract_fn, evaluate_fn, fetch_workers=FETCH_WORKERS, eval_workers=EVAL_WORKERS,
+                        annotate_fn=None):
+    """Fetch and evaluate URLs concurrently, yielding one result row per URL as it finishes.
+
+    evaluate_fn takes extracted content data and returns a result dict with
+    'evaluation' and 'usage', or 'error' (see evaluator.run_evaluation).
+
+    Fetches and evaluations run in separate pools, so slow LLM calls never hold
+    up network I/O. Fetching only runs a bounded distance ahead of evaluation,
+    which keeps memory flat for very large URL lists.
+
+    With annotate_fn, every page is fetched first and the list of extracted
+    content data is passed to annotate_fn (which may add crawl-level context,
+    such as near-duplicate clusters) before any evaluation starts.
+    """
+    pending_urls = iter(urls)
+    # Crawl-level annotation needs every page before the first evaluation
+    max_backlog = float('inf') if annotate_fn else eval_workers * 2
+    fetched = []
+    fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='fetch')
+    eval_pool = ThreadPoolExecutor(max_workers=eval_workers, thread_name_prefix='evaluate')
+    fetching = {}
+    evaluating = {}
+
+    def fill_fetch_queue():
+        while len(fetching) < fetch_workers and len(evaluating) < max_backlog:
+            url = next(pending_urls, None)
+            if url is None:
+                return
+            fetching[fetch_pool.submit(_timed, extract_fn, url)] = url
+
+    def submit_evaluation(url, content_data, fetch_seconds):
+        future = eval_pool.submit(_timed, evaluate_fn, content_data)
+        evaluating[future] = (url, content_data, fetch_seconds)
+
+    try:
+        fill_fetch_queue()
+        while fetching or evaluating:
+            done, _ = wait(list(fetching) + list(evaluating), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetching:
+                    url = fetching.pop(future)
+                    try:
+                        content_data, fetch_seconds = future.result()
+                    except Exception as e:
+                        content_data, fetch_seconds = {'error': str(e)}, 0.0
+
+                    if 'error' in content_data:
+                        yield result_row(url, '', fetch_seconds, error=content_data['error'])
+                    elif annotate_fn:
+                        fetched.append((url, content_data, fetch_seconds))
+                    else:
+                        submit_evaluation(url, content_data, fetch_seconds)
+                else:
+                    url, content_data, fetch_seconds = evaluating.pop(future)
+                    try:
+                        result, eval_seconds = future.result()
+                    except Exception as e:
+                        result, eval_seconds = {'error': str(e)}, 0.0
+                    yield result_row(url, content_data.get('title', ''), fetch_seconds, eval_seconds, result.get('error', ''), result,
+                              content_data.get('duplicates'), content_data.get('timings'))
+            fill_fetch_queue()
+            if fetched and not fetching:
+                annotate_fn([content_data for _, content_data, _ in fetched])
+                for item in fetched:
+                    submit_evaluation(*item)
+                fetched.clear()
+    finally:
+        fetch_pool.shutdown(wait=False, cancel_futures=True)
+        eval_pool.shutdown(wait=False, cancel_futures=True)
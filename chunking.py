@@ -0,0 +1,163 @@
+import functools
+import math
+import os
+
+# tiktoken gives exact counts; without it (or its encoding files) we estimate
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Context window sizes, matched by longest model-name prefix
+CONTEXT_WINDOWS = {
+    'gpt-4': 8192,
+    'gpt-4-32k': 32768,
+    'gpt-4-turbo': 128000,
+    'gpt-4-1106': 128000,
+    'gpt-4-0125': 128000,
+    'gpt-4o': 128000,
+    'gpt-4.1': 1047576,
+    'gpt-3.5-turbo': 16385,
+    'o1': 200000,
+    'o3': 200000,
+    'o4': 200000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+CHARS_PER_TOKEN = 4
+# Per-request framing overhead (roles, separators) plus slack for estimate error
+REQUEST_OVERHEAD_TOKENS = 200
+
+# Map stage: parallel workers and the size of each partial evaluation
+CHUNK_WORKERS = int(os.getenv('CHUNK_WORKERS', '4'))
+MAP_MAX_TOKENS = int(os.getenv('MAP_MAX_TOKENS', '350'))
+
+MAP_INSTRUCTIONS = """The page is too long for one request, so it is being evaluated in parts.
+Below is part {index} of {total}. Evaluate ONLY this part against the 8 categories above.
+Reply with compact notes, not a full report: one line per category in the form
+"<Category>: <provisional score 1-10> | <key problems> | <key fixes>", using at most {words} words in total.
+"""
+
+COMBINE_INSTRUCTIONS = """The page was evaluated in parts. Below are the compact notes for consecutive parts.
+Merge them into ONE set of compact notes in the same one-line-per-category format,
+keeping the most important problems and fixes, using at most {words} words in total.
+"""
+
+REDUCE_INSTRUCTIONS = """The page was too long for one request and was evaluated in {total} parts.
+Below are the compact notes for each part, in page order. Using them, write the single
+complete evaluation of the whole page in the required structure: all 8 categories with
+scores, problems and fixes, followed by the Priorities section.
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # Unknown model name or encoding files unavailable offline
+        try:
+            return tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            return None
+
+
+def count_tokens(text, model):
+    """Token count of text for model (estimated when tiktoken is unavailable)"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def context_window(model):
+    """Context window of model in tokens"""
+    matches = [prefix for prefix in CONTEXT_WINDOWS if model.startswith(prefix)]
+    return CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+
+def content_budget(model, system_prompt, max_tokens):
+    """Tokens left for the user message once the system prompt and completion are reserved"""
+    return context_window(model) - count_tokens(system_prompt, model) - max_tokens - REQUEST_OVERHEAD_TOKENS
+
+
+def split_sections(text):
+    """Split extracted text into sections at markdown heading lines"""
+    sections = []
+    current = []
+    for line in text.splitlines():
+        if line.startswith('#') and current:
+            sections.append('\n'.join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append('\n'.join(current))
+    return sections
+
+
+def _pack(units, max_tokens, model, separator):
+    """Greedily join units into pieces of at most max_tokens"""
+    pieces = []
+    current = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = count_tokens(unit, model) + 1
+        if current and current_tokens + unit_tokens > max_tokens:
+            pieces.append(separator.join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        pieces.append(separator.join(current))
+    return pieces
+
+
+def _split_oversized(text, max_tokens, model):
+    """Break one over-budget section on line boundaries, then word boundaries"""
+    lines = []
+    for line in text.splitlines():
+        if count_tokens(line, model) <= max_tokens:
+            lines.append(line)
+            continue
+        # A single huge token-dense word (minified data, URLs) gets cut by characters
+        step = max_tokens * CHARS_PER_TOKEN // 2
+        words = [word[i:i + step] for word in line.split() for i in range(0, len(word), step)]
+        lines.extend(_pack(words, max_tokens, model, ' '))
+    return _pack(lines, max_tokens, model, '\n')
+
+
+def chunk_content(text, max_tokens, model):
+    """Pack whole sections into chunks of at most max_tokens, splitting only oversized sections"""
+    parts = []
+    for section in split_sections(text):
+        if count_tokens(section, model) <= max_tokens:
+            parts.append(section)
+        else:
+            parts.extend(_split_oversized(section, max_tokens, model))
+    return _pack(parts, max_tokens, model, '\n')
+
+
+def group_notes(notes, max_tokens, model):
+    """Greedily group consecutive notes so each group fits in max_tokens (at least two per group)"""
+    groups = []
+    current = []
+    current_tokens = 0
+    for note in notes:
+        note_tokens = count_tokens(note, model) + 10
+        if len(current) >= 2 and current_tokens + note_tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(note)
+        current_tokens += note_tokens
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        else:
+            groups.append(current)
+    return groups
+
+
+def format_notes(notes):
+    """Number partial notes for a combine or reduce request"""
+    return '\n\n'.join(f"--- Part {index} ---\n{note.strip()}" for index, note in enumerate(notes, 1))
@@ -0,0 +1,210 @@
+"""Evaluate pages from the command line and write one JSON result per line.
+
+Usage: python cli.py [SOURCE ...] [--urls-file FILE] [--sitemap URL_OR_FILE] [--crawl URL [--max-pages N] [--resume]]
+                     [-o/--output results.jsonl] [--export results.csv|.jsonl|.parquet [--export-format FMT]]
+                     [--prompt-variant full|compact|adaptive] [--structured] [--incremental]
+                     [--cascade] [--fanout] [--precheck-only] [--batch [--batch-poll S]]
+                     [--dedup [--site-report FILE]] [--metrics FILE] [--fetch-workers N] [--eval-workers N]
+
+A SOURCE is a URL, a saved .html/.htm page or a plain-text file with content
+to evaluate. --urls-file takes a text file with one URL per line or a CSV
+with a 'url' column. --crawl follows links from a start URL or sitemap
+within its site and evaluates pages as they are found. Results go to stdout
+unless --output is given; progress goes to stderr, ending with per-stage
+latency percentiles. --export also streams one flat row per page (scores,
+priorities, model, tokens, timings) to a CSV, JSONL or Parquet file for BI
+tools. --incremental keeps the previous evaluation of pages that haven't
+materially changed, and --dedup tells each evaluation about its
+near-duplicate cluster (--site-report writes the cluster report). --batch
+submits the evaluations through the provider's batch API instead, at lower
+cost, and waits for the batches to finish. Exits non-zero if any source
+failed.
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from batch import BATCH_POLL_SECONDS, run_batch_evaluation
+from bulk import FETCH_WORKERS, EVAL_WORKERS, parse_url_list, parse_csv_urls, parse_sitemap, fetch_sitemap, run_bulk_evaluation
+from crawler import MAX_CRAWL_PAGES, Crawler, run_crawl_evaluation
+from dedup import find_duplicates, render_site_report
+from extraction import extract_body
+from fanout import FANOUT
+from http_cache import DOWNLOAD_CHUNK_BYTES
+from prompts import PROMPT_VARIANTS, PROMPT_VARIANT
+from ratelimit import get_limiter
+from tiers import tier_summary
+from history import recording
+from metrics import get_metrics, rounded
+from evaluator import extract_content_from_url, select_evaluation
+from export import EXPORT_FORMATS, ExportWriter, export_row
+
+
+def read_file_source(path):
+    """content_data for a local file: saved HTML is extracted, anything else is taken as text"""
+    try:
+        url = 'file://' + os.path.abspath(path)
+        if path.lower().endswith(('.html', '.htm')):
+            timings = {}
+            with open(path, 'rb') as f:
+                content_data = extract_body(iter(functools.partial(f.read, DOWNLOAD_CHUNK_BYTES), b''), url, timings=timings)
+            return {**content_data, 'timings': rounded(timings)}
+        with open(path, 'rb') as f:
+            data = f.read()
+        return {
+            'title': os.path.basename(path),
+            'meta_description': "Not provided",
+            'content': data.decode('utf-8', errors='replace'),
+            'url': url
+        }
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def load_source(source):
+    """content_data for a URL or a local file"""
+    if os.path.isfile(source):
+        return read_file_source(source)
+    return extract_content_from_url(source)
+
+
+def collect_sources(args):
+    sources = list(args.sources)
+    if args.urls_file:
+        with open(args.urls_file, 'rb') as f:
+            data = f.read()
+        if args.urls_file.lower().endswith('.csv'):
+            sources += parse_csv_urls(data)
+        else:
+            sources += parse_url_list(data.decode('utf-8', errors='replace'))
+    if args.sitemap:
+        if os.path.isfile(args.sitemap):
+            with open(args.sitemap, 'rb') as f:
+                sources += parse_sitemap(f.read())
+        else:
+            sources += parse_sitemap(fetch_sitemap(args.sitemap))
+    # Keep the first occurrence of each source, in order
+    return list(dict.fromkeys(sources))
+
+
+def print_batch_progress(batch):
+    counts = batch.request_counts
+    done = f", {counts.completed + counts.failed}/{counts.total} requests done" if counts and counts.total else ""
+    print(f"Batch {batch.id}: {batch.status}{done}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='*', help='URLs or local files to evaluate')
+    parser.add_argument('--urls-file', help='text file with one URL per line, or a CSV with a url column')
+    parser.add_argument('--sitemap', help='sitemap URL or local sitemap.xml')
+    parser.add_argument('--crawl', help='crawl the site from this start URL or sitemap URL')
+    parser.add_argument('--max-pages', type=int, default=MAX_CRAWL_PAGES, help='stop a crawl after this many pages')
+    parser.add_argument('--resume', action='store_true', help='continue the last crawl of --crawl from its checkpoint')
+    parser.add_argument('-o', '--output', help='JSONL file to write (default: stdout)')
+    parser.add_argument('--export', help='also write one row per page to this CSV, JSONL or Parquet file')
+    parser.add_argument('--export-format', choices=EXPORT_FORMATS, help="format of --export (default: from its extension)")
+    parser.add_argument('--prompt-variant', choices=PROMPT_VARIANTS, default=PROMPT_VARIANT)
+    parser.add_argument('--structured', action='store_true', help='return typed JSON reports instead of markdown')
+    parser.add_argument('--incremental', action='store_true',
+                        help='keep the previous evaluation of URLs whose content has not materially changed')
+    parser.add_argument('--cascade', action='store_true',
+                        help='triage with the fast model and escalate only uncertain or YMYL pages to the premium model')
+    parser.add_argument('--fanout', action='store_true', default=FANOUT,
+                        help='evaluate each rubric category in its own concurrent request and assemble the report')
+    parser.add_argument('--precheck-only', action='store_true',
+                        help='report only the metadata and structure checks measured from the HTML (no API calls)')
+    parser.add_argument('--batch', action='store_true',
+                        help='evaluate through the batch API: cheaper, but results can take up to its completion window')
+    parser.add_argument('--batch-poll', type=float, default=BATCH_POLL_SECONDS, help='seconds between batch status checks')
+    parser.add_argument('--dedup', action='store_true',
+                        help='fetch everything first and give each evaluation its near-duplicate cluster')
+    parser.add_argument('--site-report', help='write the near-duplicate site report (markdown) to this file')
+    parser.add_argument('--metrics', help='write the stage latency histograms and token counters (Prometheus text format) to this file')
+    parser.add_argument('--fetch-workers', type=int, default=FETCH_WORKERS)
+    parser.add_argument('--eval-workers', type=int, default=EVAL_WORKERS)
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    sources = collect_sources(args)
+    if not sources and not args.crawl:
+        parser.error("no sources given")
+    if args.crawl and sources:
+        parser.error("--crawl can't be combined with other sources")
+    if args.batch and (args.crawl or args.cascade or args.fanout or args.incremental or args.precheck_only or args.dedup
+                       or args.site_report):
+        parser.error("--batch only evaluates a list of sources with the premium model")
+
+    run = select_evaluation(args.precheck_only, args.cascade, args.incremental, args.fanout)
+    evaluate = recording(lambda content_data: run(content_data, args.prompt_variant, args.structured), 'cli')
+    try:
+        exporter = ExportWriter(args.export, args.export_format) if args.export else None
+    except (ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    site_report = {}
+    annotate = (lambda pages: site_report.update(find_duplicates(pages))) if args.dedup or args.site_report else None
+    done = failed = unchanged = 0
+    rows_seen = []
+    start = time.perf_counter()
+    try:
+        if args.batch:
+            rows = run_batch_evaluation(sources, load_source, args.prompt_variant, args.structured, args.fetch_workers,
+                                        args.batch_poll, print_batch_progress)
+        elif args.crawl:
+            crawler = Crawler(args.crawl, extract_content_from_url, max_pages=args.max_pages, workers=args.fetch_workers,
+                              resume=args.resume)
+            rows = run_crawl_evaluation(crawler, evaluate, args.eval_workers, annotate)
+        else:
+            rows = run_bulk_evaluation(sources, load_source, evaluate, args.fetch_workers, args.eval_workers, annotate)
+        total = len(sources) or '?'
+        for done, row in enumerate(rows, 1):
+            output.write(json.dumps(row) + '\n')
+            output.flush()
+            if exporter:
+                exporter.write(export_row(row, 'cli'))
+            rows_seen.append({'tiers': row['tiers']})
+            failed += row['status'] == 'error'
+            unchanged += row['audit'] == 'unchanged'
+            print(f"[{done}/{total}] {row['status']:<5} {row['url']}", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if exporter:
+            exporter.close()
+
+    if args.crawl:
+        print("Crawl: " + ", ".join(f"{count} {name}" for name, count in crawler.stats.items()), file=sys.stderr)
+    print(f"{done - failed} evaluated ({unchanged} unchanged), {failed} failed "
+          f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    if exporter:
+        print(f"Exported {exporter.rows} rows to {args.export} ({exporter.format})", file=sys.stderr)
+    if site_report:
+        print(f"{len(site_report['clusters'])} near-duplicate clusters covering {site_report['duplicated_pages']} "
+              f"of {site_report['pages']} pages", file=sys.stderr)
+        if args.site_report:
+            with open(args.site_report, 'w', encoding='utf-8') as f:
+                f.write(render_site_report(site_report) + '\n')
+    for tier in tier_summary(rows_seen):
+        escalation = f", {tier['share_of_triaged']:.0%} of triaged" if tier['share_of_triaged'] is not None else ""
+        print(f"Tier {tier['tier']} ({tier['model']}): {tier['pages']} pages{escalation}, "
+              f"mean {tier['mean_latency_seconds']}s, ~${tier['cost_usd']}", file=sys.stderr)
+    limiter_stats = get_limiter().stats()
+    print(f"API: {limiter_stats['requests']} requests, {limiter_stats['retries']} retries "
+          f"({limiter_stats['rate_limited']} rate limited), mean wait {limiter_stats['mean_wait_seconds']}s", file=sys.stderr)
+    for stage in get_metrics().summary():
+        print(f"Stage {stage['kind']}.{stage['stage']}: {stage['count']}x, p50 {stage['p50_seconds']}s, "
+              f"p95 {stage['p95_seconds']}s, p99 {stage['p99_seconds']}s", file=sys.stderr)
+    if args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            f.write(get_metrics().render_prometheus())
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import difflib
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from history import result_scores
+from report import CATEGORIES
+
+# Versions of a page compared side by side at most; each is extracted and evaluated in its own thread
+MAX_COMPARE_VERSIONS = int(os.getenv('MAX_COMPARE_VERSIONS', '5'))
+# Content diff lines kept per pair of versions; the rest is cut off
+MAX_DIFF_LINES = 2000
+
+URL_ONLY = re.compile(r'https?://\S+')
+
+
+def version_label(index):
+    """'A', 'B', ... for the versions in input order"""
+    return chr(ord('A') + index)
+
+
+def draft_content_data(text, title='', url=''):
+    """Content data for a pasted draft, shaped like Raw Content mode's so unchanged drafts hit the evaluation cache"""
+    return {
+        'title': title or "User-provided content",
+        'meta_description': "Not provided",
+        'content': text,
+        'url': url or "Not provided"
+    }
+
+
+def extract_version(source, extract_fn, title='', url=''):
+    """Content data for one version: a lone URL is fetched with extract_fn, anything else is a draft"""
+    source = source.strip()
+    if URL_ONLY.fullmatch(source):
+        return extract_fn(source)
+    return draft_content_data(source, title, url)
+
+
+def run_comparison(sources, extract_fn, evaluate_fn, title='', url='', progress_fn=None):
+    """Extract and evaluate every version of a page at once; returns one entry per version, in input order.
+
+    Each source is a draft or a URL (see extract_version); drafts share the
+    optional title and url. Every version runs in its own thread from fetch to
+    evaluation, so a comparison takes about as long as its slowest version, and
+    versions evaluated before come back from the evaluation cache.
+    progress_fn, if given, gets the finished entries after each one.
+    Entries are {'label', 'content_data', 'result', 'seconds'}; a failed
+    fetch or evaluation leaves {'error': ...} as the result.
+    """
+    if not 2 <= len(sources) <= MAX_COMPARE_VERSIONS:
+        raise ValueError(f"Compare between 2 and {MAX_COMPARE_VERSIONS} versions, not {len(sources)}")
+
+    def run(index):
+        start = time.perf_counter()
+        try:
+            content_data = extract_version(sources[index], extract_fn, title, url)
+        except Exception as e:
+            content_data = {'error': str(e)}
+        if 'error' in content_data:
+            result = {'error': f"Error extracting content: {content_data['error']}"}
+            content_data = draft_content_data('', url=sources[index].strip())
+        else:
+            try:
+                result = evaluate_fn(content_data)
+            except Exception as e:
+                result = {'error': str(e)}
+        return {'label': version_label(index), 'content_data': content_data, 'result': result,
+                'seconds': round(time.perf_counter() - start, 2)}
+
+    versions = [None] * len(sources)
+    with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='compare') as pool:
+        futures = {pool.submit(run, index): index for index in range(len(sources))}
+        for future in as_completed(futures):
+            versions[futures[future]] = future.result()
+            if progress_fn:
+                progress_fn([version for version in versions if version])
+    return versions
+
+
+def score_deltas(versions):
+    """Per-category rows with every version's score and each later version's change from version A"""
+    scores = [result_scores(version['result']) if 'error' not in version['result'] else ({}, None) for version in versions]
+    rows = []
+    for key, name in CATEGORIES + [('overall', 'Overall')]:
+        row = {'category': name}
+        values = [overall if key == 'overall' else category_scores.get(key) for category_scores, overall in scores]
+        for index, (version, value) in enumerate(zip(versions, values)):
+            row[version['label']] = value
+            if index:
+                row[f"Δ {version['label']}"] = None if value is None or values[0] is None else round(value - values[0], 1)
+        rows.append(row)
+    return rows
+
+
+def content_diff(before, after, labels=('A', 'B')):
+    """Unified line diff of two versions' content and the (added, removed) line counts"""
+    lines = list(difflib.unified_diff(before.splitlines(), after.splitlines(), *labels, lineterm='', n=1))
+    added = sum(1 for line in lines if line.startswith('+') and not line.startswith('+++'))
+    removed = sum(1 for line in lines if line.startswith('-') and not line.startswith('---'))
+    if len(lines) > MAX_DIFF_LINES:
+        lines = lines[:MAX_DIFF_LINES] + [f"... {len(lines) - MAX_DIFF_LINES} more diff lines"]
+    return '\n'.join(lines), added, removed
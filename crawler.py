@@ -0,0 +1,320 @@
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+
+from bulk import FETCH_WORKERS, EVAL_WORKERS, parse_sitemap, fetch_sitemap, run_bulk_evaluation
+from http_cache import get_session
+from storage import data_path, sqlite_connection
+
+# Crawl state, so an interrupted crawl can resume where it stopped
+CRAWL_PATH = os.getenv('CRAWL_PATH', data_path('crawls.sqlite3'))
+MAX_CRAWL_PAGES = int(os.getenv('MAX_CRAWL_PAGES', '500'))
+MAX_CRAWL_DEPTH = int(os.getenv('MAX_CRAWL_DEPTH', '5'))
+# Politeness: concurrent fetches per host, and the minimum gap between them
+# (a longer robots.txt Crawl-delay wins, and also drops concurrency to 1)
+CRAWL_HOST_CONCURRENCY = int(os.getenv('CRAWL_HOST_CONCURRENCY', '2'))
+CRAWL_DELAY = float(os.getenv('CRAWL_DELAY', '0'))
+# Product token matched against robots.txt user-agent groups
+CRAWLER_AGENT = os.getenv('CRAWLER_AGENT', 'ContentEvaluator')
+
+# Links to files that are never pages worth evaluating
+SKIPPED_EXTENSIONS = re.compile(
+    r'\.(?:pdf|jpe?g|png|gif|webp|svg|ico|css|js|json|xml|txt|zip|gz|tar|rar|7z|exe|dmg|mp3|mp4|mov|avi|webm|woff2?|ttf|csv|xlsx?|docx?|pptx?)$',
+    re.I
+)
+TRACKING_PARAMS = re.compile(r'^(?:utm_\w+|gclid|fbclid|msclkid|mc_cid|mc_eid)$', re.I)
+
+
+def normalize_url(url):
+    """Canonical form for deduplication: lowercase scheme and host, no default port,
+    fragment or tracking parameters, sorted query"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host += f':{parts.port}'
+    query = urlencode(sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if not TRACKING_PARAMS.match(key)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+def load_robots(root, timeout=10):
+    """Parsed robots.txt for the site of root; missing files allow everything,
+    and server errors disallow everything until the next crawl"""
+    parts = urlsplit(root)
+    robots = RobotFileParser(f"{parts.scheme}://{parts.netloc}/robots.txt")
+    try:
+        response = get_session().get(robots.url, timeout=timeout)
+    except Exception:
+        robots.disallow_all = True
+        return robots
+    if response.status_code in (401, 403) or response.status_code >= 500:
+        robots.disallow_all = True
+    elif response.status_code >= 400:
+        robots.allow_all = True
+    else:
+        robots.parse(response.text.splitlines())
+    return robots
+
+
+def discover_sitemaps(root, robots):
+    """Sitemap URLs declared in robots.txt, or the conventional /sitemap.xml"""
+    parts = urlsplit(root)
+    return robots.site_maps() or [f"{parts.scheme}://{parts.netloc}/sitemap.xml"]
+
+
+class CrawlCheckpoint:
+    """SQLite record of every URL a crawl has queued or finished, keyed by crawl id"""
+
+    def __init__(self, crawl_id, path=CRAWL_PATH):
+        self.crawl_id = crawl_id
+        self.path = path
+        with sqlite_connection(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_urls (
+                    crawl TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    depth INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (crawl, url)
+                )
+            """)
+
+    def load(self):
+        """(all known URLs, queued (url, depth) pairs, URLs crawled or standing
+        for a page crawled under another URL, finished page count)"""
+        with sqlite_connection(self.path) as conn:
+            rows = conn.execute(
+                "SELECT url, depth, status FROM crawl_urls WHERE crawl = ? ORDER BY rowid", (self.crawl_id,)
+            ).fetchall()
+        queued = [(url, depth) for url, depth, status in rows if status == 'queued']
+        crawled = {url for url, _, status in rows if status in ('done', 'alias')}
+        return {url for url, _, _ in rows}, queued, crawled, sum(1 for _, _, status in rows if status == 'done')
+
+    def add(self, urls, depth):
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO crawl_urls VALUES (?, ?, ?, 'queued', ?)",
+                [(self.crawl_id, url, depth, now) for url in urls]
+            )
+
+    def mark(self, url, status):
+        """status is 'done', 'duplicate', 'alias' (crawled under another URL), 'blocked' or 'error'"""
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO crawl_urls VALUES (?, ?, COALESCE((SELECT depth FROM crawl_urls WHERE crawl = ? AND url = ?), 0), ?, ?)",
+                (self.crawl_id, url, self.crawl_id, url, status, time.time())
+            )
+
+    def clear(self):
+        with sqlite_connection(self.path) as conn:
+            conn.execute("DELETE FROM crawl_urls WHERE crawl = ?", (self.crawl_id,))
+
+
+class Crawler:
+    """Polite same-site crawler that yields extracted pages as they arrive.
+
+    Starts from a root URL (plus the sitemaps robots.txt declares) or from a
+    sitemap, follows links within the start hosts and skips URLs robots.txt
+    disallows. Fetches run in a thread pool; each host gets at most
+    host_concurrency fetches at once, spaced by its crawl delay. Pages
+    whose canonical URL was already crawled are skipped; a page whose
+    canonical URL is still queued waits for that URL to be fetched. The
+    frontier lives in a CrawlCheckpoint, so a crawl started again with
+    resume=True continues where it stopped.
+    """
+
+    def __init__(self, start, extract_fn, max_pages=MAX_CRAWL_PAGES, max_depth=MAX_CRAWL_DEPTH, workers=FETCH_WORKERS,
+                 host_concurrency=CRAWL_HOST_CONCURRENCY, delay=CRAWL_DELAY, follow_links=True, resume=False,
+                 checkpoint=None):
+        self.start = normalize_url(start)
+        self.extract_fn = extract_fn
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.workers = workers
+        self.host_concurrency = host_concurrency
+        self.delay = delay
+        self.follow_links = follow_links
+        self.checkpoint = checkpoint or CrawlCheckpoint(self.start)
+        if not resume:
+            self.checkpoint.clear()
+        self.hosts = {host_of(self.start)}
+        self.stats = {'fetched': 0, 'pages': 0, 'duplicates': 0, 'blocked': 0, 'errors': 0}
+        self._robots = {}
+        self._frontier = {}
+        self._in_flight = {}
+        self._next_fetch = {}
+
+    def robots(self, host):
+        if host not in self._robots:
+            self._robots[host] = load_robots(f"{urlsplit(self.start).scheme}://{host}/")
+        return self._robots[host]
+
+    def crawl_delay(self, host):
+        delay = self.robots(host).crawl_delay(CRAWLER_AGENT)
+        return max(self.delay, float(delay or 0))
+
+    def allowed(self, url):
+        return self.robots(host_of(url)).can_fetch(CRAWLER_AGENT, url)
+
+    def seed(self):
+        """Start URLs: the root itself and its sitemaps, or the pages a sitemap lists"""
+        if self.start.endswith('.xml'):
+            return parse_sitemap(fetch_sitemap(self.start))
+        urls = [self.start]
+        for sitemap in discover_sitemaps(self.start, self.robots(host_of(self.start))):
+            try:
+                urls.extend(parse_sitemap(fetch_sitemap(sitemap)))
+            except Exception:
+                # A missing or broken sitemap still leaves link discovery
+                continue
+        return urls
+
+    def _enqueue(self, urls, depth, seen):
+        fresh = []
+        for url in urls:
+            url = normalize_url(url)
+            if url in seen or host_of(url) not in self.hosts or SKIPPED_EXTENSIONS.search(urlsplit(url).path):
+                continue
+            seen.add(url)
+            fresh.append(url)
+            self._frontier.setdefault(host_of(url), deque()).append((url, depth))
+        if fresh:
+            self.checkpoint.add(fresh, depth)
+
+    def _next_ready(self, now):
+        """A (url, depth) from a host with spare capacity whose delay has passed,
+        else the seconds until one is ready (None if nothing is queued)"""
+        wait_for = None
+        for host, queue in self._frontier.items():
+            delay = self.crawl_delay(host) if queue else 0
+            if not queue or self._in_flight.get(host, 0) >= (1 if delay else self.host_concurrency):
+                continue
+            ready_at = self._next_fetch.get(host, 0.0)
+            if ready_at > now:
+                wait_for = min(wait_for, ready_at - now) if wait_for is not None else ready_at - now
+                continue
+            while queue:
+                url, depth = queue.popleft()
+                if self.allowed(url):
+                    self._in_flight[host] = self._in_flight.get(host, 0) + 1
+                    self._next_fetch[host] = now + delay
+                    return url, depth
+                self.stats['blocked'] += 1
+                self.checkpoint.mark(url, 'blocked')
+        return wait_for
+
+    def crawl(self):
+        """Yield extracted content data for each new page, as fetches finish"""
+        # seen: every URL ever queued; settled: those no longer waiting to be fetched;
+        # crawled: the pages yielded and the canonical URLs they were yielded for
+        seen, queued, crawled, done = self.checkpoint.load()
+        settled = seen - {url for url, _ in queued}
+        if seen:
+            self.hosts.update(host_of(url) for url in seen)
+            for url, depth in queued:
+                self._frontier.setdefault(host_of(url), deque()).append((url, depth))
+        else:
+            seeds = self.seed()
+            # A sitemap may list pages on hosts other than its own
+            if self.start.endswith('.xml'):
+                self.hosts.update(host_of(url) for url in seeds)
+            self._enqueue(seeds, 0, seen)
+        self.stats['pages'] = done
+        # Pages held back until their canonical URL has been fetched, keyed by that URL
+        waiting = {}
+
+        def place(url, content_data, final=False):
+            """content_data if the page is new, else None (a duplicate, or held in waiting)"""
+            canonical = normalize_url(content_data['canonical']) if content_data.get('canonical') else url
+            if host_of(canonical) not in self.hosts:
+                canonical = url
+            if canonical in crawled or url in crawled:
+                # Another URL for a page already crawled, under this URL or its canonical one
+                self.stats['duplicates'] += 1
+                self.checkpoint.mark(url, 'duplicate')
+                return None
+            if canonical != url and not final and canonical in seen and canonical not in settled \
+                    and self.allowed(canonical):
+                # The canonical URL is still to be fetched: crawl the page under it if it can be
+                waiting.setdefault(canonical, []).append((url, content_data))
+                return None
+            if canonical != url:
+                # Crawled under this URL; never fetch the canonical one again
+                seen.add(canonical)
+                crawled.add(canonical)
+                self.checkpoint.mark(canonical, 'alias')
+            crawled.add(url)
+            self.checkpoint.mark(url, 'done')
+            self.stats['pages'] += 1
+            return content_data
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='crawl')
+        fetching = {}
+        try:
+            while True:
+                ready = None
+                # Pages in flight count against the limit so the crawl stops at max_pages
+                while len(fetching) < self.workers and self.stats['pages'] + len(fetching) < self.max_pages:
+                    ready = self._next_ready(time.monotonic())
+                    if not isinstance(ready, tuple):
+                        break
+                    fetching[pool.submit(self.extract_fn, ready[0])] = ready
+                    ready = None
+                if not fetching:
+                    if ready is not None:
+                        time.sleep(ready)
+                        continue
+                    # Nothing left to fetch: pages whose canonical URL never got crawled stand for themselves
+                    for url, content_data in [page for pages in waiting.values() for page in pages]:
+                        if self.stats['pages'] < self.max_pages and place(url, content_data, final=True):
+                            yield content_data
+                    return
+
+                finished, _ = wait(list(fetching), timeout=ready, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    url, depth = fetching.pop(future)
+                    self._in_flight[host_of(url)] -= 1
+                    self.stats['fetched'] += 1
+                    settled.add(url)
+                    try:
+                        content_data = future.result()
+                    except Exception as e:
+                        content_data = {'error': str(e)}
+                    if 'error' in content_data:
+                        self.stats['errors'] += 1
+                        self.checkpoint.mark(url, 'error')
+                    else:
+                        if self.follow_links and depth < self.max_depth:
+                            self._enqueue(content_data.get('links', []), depth + 1, seen)
+                        if place(url, content_data):
+                            yield content_data
+                    # Pages waiting on this URL are now duplicates of it, or new pages in their own right
+                    for held_url, held in waiting.pop(url, []):
+                        if self.stats['pages'] < self.max_pages and place(held_url, held, final=True):
+                            yield held
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_crawl_evaluation(crawler, evaluate_fn, eval_workers=EVAL_WORKERS, annotate_fn=None):
+    """Evaluate pages as the crawler finds them, yielding bulk result rows (see run_bulk_evaluation)"""
+    pages = {}
+
+    def crawled_urls():
+        for content_data in crawler.crawl():
+            pages[content_data['url']] = content_data
+            yield content_data['url']
+
+    # The crawler already fetched each page; the bulk pipeline only hands it over
+    return run_bulk_evaluation(crawled_urls(), pages.pop, evaluate_fn, 1, eval_workers, annotate_fn)
@@ -0,0 +1,160 @@
+import hashlib
+import os
+
+import numpy as np
+
+from site_audit import shingles
+
+# MinHash signature size and LSH banding: 32 bands x 4 rows makes pages at
+# Jaccard 0.7 candidates with >99.9% probability, while dissimilar pages rarely collide
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 32
+# Estimated Jaccard resemblance (over word 3-grams) at which two pages count as near-duplicates;
+# templated pages that only swap a place or product name score well above it
+DUPLICATE_THRESHOLD = float(os.getenv('DUPLICATE_THRESHOLD', '0.7'))
+DUPLICATE_SHINGLE_WORDS = 3
+# Pages with fewer shingles than this are too short to call duplicates
+MIN_SHINGLES = 20
+MAX_LISTED_DUPLICATES = 5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed so signatures are comparable across runs; a, b < 2**32 keep a * x + b inside uint64
+_random = np.random.RandomState(1)
+_PERM_A = _random.randint(1, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _random.randint(0, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def minhash_signature(text):
+    """MinHash signature of the text's word shingles, or None if the text is too short"""
+    features = shingles(text, DUPLICATE_SHINGLE_WORDS)
+    if len(features) < MIN_SHINGLES:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=4).digest(), 'big') for feature in features),
+        dtype=np.uint64, count=len(features)
+    )
+    # One row per shingle, one column per permutation
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0)
+
+
+def estimated_similarity(a, b):
+    """Share of equal signature slots, an unbiased estimate of Jaccard resemblance"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class DuplicateIndex:
+    """LSH index over MinHash signatures; adding and clustering are near-linear in pages.
+
+    Each band of the signature is a bucket key, so only pages that share a
+    bucket are ever compared, and each one only against the bucket's first
+    page. Confirmed pairs are merged with union-find into clusters.
+    """
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD, bands=LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = MINHASH_PERMUTATIONS // bands
+        self.signatures = {}
+        self._buckets = {}
+        self._parent = {}
+        self._similarity = {}
+
+    def _find(self, key):
+        root = key
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[key] != root:
+            self._parent[key], key = root, self._parent[key]
+        return root
+
+    def _union(self, a, b):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            self._parent[root_b] = root_a
+
+    def add(self, key, text):
+        """Index a page's text; returns False if it is too short to compare"""
+        signature = minhash_signature(text)
+        if signature is None:
+            return False
+        self.signatures[key] = signature
+        self._parent[key] = key
+        for band in range(self.bands):
+            bucket = (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            first = self._buckets.setdefault(bucket, key)
+            if first == key or self._find(first) == self._find(key):
+                continue
+            similarity = estimated_similarity(signature, self.signatures[first])
+            if similarity >= self.threshold:
+                self._union(first, key)
+                for pair_key in (key, first):
+                    self._similarity[pair_key] = max(self._similarity.get(pair_key, 0.0), similarity)
+        return True
+
+    def clusters(self):
+        """Groups of two or more near-duplicate keys, largest first"""
+        groups = {}
+        for key in self.signatures:
+            groups.setdefault(self._find(key), []).append(key)
+        return sorted((members for members in groups.values() if len(members) > 1), key=len, reverse=True)
+
+    def max_similarity(self, key):
+        """Highest confirmed similarity between key and another page"""
+        return self._similarity.get(key, 0.0)
+
+
+def find_duplicates(pages, threshold=DUPLICATE_THRESHOLD):
+    """Annotate content_data dicts with their near-duplicate cluster; returns the site-level report.
+
+    Each page in a cluster gets content_data['duplicates'] = {'cluster_size',
+    'similarity', 'examples'}, which build_content_to_evaluate passes to the model.
+    """
+    index = DuplicateIndex(threshold)
+    indexed = {}
+    for position, content_data in enumerate(pages):
+        if 'error' not in content_data and index.add(position, content_data['content']):
+            indexed[position] = content_data
+
+    clusters = index.clusters()
+    for members in clusters:
+        for position in members:
+            indexed[position]['duplicates'] = {
+                'cluster_size': len(members),
+                'similarity': round(index.max_similarity(position), 2),
+                'examples': [indexed[other]['url'] for other in members if other != position][:MAX_LISTED_DUPLICATES],
+            }
+
+    duplicated = sum(len(members) for members in clusters)
+    return {
+        'pages': len(indexed),
+        'threshold': threshold,
+        'clusters': [
+            {
+                'size': len(members),
+                'titles': sorted({indexed[position]['title'] for position in members})[:3],
+                'urls': [indexed[position]['url'] for position in members],
+            }
+            for members in clusters
+        ],
+        'duplicated_pages': duplicated,
+        'duplicate_share': round(duplicated / len(indexed), 3) if indexed else 0.0,
+    }
+
+
+def render_site_report(report):
+    """Markdown summary of near-duplicate clusters across a crawl"""
+    lines = [
+        "## Near-Duplicate Content",
+        "",
+        f"{report['duplicated_pages']} of {report['pages']} pages ({report['duplicate_share']:.0%}) fall into "
+        f"{len(report['clusters'])} near-duplicate clusters (estimated similarity ≥ {report['threshold']:.0%}).",
+    ]
+    for number, cluster in enumerate(report['clusters'], 1):
+        lines.append("")
+        lines.append(f"### Cluster {number} ({cluster['size']} pages)")
+        lines.append("")
+        lines.append("Titles: " + "; ".join(cluster['titles']))
+        lines.extend(f"- {url}" for url in cluster['urls'])
+    return '\n'.join(lines)
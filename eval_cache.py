@@ -0,0 +1,132 @@
+import hashlib
+import os
+import threading
+import time
+
+from storage import data_path, sqlite_connection
+
+# Persistent evaluation cache settings
+CACHE_PATH = os.getenv('EVAL_CACHE_PATH', data_path('evaluations.sqlite3'))
+CACHE_MAX_ENTRIES = int(os.getenv('EVAL_CACHE_MAX_ENTRIES', '5000'))
+CACHE_MAX_AGE_DAYS = float(os.getenv('EVAL_CACHE_MAX_AGE_DAYS', '30'))
+
+
+def normalize_content(text):
+    """Collapse whitespace so cosmetic reformatting doesn't bust the cache"""
+    lines = (' '.join(line.split()) for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def prompt_fingerprint(prompt):
+    """Short stable hash of a prompt, used to invalidate entries when it changes"""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+
+
+def make_cache_key(content, model, temperature, prompt, output_format='markdown'):
+    """Cache key over the normalized content and everything that shapes the answer"""
+    key = hashlib.sha256()
+    parts = [normalize_content(content), model, repr(temperature), prompt_fingerprint(prompt)]
+    if output_format != 'markdown':
+        # Appended only when set so existing markdown entries keep their keys
+        parts.append(output_format)
+    for part in parts:
+        key.update(part.encode('utf-8'))
+        key.update(b'\0')
+    return key.hexdigest()
+
+
+class EvaluationCache:
+    """SQLite-backed cache of finished evaluations with size and age eviction"""
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, max_age_days=CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        with sqlite_connection(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    key TEXT PRIMARY KEY,
+                    evaluation TEXT NOT NULL,
+                    model TEXT,
+                    prompt_version TEXT,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_accessed ON evaluations (accessed_at)")
+
+    def get(self, key, count=True):
+        """Return the cached evaluation for key, or None.
+
+        With count=False the lookup is left out of the hit/miss counters, for
+        callers that read several entries per evaluation and count it with
+        record_lookup themselves.
+        """
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(
+                "SELECT evaluation, created_at FROM evaluations WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.max_age_seconds:
+                conn.execute("UPDATE evaluations SET accessed_at = ? WHERE key = ?", (now, key))
+            else:
+                row = None
+
+        if count:
+            self.record_lookup(row is not None)
+        return row[0] if row else None
+
+    def record_lookup(self, hit):
+        """Count one evaluation's lookup as a hit or a miss"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, evaluation, model=None, prompt_version=None):
+        """Store an evaluation and evict anything over the age or size limits"""
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?, ?)",
+                (key, evaluation, model, prompt_version, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM evaluations WHERE created_at < ?", (now - self.max_age_seconds,))
+        conn.execute("""
+            DELETE FROM evaluations WHERE key IN (
+                SELECT key FROM evaluations ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def clear(self):
+        """Drop every cached evaluation"""
+        with sqlite_connection(self.path) as conn:
+            conn.execute("DELETE FROM evaluations")
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current entry count"""
+        with sqlite_connection(self.path) as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache instance, shared across Streamlit reruns and threads"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EvaluationCache()
+        return _default_cache
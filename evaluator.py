@@ -0,0 +1,594 @@
+import functools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prompts import PROMPT_VARIANT, get_prompt, build_content_to_evaluate, build_messages
+from report import CATEGORY_KEYS, CATEGORY_NAMES, EVALUATION_TOOL, EVALUATION_TOOL_CHOICE, STRUCTURED_INSTRUCTIONS, parse_report, render_markdown
+from ratelimit import get_limiter
+from site_audit import get_site_audit
+from eval_cache import get_cache, make_cache_key, prompt_fingerprint
+from http_cache import BoundedBody, get_session, get_response_cache, conditional_headers
+from extraction import EXTRACTION_ENGINE, extract_body
+from prechecks import render_precheck_report
+from metrics import get_metrics, timed, rounded
+from fanout import FANOUT_MAX_TOKENS, FANOUT_WORKERS, CATEGORY_TOOL, category_instructions, parse_category, assemble_report
+from tiers import (
+    FAST_MODEL, FAST_MAX_TOKENS, TRIAGE_CONTENT_TOKENS, TRIAGE_PROMPT, TRIAGE_TOOL,
+    parse_triage, escalation_reason, cascade_config, render_triage, tier_entry
+)
+from chunking import (
+    CHUNK_WORKERS, MAP_MAX_TOKENS, MAP_INSTRUCTIONS, COMBINE_INSTRUCTIONS, REDUCE_INSTRUCTIONS,
+    count_tokens, content_budget, chunk_content, group_notes, format_notes
+)
+
+# Evaluation model settings (the premium tier; see tiers.py for the fast one)
+MODEL = os.getenv('PREMIUM_MODEL', 'gpt-4')
+MAX_TOKENS = int(os.getenv('PREMIUM_MAX_TOKENS', '2000'))
+TEMPERATURE = 0.1
+# Ask for JSON via function calling instead of free-form markdown
+STRUCTURED_OUTPUT = os.getenv('STRUCTURED_OUTPUT', '').lower() in ('1', 'true', 'yes')
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Shared OpenAI client, created on first use (openai is slow to import)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            import openai
+            # Retries and backoff are handled by the rate limiter
+            _client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'), max_retries=0)
+        return _client
+
+
+def extract_content_from_url(url):
+    """Extract content from a given URL; 'timings' holds the seconds each stage took"""
+    timings = {}
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        # Revalidate against the stored copy; a 304 skips both download and parse
+        with timed(timings, 'cache_lookup'):
+            response_cache = get_response_cache()
+            cached = response_cache.get(url)
+        if cached and (cached['data'].get('extractor') != EXTRACTION_ENGINE or 'links' not in cached['data']):
+            # Stored under a different extraction engine or by an older version; refetch in full
+            cached = None
+        # Streamed: the body is read in bounded chunks while it is parsed ('request' is pool
+        # wait, DNS, connect, TLS and server time up to the headers; 'download' the body)
+        with timed(timings, 'request'):
+            response = get_session().get(url, headers=conditional_headers(cached), timeout=10, stream=True)
+        with response:
+            if response.status_code == 304 and cached:
+                content_data = cached['data']
+                outcome = 'not_modified'
+                with timed(timings, 'cache_write'):
+                    response_cache.touch(url)
+            else:
+                response.raise_for_status()
+                body = BoundedBody(response)
+                content_data = extract_body(body, url, response.headers.get('Content-Type', ''), timings=timings)
+                if body.truncated:
+                    content_data['truncated'] = body.truncated
+                with timed(timings, 'cache_write'):
+                    response_cache.put(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), content_data)
+    except Exception as e:
+        content_data = {'error': str(e)}
+        outcome = 'error'
+    
+    timings['total'] = time.perf_counter() - start
+    get_metrics().observe('fetch', timings, outcome, url)
+    if 'error' not in content_data:
+        content_data['timings'] = rounded(timings)
+    return content_data
+
+
+def new_usage():
+    """Empty token usage totals for one evaluation"""
+    return {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+
+
+def add_usage(totals, usage):
+    """Add a response's usage to totals, including provider-cached prompt tokens"""
+    if usage is None:
+        return
+    details = getattr(usage, 'prompt_tokens_details', None)
+    totals['requests'] += 1
+    totals['prompt_tokens'] += usage.prompt_tokens or 0
+    totals['cached_tokens'] += getattr(details, 'cached_tokens', None) or 0
+    totals['completion_tokens'] += usage.completion_tokens or 0
+
+
+def completion_request(messages, max_tokens=MAX_TOKENS, structured=False, model=MODEL, tool=EVALUATION_TOOL):
+    """Chat completion parameters with the configured model settings.
+
+    The cache key routes requests sharing a system prompt to the same
+    provider-side prompt cache. Structured requests force the tool
+    (submit_evaluation by default) so the reply arrives as JSON arguments.
+    """
+    request = {
+        'model': model,
+        'messages': messages,
+        'max_tokens': max_tokens,
+        'temperature': TEMPERATURE,
+        'prompt_cache_key': prompt_fingerprint(messages[0]['content']),
+    }
+    if structured:
+        tool_choice = EVALUATION_TOOL_CHOICE if tool is EVALUATION_TOOL else {'type': 'function', 'function': {'name': tool['function']['name']}}
+        request.update(tools=[tool], tool_choice=tool_choice)
+    return request
+
+
+def request_completion(messages, max_tokens=MAX_TOKENS, stream=False, structured=False, model=MODEL, tool=EVALUATION_TOOL,
+                       timings=None):
+    """One chat completion built by completion_request.
+    
+    Calls are scheduled by the shared rate limiter, which also retries
+    429s and transient server errors. With a timings dict, rate limiter
+    waits go to its 'queue' stage and, unless streaming, the rest of the
+    call to 'completion'.
+    """
+    request = completion_request(messages, max_tokens, structured, model, tool)
+    if stream:
+        request['stream_options'] = {'include_usage': True}
+    # TPM is charged for the prompt plus the max_tokens reservation
+    tokens = sum(count_tokens(message['content'], model) for message in messages) + max_tokens
+    create = lambda: get_client().chat.completions.with_raw_response.create(stream=stream, **request)
+    if timings is None:
+        return get_limiter().call(create, tokens, stream)
+    start = time.perf_counter()
+    queued = timings.get('queue', 0.0)
+    response = get_limiter().call(create, tokens, stream, timings)
+    if not stream:
+        timings['completion'] = timings.get('completion', 0.0) + time.perf_counter() - start - (timings['queue'] - queued)
+    return response
+
+
+def summarize_long_content(content_data, budget, prompt, usage):
+    """Map-reduce pre-pass for content that doesn't fit in one request.
+    
+    Section-aligned chunks are evaluated in parallel into compact notes, which
+    are combined until they fit; the result is the user message for the final
+    full-report request.
+    """
+    words = MAP_MAX_TOKENS * 3 // 4
+    header = build_content_to_evaluate({**content_data, 'content': ''})
+    overhead = count_tokens(header + MAP_INSTRUCTIONS + REDUCE_INSTRUCTIONS, MODEL)
+    chunks = chunk_content(content_data['content'], budget - overhead, MODEL)
+    
+    def complete(message):
+        return request_completion(build_messages(message, prompt), max_tokens=MAP_MAX_TOKENS)
+    
+    def map_chunk(item):
+        index, chunk = item
+        instructions = MAP_INSTRUCTIONS.format(index=index, total=len(chunks), words=words)
+        return complete(build_content_to_evaluate({**content_data, 'content': chunk}) + "\n" + instructions)
+    
+    def combine(group):
+        return complete(header + "\n" + COMBINE_INSTRUCTIONS.format(words=words) + "\n" + format_notes(group))
+    
+    def collect(responses):
+        notes = []
+        for response in responses:
+            add_usage(usage, response.usage)
+            notes.append(response.choices[0].message.content)
+        return notes
+    
+    with ThreadPoolExecutor(max_workers=CHUNK_WORKERS) as pool:
+        notes = collect(pool.map(map_chunk, enumerate(chunks, 1)))
+        while len(notes) > 1 and count_tokens(format_notes(notes), MODEL) + overhead > budget:
+            notes = collect(pool.map(combine, group_notes(notes, budget - overhead, MODEL)))
+    
+    return header + "\n" + REDUCE_INSTRUCTIONS.format(total=len(chunks)) + "\n" + format_notes(notes)
+
+
+def prepare_user_message(content_data, content_to_evaluate, prompt, usage, timings=None):
+    """The user message for the final request, map-reducing content that is over budget"""
+    timings = {} if timings is None else timings
+    with timed(timings, 'prompt'):
+        budget = content_budget(MODEL, prompt, MAX_TOKENS)
+        fits = count_tokens(content_to_evaluate, MODEL) <= budget
+    if fits:
+        return content_to_evaluate
+    with timed(timings, 'summarize'):
+        return summarize_long_content(content_data, budget, prompt, usage)
+
+
+def read_cached_evaluation(result, cached, structured):
+    """Fill result from a cached evaluation"""
+    result['cache_hit'] = True
+    if structured:
+        result['report'] = json.loads(cached)
+        result['evaluation'] = render_markdown(result['report'])
+    else:
+        result['evaluation'] = cached
+
+
+def read_evaluation_response(result, response, structured, cache_key, prompt):
+    """Fill result from the final evaluation response, and cache it.
+
+    Raises ValueError, leaving result untouched, if the response holds no
+    usable evaluation; its usage is only counted once it parses, so a
+    retried response is not billed twice.
+    """
+    message = response.choices[0].message
+    if structured:
+        if not message.tool_calls:
+            raise ValueError("Model did not return a structured evaluation")
+        report = parse_report(message.tool_calls[0].function.arguments)
+        result['report'] = report
+        result['evaluation'] = render_markdown(report)
+        get_cache().put(cache_key, json.dumps(report), MODEL, prompt_fingerprint(prompt))
+    else:
+        if not message.content:
+            raise ValueError(f"Model returned an empty evaluation (finish reason: {response.choices[0].finish_reason or 'unknown'})")
+        result['evaluation'] = message.content
+        get_cache().put(cache_key, result['evaluation'], MODEL, prompt_fingerprint(prompt))
+    add_usage(result['usage'], response.usage)
+
+
+def run_evaluation(content_data, prompt_variant=None, structured=None):
+    """Evaluate content; returns the report with token usage and latency, or {'error': ...}.
+    
+    In structured mode the result also carries 'report', the parsed JSON
+    evaluation (see report.py), and 'evaluation' is rendered from it.
+    'timings' holds the seconds each stage took.
+    """
+    if 'error' in content_data:
+        return {'error': f"Error extracting content: {content_data['error']}"}
+    
+    start = time.perf_counter()
+    timings = {}
+    result = {'model': MODEL, 'prompt_variant': prompt_variant or PROMPT_VARIANT, 'usage': new_usage(), 'cache_hit': False}
+    try:
+        structured = STRUCTURED_OUTPUT if structured is None else structured
+        with timed(timings, 'prompt'):
+            prompt = get_prompt(prompt_variant, content_data)
+            content_to_evaluate = build_content_to_evaluate(content_data)
+        
+        cache = get_cache()
+        output_format = 'json' if structured else 'markdown'
+        with timed(timings, 'cache_lookup'):
+            cache_key = make_cache_key(content_to_evaluate, MODEL, TEMPERATURE, prompt, output_format)
+            cached = cache.get(cache_key)
+        if cached is not None:
+            read_cached_evaluation(result, cached, structured)
+        else:
+            user_message = prepare_user_message(content_data, content_to_evaluate, prompt, result['usage'], timings)
+            if structured:
+                user_message += STRUCTURED_INSTRUCTIONS
+            response = request_completion(build_messages(user_message, prompt), structured=structured, timings=timings)
+            read_evaluation_response(result, response, structured, cache_key, prompt)
+        
+        timings['total'] = time.perf_counter() - start
+        result['latency_seconds'] = round(timings['total'], 2)
+        result['timings'] = rounded(timings)
+        result['tiers'] = {'premium': tier_entry(MODEL, result['usage'], result['latency_seconds'])}
+        get_metrics().observe('evaluation', timings, 'cache_hit' if result['cache_hit'] else 'ok', content_data.get('url'),
+                              MODEL, result['usage'])
+        return result
+    except Exception as e:
+        timings['total'] = time.perf_counter() - start
+        get_metrics().observe('evaluation', timings, 'error', content_data.get('url'), MODEL, result['usage'])
+        return {'error': f"Error during evaluation: {str(e)}"}
+
+
+def run_triage(content_data):
+    """Fast-tier first pass: {'triage': {score, ymyl, page_type, verdict, problems}, usage, latency}, or {'error': ...}.
+    
+    Only the opening TRIAGE_CONTENT_TOKENS of the content are sent.
+    """
+    start = time.perf_counter()
+    timings = {}
+    result = {'model': FAST_MODEL, 'usage': new_usage(), 'cache_hit': False}
+    try:
+        with timed(timings, 'prompt'):
+            budget = min(TRIAGE_CONTENT_TOKENS, content_budget(FAST_MODEL, TRIAGE_PROMPT, FAST_MAX_TOKENS))
+            content = content_data['content']
+            if count_tokens(content, FAST_MODEL) > budget:
+                content = chunk_content(content, budget, FAST_MODEL)[0]
+            content_to_evaluate = build_content_to_evaluate({**content_data, 'content': content})
+        
+        cache = get_cache()
+        with timed(timings, 'cache_lookup'):
+            cache_key = make_cache_key(content_to_evaluate, FAST_MODEL, TEMPERATURE, TRIAGE_PROMPT, 'triage')
+            cached = cache.get(cache_key)
+        if cached is not None:
+            result.update(cache_hit=True, triage=json.loads(cached))
+        else:
+            response = request_completion(build_messages(content_to_evaluate, TRIAGE_PROMPT), max_tokens=FAST_MAX_TOKENS,
+                                          structured=True, model=FAST_MODEL, tool=TRIAGE_TOOL, timings=timings)
+            add_usage(result['usage'], response.usage)
+            message = response.choices[0].message
+            if not message.tool_calls:
+                raise ValueError("Model did not return a triage")
+            result['triage'] = parse_triage(message.tool_calls[0].function.arguments)
+            cache.put(cache_key, json.dumps(result['triage']), FAST_MODEL, prompt_fingerprint(TRIAGE_PROMPT))
+        
+        timings['total'] = time.perf_counter() - start
+        result['latency_seconds'] = round(timings['total'], 2)
+        result['timings'] = rounded(timings)
+        get_metrics().observe('triage', timings, 'cache_hit' if result['cache_hit'] else 'ok', content_data.get('url'),
+                              FAST_MODEL, result['usage'])
+        return result
+    except Exception as e:
+        timings['total'] = time.perf_counter() - start
+        get_metrics().observe('triage', timings, 'error', content_data.get('url'), FAST_MODEL, result['usage'])
+        return {'error': f"Error during triage: {str(e)}"}
+
+
+def run_fanout_evaluation(content_data, prompt_variant=None, structured=None):
+    """run_evaluation with one concurrent request per rubric category, assembled into one report.
+    
+    Every request sends the same system prompt and page message, so they
+    share the provider's prompt cache, and ends with its category's
+    instructions. Priorities are derived locally from the fixes each
+    category classified. The result is always a structured report.
+    Categories are cached one by one, so a retry only repeats the ones
+    that failed. Latency is that of the slowest category: 'queue' and
+    'completion' are the slowest request's, 'fanout' is the wall-clock
+    time of all of them, and 'category_seconds' has each category's.
+    """
+    if 'error' in content_data:
+        return {'error': f"Error extracting content: {content_data['error']}"}
+    
+    start = time.perf_counter()
+    timings = {}
+    result = {'model': MODEL, 'prompt_variant': prompt_variant or PROMPT_VARIANT, 'usage': new_usage(), 'cache_hit': False,
+              'fanout': True, 'category_seconds': {}}
+    try:
+        with timed(timings, 'prompt'):
+            prompt = get_prompt(prompt_variant, content_data)
+            content_to_evaluate = build_content_to_evaluate(content_data)
+        
+        cache = get_cache()
+        cache_keys = {}
+        categories = {}
+        with timed(timings, 'cache_lookup'):
+            for key in CATEGORY_KEYS:
+                cache_keys[key] = make_cache_key(content_to_evaluate, MODEL, TEMPERATURE, prompt + category_instructions(key), 'json')
+                cached = cache.get(cache_keys[key], count=False)
+                if cached is not None:
+                    categories[key] = parse_category(cached)
+        missing = [key for key in CATEGORY_KEYS if key not in categories]
+        result['cache_hit'] = not missing
+        # One lookup per page, like the other modes: a hit only when no category needs a request
+        cache.record_lookup(result['cache_hit'])
+        
+        if missing:
+            messages = build_messages(prepare_user_message(content_data, content_to_evaluate, prompt, result['usage'], timings), prompt)
+            
+            def evaluate_category(key):
+                category_start = time.perf_counter()
+                category_timings = {}
+                response = request_completion(messages + [{'role': 'user', 'content': category_instructions(key)}],
+                                              max_tokens=FANOUT_MAX_TOKENS, structured=True, tool=CATEGORY_TOOL,
+                                              timings=category_timings)
+                message = response.choices[0].message
+                if not message.tool_calls:
+                    raise ValueError(f"Model did not return the {CATEGORY_NAMES[key]} evaluation")
+                arguments = message.tool_calls[0].function.arguments
+                category = parse_category(arguments)
+                cache.put(cache_keys[key], arguments, MODEL, prompt_fingerprint(prompt))
+                return key, category, response.usage, category_timings, time.perf_counter() - category_start
+            
+            with timed(timings, 'fanout'), ThreadPoolExecutor(max_workers=FANOUT_WORKERS) as pool:
+                for key, category, usage, category_timings, seconds in pool.map(evaluate_category, missing):
+                    categories[key] = category
+                    add_usage(result['usage'], usage)
+                    for stage in ('queue', 'completion'):
+                        timings[stage] = max(timings.get(stage, 0.0), category_timings.get(stage, 0.0))
+                    result['category_seconds'][key] = round(seconds, 3)
+        
+        result['report'] = assemble_report(categories)
+        result['evaluation'] = render_markdown(result['report'])
+        timings['total'] = time.perf_counter() - start
+        result['latency_seconds'] = round(timings['total'], 2)
+        result['timings'] = rounded(timings)
+        result['tiers'] = {'premium': tier_entry(MODEL, result['usage'], result['latency_seconds'])}
+        get_metrics().observe('evaluation', timings, 'cache_hit' if result['cache_hit'] else 'ok', content_data.get('url'),
+                              MODEL, result['usage'])
+        return result
+    except Exception as e:
+        timings['total'] = time.perf_counter() - start
+        get_metrics().observe('evaluation', timings, 'error', content_data.get('url'), MODEL, result['usage'])
+        return {'error': f"Error during evaluation: {str(e)}"}
+
+
+def run_cascade_evaluation(content_data, prompt_variant=None, structured=None, fanout=False):
+    """Triage with the fast model and escalate to run_evaluation only when the triage is uncertain.
+    
+    Pages whose triage score falls in the escalation band, that are flagged
+    YMYL, or whose triage failed get the premium full-rubric evaluation
+    (run_fanout_evaluation with fanout).
+    The result carries 'tier' (the tier that produced the evaluation),
+    'triage', 'escalation' (the reason, or None) and per-tier accounting in
+    'tiers'; 'usage' totals both tiers.
+    """
+    if 'error' in content_data:
+        return {'error': f"Error extracting content: {content_data['error']}"}
+    
+    triage = run_triage(content_data)
+    tiers = {}
+    if 'error' not in triage:
+        tiers['fast'] = tier_entry(FAST_MODEL, triage['usage'], triage['latency_seconds'])
+        reason = escalation_reason(triage['triage'])
+        if reason is None:
+            return {
+                'model': FAST_MODEL,
+                'prompt_variant': None,
+                'usage': triage['usage'],
+                'cache_hit': triage['cache_hit'],
+                'evaluation': render_triage(triage['triage'], FAST_MODEL),
+                'latency_seconds': triage['latency_seconds'],
+                'timings': triage['timings'],
+                'tier': 'fast',
+                'triage': triage['triage'],
+                'escalation': None,
+                'tiers': tiers,
+            }
+    else:
+        reason = 'triage_failed'
+    
+    result = (run_fanout_evaluation if fanout else run_evaluation)(content_data, prompt_variant, structured)
+    if 'error' in result:
+        return result
+    usage = dict(result['usage'])
+    if 'fast' in tiers:
+        for key in usage:
+            usage[key] += triage['usage'][key]
+    latency = result['latency_seconds'] + triage.get('latency_seconds', 0.0)
+    return {
+        **result,
+        'usage': usage,
+        'latency_seconds': round(latency, 2),
+        # The premium stages, after the triage as a whole
+        'timings': {'triage': triage.get('latency_seconds', 0.0), **result['timings'], 'total': round(latency, 3)},
+        'tier': 'premium',
+        'triage': triage.get('triage'),
+        'escalation': reason,
+        'tiers': {**tiers, **result['tiers']},
+    }
+
+
+def run_precheck_only(content_data, prompt_variant=None, structured=None):
+    """Deterministic metadata and structure pre-checks alone, without a model call.
+    
+    Takes the same arguments as run_evaluation so it can stand in for it;
+    the prompt options don't apply. Content without HTML has no signals.
+    """
+    if 'error' in content_data:
+        return {'error': f"Error extracting content: {content_data['error']}"}
+    if not content_data.get('signals'):
+        return {'error': "Pre-checks need an HTML page; no signals were measured for this content"}
+    start = time.perf_counter()
+    evaluation = render_precheck_report(content_data['signals'])
+    return {
+        'model': 'prechecks',
+        'prompt_variant': None,
+        'usage': new_usage(),
+        'cache_hit': False,
+        'evaluation': evaluation,
+        'latency_seconds': round(time.perf_counter() - start, 2)
+    }
+
+
+def evaluation_config(prompt_variant=None, structured=None, cascade=False, fanout=False, content_data=None):
+    """Everything besides the content that shapes an evaluation, as one string"""
+    structured = STRUCTURED_OUTPUT if structured is None else structured
+    output_format = 'fanout' if fanout else 'json' if structured else 'markdown'
+    config = f"{MODEL}:{TEMPERATURE}:{prompt_fingerprint(get_prompt(prompt_variant, content_data))}:{output_format}"
+    return config + f":cascade:{cascade_config()}" if cascade else config
+
+
+def run_incremental_evaluation(content_data, prompt_variant=None, structured=None, cascade=False, fanout=False):
+    """run_evaluation (or the cascade or fan-out) that keeps a URL's previous result when its content hasn't materially changed.
+    
+    The result carries 'audit' ('new', 'changed' or 'unchanged') and
+    'change', the share of content that differs from the last evaluated copy.
+    Content without a real URL is always evaluated.
+    """
+    if cascade:
+        evaluate = functools.partial(run_cascade_evaluation, fanout=fanout)
+    else:
+        evaluate = run_fanout_evaluation if fanout else run_evaluation
+    url = content_data.get('url', '')
+    if 'error' in content_data or not url.startswith(('http://', 'https://')):
+        return evaluate(content_data, prompt_variant, structured)
+    
+    audit = get_site_audit()
+    config = evaluation_config(prompt_variant, structured, cascade, fanout, content_data)
+    status, change, stored = audit.check(url, content_data['content'], config)
+    if status == 'unchanged':
+        audit.touch(url)
+        return {**stored, 'usage': new_usage(), 'cache_hit': False, 'latency_seconds': 0.0, 'audit': status, 'change': change}
+    
+    result = evaluate(content_data, prompt_variant, structured)
+    if 'error' not in result:
+        audit.save(url, content_data['content'], config, {key: value for key, value in result.items() if key not in ('usage', 'tiers', 'timings')})
+    return {**result, 'audit': status, 'change': change}
+
+
+def select_evaluation(precheck_only=False, cascade=False, incremental=False, fanout=False):
+    """The run_* function for a mode; each takes (content_data, prompt_variant, structured)"""
+    if precheck_only:
+        return run_precheck_only
+    if incremental:
+        return functools.partial(run_incremental_evaluation, cascade=cascade, fanout=fanout)
+    if cascade:
+        return functools.partial(run_cascade_evaluation, fanout=fanout)
+    return run_fanout_evaluation if fanout else run_evaluation
+
+
+def evaluate_content(content_data):
+    """Send content to OpenAI for evaluation"""
+    result = run_evaluation(content_data)
+    return result.get('evaluation', result.get('error'))
+
+
+def stream_evaluation(content_data, prompt_variant=None, result=None):
+    """Yield the evaluation text piece by piece as the model writes it.
+    
+    Errors are raised to the caller so it can keep whatever arrived so far.
+    Only complete evaluations are written to the cache; a stream that ends
+    without any text (an empty or filtered completion) is an error. Usage,
+    latency and stage timings are recorded into the optional result dict as
+    they become known; 'first_token' is the wait for the first text after the
+    request left the queue, and 'generation' the rest of the stream.
+    """
+    result = result if result is not None else {}
+    start = time.perf_counter()
+    timings = {}
+    result.update(model=MODEL, prompt_variant=prompt_variant or PROMPT_VARIANT, usage=new_usage(), cache_hit=False)
+    
+    def finish(outcome):
+        timings['total'] = time.perf_counter() - start
+        result.update(latency_seconds=round(timings['total'], 2), timings=rounded(timings))
+        get_metrics().observe('evaluation', timings, outcome, content_data.get('url'), MODEL, result['usage'])
+    
+    try:
+        with timed(timings, 'prompt'):
+            prompt = get_prompt(prompt_variant, content_data)
+            content_to_evaluate = build_content_to_evaluate(content_data)
+        
+        cache = get_cache()
+        with timed(timings, 'cache_lookup'):
+            cache_key = make_cache_key(content_to_evaluate, MODEL, TEMPERATURE, prompt)
+            cached = cache.get(cache_key)
+        if cached is not None:
+            result['cache_hit'] = True
+            finish('cache_hit')
+            yield cached
+            return
+        
+        user_message = prepare_user_message(content_data, content_to_evaluate, prompt, result['usage'], timings)
+        requested = time.perf_counter()
+        parts = []
+        finish_reason = None
+        # Closing the stream gives its rate limiter slot back even if this generator is abandoned mid-way
+        with request_completion(build_messages(user_message, prompt), stream=True, timings=timings) as stream:
+            for chunk in stream:
+                if chunk.usage:
+                    add_usage(result['usage'], chunk.usage)
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not parts:
+                        first_token = time.perf_counter()
+                        timings['first_token'] = first_token - requested - timings['queue']
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+        if not parts:
+            raise ValueError(f"Model returned an empty evaluation (finish reason: {finish_reason or 'unknown'})")
+        timings['generation'] = time.perf_counter() - first_token
+    except Exception:
+        finish('error')
+        raise
+    
+    finish('ok')
+    cache.put(cache_key, ''.join(parts), MODEL, prompt_fingerprint(prompt))
@@ -0,0 +1,202 @@
+import csv
+import datetime
+import json
+import os
+import time
+import uuid
+
+from history import result_scores
+from report import CATEGORY_KEYS, PRIORITY_LEVELS, parse_priorities
+from storage import data_path
+
+# Parquet needs pyarrow; CSV and JSONL exports work without it
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Export files written for the app's downloads, removed once older than EXPORT_MAX_AGE_DAYS
+EXPORT_DIR = os.getenv('EXPORT_DIR', data_path('exports'))
+EXPORT_MAX_AGE_DAYS = float(os.getenv('EXPORT_MAX_AGE_DAYS', '7'))
+# Rows buffered per Parquet row group; memory is bounded by this, not by the size of the export
+PARQUET_ROW_GROUP_ROWS = int(os.getenv('PARQUET_ROW_GROUP_ROWS', '5000'))
+
+EXPORT_FORMATS = ['csv', 'jsonl', 'parquet']
+EXPORT_MIME_TYPES = {'csv': 'text/csv', 'jsonl': 'application/jsonl', 'parquet': 'application/vnd.apache.parquet'}
+
+# One row per evaluated page. priorities ([{level, category, fix}]) and timings
+# ({'fetch': {stage: seconds}, 'evaluation': {...}}) are nested in JSONL and JSON text in CSV and Parquet.
+SCORE_COLUMNS = [f'{key}_score' for key in CATEGORY_KEYS]
+PRIORITY_COUNT_COLUMNS = [f'{level.lower()}_priorities' for level in PRIORITY_LEVELS]
+EXPORT_COLUMNS = [
+    'url', 'title', 'status', 'error', 'evaluated_at', 'model', 'prompt_variant', 'tier', 'source', 'cache_hit',
+    'overall_score', *SCORE_COLUMNS, *PRIORITY_COUNT_COLUMNS, 'priorities', 'prompt_tokens', 'cached_tokens',
+    'completion_tokens', 'cost_usd', 'fetch_seconds', 'eval_seconds', 'timings',
+]
+JSON_COLUMNS = {'priorities', 'timings'}
+INTEGER_COLUMNS = {*SCORE_COLUMNS, *PRIORITY_COUNT_COLUMNS, 'prompt_tokens', 'cached_tokens', 'completion_tokens'}
+FLOAT_COLUMNS = {'overall_score', 'cost_usd', 'fetch_seconds', 'eval_seconds'}
+
+
+def available_formats():
+    """Export formats usable in this environment"""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or pyarrow is not None]
+
+
+def export_format(path):
+    """Export format for a file name, from its extension"""
+    fmt = os.path.splitext(path)[1].lower().lstrip('.')
+    fmt = {'ndjson': 'jsonl', 'pq': 'parquet'}.get(fmt, fmt)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format for {path}; use one of: {', '.join('.' + fmt for fmt in EXPORT_FORMATS)}")
+    return fmt
+
+
+def export_path(name, fmt):
+    """A new file in EXPORT_DIR for an app download, pruning exports older than EXPORT_MAX_AGE_DAYS"""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    cutoff = time.time() - EXPORT_MAX_AGE_DAYS * 86400
+    for entry in os.scandir(EXPORT_DIR):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+    return os.path.join(EXPORT_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.{fmt}")
+
+
+def priority_columns(priorities):
+    """The priorities and their count per level"""
+    counts = {column: 0 for column in PRIORITY_COUNT_COLUMNS}
+    for priority in priorities:
+        if priority['level'] in PRIORITY_LEVELS:
+            counts[f"{priority['level'].lower()}_priorities"] += 1
+    return {**counts, 'priorities': priorities}
+
+
+def export_row(row, source=''):
+    """Export columns for a bulk result row (see bulk.result_row), evaluated now"""
+    scores, overall = result_scores(row) if row['status'] == 'ok' else ({}, None)
+    report = row.get('report')
+    priorities = report['priorities'] if report else parse_priorities(row.get('evaluation') or '')
+    return {
+        'url': row['url'],
+        'title': row.get('title', ''),
+        'status': row['status'],
+        'error': row.get('error', ''),
+        'evaluated_at': time.time(),
+        'model': row.get('model', ''),
+        'prompt_variant': row.get('prompt_variant', ''),
+        'tier': row.get('tier', ''),
+        'source': source,
+        'cache_hit': bool(row.get('cache_hit')),
+        'overall_score': overall,
+        **{f'{key}_score': scores.get(key) for key in CATEGORY_KEYS},
+        **priority_columns(priorities),
+        'prompt_tokens': row.get('prompt_tokens', 0),
+        'cached_tokens': row.get('cached_tokens', 0),
+        'completion_tokens': row.get('completion_tokens', 0),
+        'cost_usd': row.get('cost_usd'),
+        'fetch_seconds': row.get('fetch_seconds'),
+        'eval_seconds': row.get('eval_seconds'),
+        'timings': row.get('timings'),
+    }
+
+
+def history_export_row(entry):
+    """Export columns for a history entry with its report (see EvaluationHistory.export); history keeps no timings"""
+    priorities = entry['report']['priorities'] if entry.get('report') else parse_priorities(entry.get('evaluation') or '')
+    return {
+        **{column: entry.get(column) for column in EXPORT_COLUMNS if column in entry},
+        'status': 'ok',
+        'error': '',
+        'cache_hit': bool(entry.get('cache_hit')),
+        **priority_columns(priorities),
+        'fetch_seconds': None,
+        'eval_seconds': entry.get('latency_seconds'),
+        'timings': None,
+    }
+
+
+def _iso_time(epoch):
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).isoformat(timespec='seconds')
+
+
+def _parquet_schema():
+    def column_type(column):
+        if column == 'evaluated_at':
+            return pyarrow.timestamp('ms', tz='UTC')
+        if column == 'cache_hit':
+            return pyarrow.bool_()
+        if column in INTEGER_COLUMNS:
+            return pyarrow.int64()
+        if column in FLOAT_COLUMNS:
+            return pyarrow.float64()
+        return pyarrow.string()
+    return pyarrow.schema([(column, column_type(column)) for column in EXPORT_COLUMNS])
+
+
+class ExportWriter:
+    """Streams export rows (see export_row) to a CSV, JSONL or Parquet file.
+
+    CSV and JSONL rows go straight to the file; Parquet rows are written one
+    row group of PARQUET_ROW_GROUP_ROWS at a time. Either way memory stays
+    flat however many pages are exported. Use it as a context manager, or
+    call close() to finish the file.
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.format = fmt or export_format(path)
+        self.rows = 0
+        if self.format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {self.format}")
+        if self.format == 'parquet' and pyarrow is None:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.format == 'parquet':
+            self._schema = _parquet_schema()
+            self._parquet = pyarrow.parquet.ParquetWriter(path, self._schema)
+            self._buffer = []
+        else:
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+            if self.format == 'csv':
+                self._csv = csv.DictWriter(self._file, EXPORT_COLUMNS, extrasaction='ignore')
+                self._csv.writeheader()
+
+    def write(self, row):
+        """Add one export row"""
+        self.rows += 1
+        if self.format == 'jsonl':
+            self._file.write(json.dumps({**row, 'evaluated_at': _iso_time(row['evaluated_at'])}) + '\n')
+            return
+        row = {
+            **row,
+            **{column: None if row.get(column) is None else json.dumps(row[column]) for column in JSON_COLUMNS},
+        }
+        if self.format == 'csv':
+            self._csv.writerow({**row, 'evaluated_at': _iso_time(row['evaluated_at'])})
+            return
+        row['evaluated_at'] = datetime.datetime.fromtimestamp(row['evaluated_at'], datetime.timezone.utc)
+        self._buffer.append(row)
+        if len(self._buffer) >= PARQUET_ROW_GROUP_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._parquet.write_table(pyarrow.Table.from_pylist(self._buffer, schema=self._schema))
+            self._buffer = []
+
+    def close(self):
+        """Finish the file"""
+        if self.format == 'parquet':
+            self._flush()
+            self._parquet.close()
+        else:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,620 @@
+import codecs
+import importlib.util
+import itertools
+import os
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urldefrag, urlparse
+
+from bs4 import BeautifulSoup, NavigableString
+from bs4.element import PreformattedString
+
+from prechecks import analyze_html, build_signals, json_ld_types, link_kind
+from metrics import timed
+
+# Prefer lxml when installed; it parses large pages several times faster
+PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+EXTRACTION_ENGINE = os.getenv('EXTRACTION_ENGINE', 'main')
+# Hard cap on extracted text; long pages are chunked rather than truncated
+MAX_CONTENT_CHARS = int(os.getenv('MAX_CONTENT_CHARS', '200000'))
+# Bodies up to this size get a full parse tree; bigger ones are parsed incrementally
+# in bounded memory, stopping once MAX_CONTENT_CHARS of text are in (0 = always)
+FULL_PARSE_MAX_BYTES = int(os.getenv('FULL_PARSE_MAX_BYTES', str(1024 * 1024)))
+
+# Never content, whatever engine runs
+NON_CONTENT_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'form', 'button', 'select', 'textarea']
+# Page chrome around the main content
+BOILERPLATE_TAGS = ['nav', 'header', 'footer', 'aside']
+BOILERPLATE_ROLES = {'navigation', 'banner', 'contentinfo', 'complementary', 'search', 'dialog', 'alertdialog'}
+BOILERPLATE_PATTERN = re.compile(
+    r'cookie|consent|gdpr|banner|newsletter|subscribe|sidebar|widget|footer|masthead|'
+    r'\bnav|menu|breadcrumb|share|social|related|comment|popup|modal|advert|\bads?\b|promo|sponsor',
+    re.I
+)
+
+BLOCK_TAGS = {
+    'address', 'article', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'main', 'ol', 'p', 'pre', 'section',
+    'table', 'td', 'th', 'tr', 'ul',
+}
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+PARAGRAPH_TAGS = ['p', 'pre', 'blockquote', 'td', 'li']
+CANDIDATE_TAGS = {'article', 'div', 'main', 'section', 'td', 'body'}
+# Links kept per page for crawling; navigation-heavy pages can have thousands
+MAX_LINKS = int(os.getenv('MAX_LINKS', '1000'))
+MIN_PARAGRAPH_CHARS = 25
+MIN_MAIN_CHARS = 250
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+def parse_html(html):
+    """Parse a document with the fastest available backend"""
+    return BeautifulSoup(html, PARSER)
+
+
+def _clean_lines(lines):
+    text = '\n'.join(line for line in lines if line)
+    return re.sub(r'\n{3,}', '\n\n', text)
+
+
+def extract_fulltext(soup):
+    """Whole-document text, as the tool has always produced it"""
+    for tag in soup(['script', 'style']):
+        tag.decompose()
+    lines = (line.strip() for line in soup.get_text().splitlines())
+    return _clean_lines(phrase.strip() for line in lines for phrase in line.split("  "))
+
+
+def _is_boilerplate(tag):
+    if tag.name in BOILERPLATE_TAGS:
+        # <header>/<footer> inside an article belong to the article
+        return tag.name in ('nav', 'aside') or tag.find_parent(['article', 'main']) is None
+    if tag.get('role') in BOILERPLATE_ROLES:
+        return True
+    if tag.name in ('body', 'html', 'main', 'article'):
+        return False
+    attrs = ' '.join(tag.get('class') or []) + ' ' + (tag.get('id') or '')
+    return bool(attrs.strip()) and bool(BOILERPLATE_PATTERN.search(attrs))
+
+
+def _landmark_holders(soup):
+    """ids of the tags with a <main> or <article> somewhere below them"""
+    holders = set()
+    for landmark in soup.find_all(['main', 'article']):
+        parent = landmark.parent
+        while parent is not None and id(parent) not in holders:
+            holders.add(id(parent))
+            parent = parent.parent
+    return holders
+
+
+def remove_boilerplate(soup):
+    """Drop non-content elements and page chrome (navigation, banners, sidebars, footers)"""
+    # Collect first and decompose at the end; descendants of a dropped element are skipped
+    dropped = []
+    dropped_ids = set()
+    lengths = None
+    for tag in soup.find_all(True):
+        if id(tag.parent) in dropped_ids:
+            dropped_ids.add(id(tag))
+            continue
+        if tag.name not in NON_CONTENT_TAGS:
+            if not _is_boilerplate(tag):
+                continue
+            # Text lengths and landmark holders come from one pass over the page,
+            # not a subtree walk per boilerplate tag, which is quadratic in nesting depth
+            if lengths is None:
+                lengths = subtree_lengths(soup)
+                holders = _landmark_holders(soup)
+                max_chars = lengths[id(soup.body or soup)][0] // 2
+            if id(tag) in holders:
+                continue
+            # A wrapper like <div class="with-sidebar"> can hold most of the page; keep it
+            if lengths[id(tag)][0] > max_chars:
+                continue
+        dropped.append(tag)
+        dropped_ids.add(id(tag))
+
+    for tag in dropped:
+        tag.decompose()
+
+
+def _score_candidates(root):
+    """Readability-style scoring: paragraphs credit their parent and grandparent"""
+    tags = {}
+    scores = {}
+    for paragraph in root.find_all(PARAGRAPH_TAGS):
+        text = paragraph.get_text(' ', strip=True)
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + text.count(',') + min(len(text) // 100, 3)
+        parent = paragraph.parent
+        for weight in (1.0, 0.5):
+            if parent is None or parent.name not in CANDIDATE_TAGS:
+                break
+            tags[id(parent)] = parent
+            scores[id(parent)] = scores.get(id(parent), 0) + score * weight
+            parent = parent.parent
+    return [(tags[key], score) for key, score in scores.items()]
+
+
+def subtree_lengths(root):
+    """{id(tag): (text length, link text length)} for root and every tag under it, in one bottom-up pass.
+
+    Text length matches len(tag.get_text(strip=True)) and link length the
+    text of the <a> tags inside the tag. Computing them per tag instead
+    would walk a subtree once per ancestor, quadratic in nesting depth.
+    """
+    counted = root.interesting_string_types
+    lengths = {}
+    totals = {id(root): [0, 0]}
+    # Reverse document order reaches every node after all of its descendants
+    for node in reversed(list(root.descendants)):
+        parent = totals.setdefault(id(node.parent), [0, 0])
+        if isinstance(node, NavigableString):
+            if type(node) in counted:
+                parent[0] += len(node.strip())
+            continue
+        text_length, link_length = totals.pop(id(node), (0, 0))
+        lengths[id(node)] = (text_length, link_length)
+        parent[0] += text_length
+        parent[1] += link_length + (text_length if node.name == 'a' else 0)
+    lengths[id(root)] = tuple(totals[id(root)])
+    return lengths
+
+
+def _expand_to_container(tag, lengths):
+    """Climb to ancestors that only add a little non-link text, such as a headline or byline"""
+    text_length, link_length = lengths[id(tag)]
+    while tag.parent is not None and tag.parent.name not in ('body', 'html', '[document]') and id(tag.parent) in lengths:
+        parent = tag.parent
+        parent_text, parent_links = lengths[id(parent)]
+        extra = parent_text - text_length
+        if extra > text_length * 0.3 or parent_links - link_length > extra * 0.5:
+            break
+        tag, text_length, link_length = parent, parent_text, parent_links
+    return tag
+
+
+def find_main_content(soup):
+    """Locate the element holding the page's main content"""
+    landmarks = soup.find_all(lambda tag: tag.name in ('main', 'article') or tag.get('role') == 'main')
+    main = [tag for tag in landmarks if tag.name == 'main' or tag.get('role') == 'main']
+    articles = [tag for tag in landmarks if tag.name == 'article']
+    root = soup.body or soup
+    lengths = subtree_lengths(root)
+
+    for candidates in (main, articles):
+        if candidates:
+            sizes = [(lengths[id(tag)][0] if id(tag) in lengths else len(tag.get_text(strip=True)), index)
+                     for index, tag in enumerate(candidates)]
+            length, index = max(sizes)
+            if length >= MIN_MAIN_CHARS:
+                return candidates[index]
+
+    # No semantic markup: pick the densest block of prose
+    best, best_score = None, 0
+    for tag, score in _score_candidates(root):
+        text_length, link_length = lengths[id(tag)]
+        score *= 1 - link_length / (text_length or 1)
+        if score > best_score:
+            best, best_score = tag, score
+    return _expand_to_container(best, lengths) if best else root
+
+
+def render_text(root):
+    """Text of an element with one line per block and markdown-style headings"""
+    lines = []
+    current = []
+
+    def flush():
+        line = ' '.join(''.join(current).split())
+        if line:
+            lines.append(line)
+        current.clear()
+
+    # Iterative walk so deeply nested markup can't hit the recursion limit
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            flush()
+            continue
+        if isinstance(node, NavigableString):
+            # Comments, doctypes and CDATA aren't visible text
+            if not isinstance(node, PreformattedString):
+                current.append(str(node))
+            continue
+        if node.name in BLOCK_TAGS:
+            flush()
+            stack.append(None)
+        if node.name in HEADING_TAGS:
+            heading = node.get_text(' ', strip=True)
+            if heading:
+                lines.append('#' * HEADING_TAGS[node.name] + ' ' + heading)
+            continue
+        stack.extend(reversed(node.contents))
+
+    flush()
+    return _clean_lines(lines)
+
+
+def extract_main_content(soup):
+    """Main content only, with boilerplate stripped and headings kept as section markers"""
+    remove_boilerplate(soup)
+    return render_text(find_main_content(soup))
+
+
+ENGINES = {
+    'main': extract_main_content,
+    'fulltext': extract_fulltext,
+}
+
+
+def register_engine(name, fn):
+    """Plug in another extractor; fn takes a parsed soup and returns text"""
+    ENGINES[name] = fn
+
+
+def extract_text(soup, engine=None):
+    """Extract page text with the named engine (EXTRACTION_ENGINE by default)"""
+    return ENGINES[engine or EXTRACTION_ENGINE](soup)
+
+
+def page_links(soup, url):
+    """Canonical URL and the absolute http(s) links of a page, in document order"""
+    base = soup.find('base', href=True)
+    base_url = urljoin(url, base['href']) if base else url
+    canonical = soup.find('link', rel='canonical', href=True)
+    links = []
+    seen = set()
+    for link in soup.find_all('a', href=True):
+        if 'nofollow' in (link.get('rel') or []):
+            continue
+        target = urldefrag(urljoin(base_url, link['href'].strip()))[0]
+        if target.startswith(('http://', 'https://')) and target not in seen:
+            seen.add(target)
+            links.append(target)
+            if len(links) >= MAX_LINKS:
+                break
+    return (urljoin(base_url, canonical['href'].strip()) if canonical else None), links
+
+
+def extract_page(html, url, engine=None, timings=None):
+    """Title, meta description, main text, pre-check signals and links of a downloaded page.
+
+    With a timings dict, the seconds spent parsing, measuring signals and
+    extracting text are added to its 'parse', 'signals' and 'extract' stages.
+    """
+    timings = {} if timings is None else timings
+    with timed(timings, 'parse'):
+        soup = parse_html(html)
+
+    with timed(timings, 'signals'):
+        # Extract title
+        title = soup.find('title')
+        title_text = title.get_text().strip() if title else "No title found"
+
+        # Extract meta description
+        meta_desc = soup.find('meta', attrs={'name': 'description'})
+        meta_desc_text = meta_desc.get('content', '').strip() if meta_desc else "No meta description found"
+
+        # Measure before extraction, which strips the elements these come from
+        signals = analyze_html(soup, url)
+        canonical, links = page_links(soup, url)
+
+    engine = engine or EXTRACTION_ENGINE
+    with timed(timings, 'extract'):
+        content = extract_text(soup, engine)[:MAX_CONTENT_CHARS]
+    return {
+        'title': title_text,
+        'meta_description': meta_desc_text,
+        'content': content,
+        'url': url,
+        'extractor': engine,
+        'signals': signals,
+        'canonical': canonical,
+        'links': links
+    }
+
+
+def sniff_encoding(head, content_type=''):
+    """Character encoding of a page from its BOM, Content-Type header or <meta charset>, else UTF-8"""
+    for bom, name in ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')):
+        if head.startswith(bom):
+            return name
+    declared = re.search(r'charset=["\']?([\w-]+)', content_type or '', re.I)
+    sniffed = CHARSET_PATTERN.search(head[:4096])
+    for match in (declared, sniffed):
+        if match:
+            name = match.group(1)
+            name = name.decode('ascii') if isinstance(name, bytes) else name
+            try:
+                return codecs.lookup(name).name
+            except LookupError:
+                continue
+    return 'utf-8'
+
+
+class PageCollector:
+    """SAX-style target that turns parser events into page data without keeping a tree.
+
+    Text is rendered like render_text (a line per block, markdown
+    headings) into two buffers: everything outside boilerplate, and just
+    what is inside <main>/<article> landmarks. Each holds at most
+    max_chars; once the one that will be used is full, done is True and
+    the caller can stop feeding. With fulltext, only scripts and styles
+    are dropped, as extract_fulltext does.
+    """
+
+    def __init__(self, url, max_chars=MAX_CONTENT_CHARS, fulltext=False):
+        self.url = url
+        self.base_url = url
+        self.host = urlparse(url).netloc.lower()
+        self.max_chars = max_chars
+        self.fulltext = fulltext
+        # Open elements: (tag, hidden by a non-content tag, hidden as boilerplate, landmark)
+        self.stack = []
+        self.landmarks = 0
+        self.landmarks_seen = 0
+        self.lines = {'all': [], 'main': []}
+        self.chars = {'all': 0, 'main': 0}
+        self.current = []
+        self.current_chars = 0
+        self.heading = None
+        self.title = None
+        self.in_title = False
+        self.json_ld = None
+        self.facts = {'description': None, 'canonical': None, 'robots': None, 'headings': [], 'images': 0,
+                      'images_with_alt': 0, 'internal': 0, 'external': 0, 'json_ld': []}
+        self.links = []
+        self.seen_links = set()
+
+    @property
+    def done(self):
+        full = self.chars['main'] >= self.max_chars or (not self.landmarks_seen and self.chars['all'] >= self.max_chars)
+        return full if not self.fulltext else self.chars['all'] >= self.max_chars
+
+    def _hidden(self):
+        return bool(self.stack) and (self.stack[-1][1] or self.stack[-1][2])
+
+    def _emit(self, line):
+        for buffer in ('all', 'main') if self.landmarks else ('all',):
+            if self.chars[buffer] < self.max_chars:
+                self.lines[buffer].append(line)
+                self.chars[buffer] += len(line) + 1
+
+    def _flush(self):
+        line = ' '.join(''.join(self.current).split())
+        if line:
+            self._emit(line)
+        self.current.clear()
+        self.current_chars = 0
+
+    def start(self, tag, attrib):
+        tag = tag.lower()
+        attrib = {key: value or '' for key, value in attrib.items()}
+        self._collect_facts(tag, attrib)
+        if tag in VOID_TAGS:
+            if tag == 'br' and not self._hidden():
+                self._flush()
+            return
+
+        parent_hard, parent_soft = (self.stack[-1][1], self.stack[-1][2]) if self.stack else (False, False)
+        landmark = tag in ('main', 'article') or attrib.get('role') == 'main'
+        if self.fulltext:
+            hard, soft = parent_hard or tag in ('script', 'style', 'head'), False
+        else:
+            hard = parent_hard or tag in NON_CONTENT_TAGS or tag == 'head'
+            # Boilerplate hides its contents, except a landmark inside it (a wrapper like
+            # <div class="with-sidebar"> can hold the whole page)
+            soft = (parent_soft or self._is_boilerplate(tag, attrib)) and not landmark
+        self.stack.append((tag, hard, soft, landmark))
+
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if landmark:
+            self.landmarks += 1
+            self.landmarks_seen += 1
+        if tag in HEADING_TAGS:
+            self.facts['headings'].append(HEADING_TAGS[tag])
+            if not hard and not soft and self.heading is None:
+                self.heading = (HEADING_TAGS[tag], [])
+        elif tag == 'title' and self.title is None:
+            self.in_title = True
+            self.title = []
+        elif tag == 'script' and attrib.get('type') == 'application/ld+json':
+            self.json_ld = []
+
+    def _is_boilerplate(self, tag, attrib):
+        if tag in BOILERPLATE_TAGS:
+            return tag in ('nav', 'aside') or not self.landmarks
+        if attrib.get('role') in BOILERPLATE_ROLES:
+            return True
+        if tag in ('body', 'html', 'main', 'article'):
+            return False
+        attrs = attrib.get('class', '') + ' ' + attrib.get('id', '')
+        return bool(attrs.strip()) and bool(BOILERPLATE_PATTERN.search(attrs))
+
+    def _collect_facts(self, tag, attrib):
+        facts = self.facts
+        if tag == 'meta':
+            name = attrib.get('name', '').lower()
+            if name == 'description' and facts['description'] is None:
+                facts['description'] = attrib.get('content', '').strip()
+            elif name == 'robots' and facts['robots'] is None:
+                facts['robots'] = attrib.get('content', '')
+        elif tag == 'link' and 'canonical' in attrib.get('rel', '').lower().split() and facts['canonical'] is None:
+            facts['canonical'] = attrib.get('href') or None
+        elif tag == 'base' and attrib.get('href') and self.base_url == self.url:
+            self.base_url = urljoin(self.url, attrib['href'])
+        elif tag == 'img':
+            facts['images'] += 1
+            facts['images_with_alt'] += bool(attrib.get('alt', '').strip())
+        elif tag == 'a' and 'href' in attrib:
+            href = attrib['href']
+            kind = link_kind(href, self.host)
+            if kind:
+                facts[kind] += 1
+            if 'nofollow' in attrib.get('rel', '').lower().split() or len(self.links) >= MAX_LINKS:
+                return
+            target = urldefrag(urljoin(self.base_url, href.strip()))[0]
+            if target.startswith(('http://', 'https://')) and target not in self.seen_links:
+                self.seen_links.add(target)
+                self.links.append(target)
+
+    def end(self, tag):
+        tag = tag.lower()
+        # Unclosed children end with their parent; stray end tags are ignored
+        if not any(entry[0] == tag for entry in self.stack):
+            return
+        while self.stack:
+            entry = self.stack.pop()
+            self._close(entry)
+            if entry[0] == tag:
+                return
+
+    def _close(self, entry):
+        tag, _, _, landmark = entry
+        if tag in HEADING_TAGS and self.heading is not None and not any(open_tag in HEADING_TAGS for open_tag, *_ in self.stack):
+            level, parts = self.heading
+            self.heading = None
+            text = ' '.join(''.join(parts).split())
+            if text:
+                self._flush()
+                self._emit('#' * level + ' ' + text)
+        elif tag == 'title':
+            self.in_title = False
+        elif tag == 'script' and self.json_ld is not None:
+            self.facts['json_ld'].append(''.join(self.json_ld))
+            self.json_ld = None
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if landmark:
+            self.landmarks -= 1
+
+    def data(self, text):
+        if self.in_title:
+            self.title.append(text)
+        elif self.json_ld is not None:
+            self.json_ld.append(text)
+        if self._hidden() or (self.fulltext and self.in_title):
+            return
+        if self.heading is not None:
+            self.heading[1].append(text)
+            return
+        self.current.append(text)
+        self.current_chars += len(text)
+        # A huge run of text with no block tags still can't grow without bound
+        if self.current_chars > self.max_chars:
+            self._flush()
+
+    def close(self):
+        while self.stack:
+            self._close(self.stack.pop())
+        self._flush()
+
+    def page(self, engine):
+        """The collected page, in extract_page's format"""
+        main = self.lines['main'] if self.chars['main'] >= MIN_MAIN_CHARS and not self.fulltext else self.lines['all']
+        title = ''.join(self.title).strip() if self.title is not None else None
+        facts = self.facts
+        canonical = urljoin(self.base_url, facts['canonical'].strip()) if facts['canonical'] else None
+        return {
+            'title': title or "No title found",
+            'meta_description': facts['description'] or "No meta description found",
+            'content': _clean_lines(main)[:self.max_chars],
+            'url': self.url,
+            'extractor': engine,
+            'signals': build_signals(self.url, title, facts['description'] or '', facts['canonical'], facts['robots'],
+                                     facts['headings'], facts['images'], facts['images_with_alt'], facts['internal'],
+                                     facts['external'], json_ld_types(facts['json_ld'])),
+            'canonical': canonical,
+            'links': self.links,
+        }
+
+
+class _StdlibFeedParser(HTMLParser):
+    """html.parser driving a PageCollector, for when lxml isn't installed"""
+
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+        if tag not in VOID_TAGS:
+            self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+    def close(self):
+        super().close()
+        self.target.close()
+
+
+def _feed_parser(collector):
+    if PARSER == 'lxml':
+        from lxml import etree
+        return etree.HTMLParser(target=collector)
+    return _StdlibFeedParser(collector)
+
+
+def extract_page_incremental(chunks, url, content_type='', engine=None, timings=None):
+    """extract_page for a body arriving as byte chunks, in memory bounded by the content budget.
+
+    Chunks are decoded incrementally and fed to a streaming parser that
+    keeps no tree; reading stops once MAX_CONTENT_CHARS of text are in.
+    Without a tree the main content is the text inside <main>/<article>
+    landmarks when there is enough of it, else all text outside
+    boilerplate. Signals and links cover the part of the page read.
+    With a timings dict, its 'download' and 'parse' stages are added to.
+    """
+    timings = {} if timings is None else timings
+    engine = engine or EXTRACTION_ENGINE
+    collector = PageCollector(url, fulltext=engine == 'fulltext')
+    parser = _feed_parser(collector)
+    decoder = None
+    chunks = iter(chunks)
+    while not collector.done:
+        with timed(timings, 'download'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        with timed(timings, 'parse'):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(sniff_encoding(chunk, content_type))(errors='replace')
+            parser.feed(decoder.decode(chunk))
+    with timed(timings, 'parse'):
+        if decoder is not None:
+            parser.feed(decoder.decode(b'', final=True))
+            parser.close()
+        collector.close()
+    return {**collector.page(engine), 'streamed': True}
+
+
+def extract_body(chunks, url, content_type='', engine=None, timings=None):
+    """Extract a page from its body chunks: bodies up to FULL_PARSE_MAX_BYTES get
+    extract_page's full parse, and bigger ones extract_page_incremental"""
+    timings = {} if timings is None else timings
+    chunks = iter(chunks)
+    head = bytearray()
+    with timed(timings, 'download'):
+        for chunk in chunks:
+            head += chunk
+            if len(head) > FULL_PARSE_MAX_BYTES:
+                break
+    if len(head) <= FULL_PARSE_MAX_BYTES:
+        return extract_page(bytes(head), url, engine, timings)
+    first = bytes(head)
+    del head
+    return extract_page_incremental(itertools.chain([first], chunks), url, content_type, engine, timings)
@@ -0,0 +1,100 @@
+import json
+import os
+import re
+
+from prompts import RUBRIC
+from report import CATEGORIES, CATEGORY_KEYS, PRIORITY_LEVELS, string_list
+
+# Fan-out mode: one request per rubric category, run concurrently and assembled locally
+FANOUT = os.getenv('FANOUT', 'false').lower() in ('1', 'true', 'yes')
+# Output budget of each category request; a single category needs a fraction of the full report's
+FANOUT_MAX_TOKENS = int(os.getenv('FANOUT_MAX_TOKENS', '700'))
+FANOUT_WORKERS = int(os.getenv('FANOUT_WORKERS', str(len(CATEGORIES))))
+
+# The rubric's '### N. Name' sections, by category key
+_SECTION = re.compile(r'^### (\d)\. .*?(?=^---$)', re.M | re.S)
+CATEGORY_RUBRICS = {CATEGORY_KEYS[int(match.group(1)) - 1]: match.group(0).strip() for match in _SECTION.finditer(RUBRIC)}
+
+CATEGORY_INSTRUCTIONS = """
+Evaluate ONLY this category of the rubric now; the other categories are handled separately:
+
+{rubric}
+
+Submit it with the submit_category function: the score, the specific problems, and the
+fixes, each with its priority level as the rubric's Priorities section defines them
+(High, Medium or Low).
+"""
+
+CATEGORY_TOOL = {
+    'type': 'function',
+    'function': {
+        'name': 'submit_category',
+        'description': 'Submit the evaluation of one rubric category: score, problems and prioritized fixes.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'score': {'type': 'integer', 'minimum': 1, 'maximum': 10},
+                'problems': {'type': 'array', 'items': {'type': 'string'}},
+                'fixes': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'fix': {'type': 'string'},
+                            'level': {'type': 'string', 'enum': PRIORITY_LEVELS},
+                        },
+                        'required': ['fix', 'level'],
+                        'additionalProperties': False,
+                    },
+                },
+            },
+            'required': ['score', 'problems', 'fixes'],
+            'additionalProperties': False,
+        },
+    },
+}
+
+
+def category_instructions(key):
+    """The closing user message that scopes a request to one category"""
+    return CATEGORY_INSTRUCTIONS.format(rubric=CATEGORY_RUBRICS[key])
+
+
+def default_level(score):
+    """Priority of a fix the model didn't classify, from its category's score"""
+    return 'High' if score <= 4 else 'Medium' if score <= 7 else 'Low'
+
+
+def parse_category(arguments):
+    """Validate and normalize one category from the model's JSON arguments: score, problems and [(fix, level)]"""
+    data = json.loads(arguments) if isinstance(arguments, str) else dict(arguments)
+    if 'score' not in data:
+        raise ValueError("Category evaluation is missing a score")
+    score = min(10, max(1, int(data['score'])))
+    fixes = []
+    for fix in data.get('fixes') or []:
+        text, level = (fix.get('fix', ''), str(fix.get('level', '')).capitalize()) if isinstance(fix, dict) else (fix, '')
+        text = str(text).strip()
+        if text:
+            fixes.append((text, level if level in PRIORITY_LEVELS else default_level(score)))
+    return {'score': score, 'problems': string_list(data.get('problems')), 'fixes': fixes}
+
+
+def assemble_report(categories):
+    """A full report (see report.py) from {category key: parse_category result}.
+
+    Priorities are derived here instead of by the model: every fix, ordered
+    High to Low and then in rubric order, with repeated fixes listed once.
+    """
+    report = {key: {'score': categories[key]['score'], 'problems': categories[key]['problems'],
+                    'fixes': [fix for fix, _ in categories[key]['fixes']]} for key in CATEGORY_KEYS}
+    priorities = []
+    seen = set()
+    for level in PRIORITY_LEVELS:
+        for key in CATEGORY_KEYS:
+            for fix, fix_level in categories[key]['fixes']:
+                if fix_level == level and fix.lower() not in seen:
+                    seen.add(fix.lower())
+                    priorities.append({'level': level, 'category': key, 'fix': fix})
+    report['priorities'] = priorities
+    return report
@@ -0,0 +1,126 @@
+import re
+
+# Where each section of the guideline text starts; a section runs to the start of the next
+SECTION_MARKERS = [
+    ('intro', 'You are an expert SEO content evaluator.'),
+    ('helpful_content', 'GOOGLE HELPFUL CONTENT GUIDELINES'),
+    ('eeat', 'E-E-A-T (Experience, Expertise, Authoritativeness, Trustworthiness):'),
+    ('rater_guidelines', 'GOOGLE SEARCH QUALITY RATER GUIDELINES'),
+    ('page_quality', '## Page Quality (PQ) Rating Process'),
+    ('ymyl', '**YMYL (Your Money or Your Life) Topics:**'),
+    ('lowest_quality', '**Untrustworthy/Lowest Quality Characteristics:**'),
+    ('needs_met', '## Needs Met (NM) Rating'),
+    ('search_testing', 'GOOGLE SEARCH TESTING AND EVALUATION PROCESS'),
+    ('seo_starter', 'GOOGLE SEO STARTER GUIDE'),
+    ('page_experience', 'GOOGLE PAGE EXPERIENCE GUIDELINES'),
+    ('ranking_systems', 'GOOGLE SEARCH RANKING SYSTEMS'),
+    ('who_how_why', 'WHO: Is it self-evident'),
+]
+
+# Sent for every page: what the 8 rubric categories are scored against
+CORE_SECTIONS = [
+    'intro', 'helpful_content', 'eeat', 'rater_guidelines', 'page_quality', 'lowest_quality', 'needs_met', 'seo_starter',
+    'who_how_why',
+]
+# Added after the core (so pages of every type share the core as a cached prefix) when they apply.
+# The search testing statistics and ranking systems overview are background only the full prompt keeps.
+YMYL_SECTIONS = ['ymyl']
+PAGE_TYPE_SECTIONS = {
+    'product': ['page_experience'],
+    'recipe': ['page_experience'],
+    'review': ['page_experience'],
+}
+
+PAGE_TYPES = ['article', 'news', 'recipe', 'product', 'review', 'documentation']
+JSON_LD_PAGE_TYPES = {
+    'Recipe': 'recipe', 'Product': 'product', 'Offer': 'product', 'NewsArticle': 'news', 'ReportageNewsArticle': 'news',
+    'Review': 'review', 'TechArticle': 'documentation', 'APIReference': 'documentation',
+}
+URL_PAGE_TYPES = {
+    'recipe': re.compile(r'/recipes?/'),
+    'product': re.compile(r'/(?:products?|shop|store|p)/'),
+    'news': re.compile(r'/news/|/\d{4}/\d{2}/'),
+    'review': re.compile(r'/reviews?/'),
+    'documentation': re.compile(r'/(?:docs?|documentation|reference|api)/'),
+}
+PAGE_TYPE_CUES = {
+    'recipe': re.compile(r'\b(ingredients?|preheat|tablespoons?|teaspoons?|tbsp|tsp|servings?|prep time|cook time|'
+                         r'simmer|serves \d)\b', re.I),
+    'product': re.compile(r'(add to (?:cart|basket|bag)|in stock|free shipping|free returns|warranty|specifications|'
+                          r'\bsku\b|[$€£]\s?\d+(?:\.\d\d)?\b)', re.I),
+    'news': re.compile(r'\b((?:on|last) (?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)|according to|reporter|'
+                       r'correspondent|press conference|spokesperson|officials|voted|announced)\b', re.I),
+    'review': re.compile(r'\b(pros|cons|verdict|we tested|our rating|stars? out of|out of (?:5|five|10|ten)|bottom line|'
+                         r'who should buy)\b', re.I),
+    'documentation': re.compile(r'\b(docs|documentation|configuration|configure|parameters?|api|installation|defaults? to|set \w+ to|'
+                                r'endpoint|returns an?|raises|example usage)\b', re.I),
+}
+# Distinct cue terms a page type needs (a URL or JSON-LD match counts as several)
+MIN_PAGE_TYPE_SCORE = 3
+URL_MATCH_SCORE = 3
+JSON_LD_MATCH_SCORE = 5
+
+YMYL_TOPICS = {
+    'health': re.compile(r'\b(symptoms?|diagnos(?:is|ed|e)|treatments?|medications?|medicines?|dosage|doses|diseases?|'
+                         r'doctors?|physicians?|blood pressure|cancer|diabetes|pregnan(?:t|cy)|prescriptions?|'
+                         r'side effects?|clinical|therapy|mental health|vaccines?|surgery|heart attack)\b', re.I),
+    'finance': re.compile(r'\b(loans?|mortgages?|investing|investments?|retirement|pensions?|taxes|tax returns?|'
+                          r'credit (?:scores?|cards?)|insurance|debts?|interest rates?|stock market|savings accounts?|'
+                          r'bankruptcy|cryptocurrenc(?:y|ies))\b', re.I),
+    'safety': re.compile(r'\b(emergency|poison(?:ing|ous)?|firearms?|overdose|evacuat(?:e|ion)|carbon monoxide|'
+                         r'hazardous|suicide|self-harm)\b', re.I),
+    'legal': re.compile(r'\b(lawyers?|attorneys?|lawsuits?|legal advice|custody|immigration|visas?|court orders?|'
+                        r'contracts? law|liability)\b', re.I),
+    'society': re.compile(r'\b(elections?|voting rights|voter registration|public health|government benefits|'
+                          r'social security)\b', re.I),
+}
+# A topic is YMYL when the page uses this many of its distinct terms, this often per 1000 words
+YMYL_MIN_TERMS = 3
+YMYL_MIN_DENSITY = 2.0
+
+
+def split_sections(text):
+    """{section key: text} of the guideline text, cut at SECTION_MARKERS"""
+    starts = [text.index(marker) for _, marker in SECTION_MARKERS] + [len(text)]
+    return {key: text[start:end] for (key, _), start, end in zip(SECTION_MARKERS, starts, starts[1:])}
+
+
+def classify_page(content_data):
+    """Page type and YMYL topics of a page, from its JSON-LD, URL and wording.
+
+    Returns {'page_type': one of PAGE_TYPES, 'ymyl': bool, 'ymyl_topics':
+    [topic]}. Pages that match no type clearly are 'article'.
+    """
+    text = f"{content_data.get('title', '')}\n{content_data.get('content', '')}"
+    url = content_data.get('url', '')
+    ld_types = (content_data.get('signals') or {}).get('json_ld_types') or []
+
+    scores = {}
+    for page_type, cues in PAGE_TYPE_CUES.items():
+        scores[page_type] = len({match.lower() for match in cues.findall(text)})
+        if URL_PAGE_TYPES[page_type].search(url):
+            scores[page_type] += URL_MATCH_SCORE
+    for ld_type in ld_types:
+        if ld_type in JSON_LD_PAGE_TYPES:
+            scores[JSON_LD_PAGE_TYPES[ld_type]] += JSON_LD_MATCH_SCORE
+    page_type = max(scores, key=scores.get)
+    if scores[page_type] < MIN_PAGE_TYPE_SCORE:
+        page_type = 'article'
+
+    words = max(1, len(text.split()))
+    topics = []
+    for topic, terms in YMYL_TOPICS.items():
+        matches = terms.findall(text)
+        if len({match.lower() for match in matches}) >= YMYL_MIN_TERMS and len(matches) * 1000 / words >= YMYL_MIN_DENSITY:
+            topics.append(topic)
+    if 'MedicalWebPage' in ld_types and 'health' not in topics:
+        topics.append('health')
+    return {'page_type': page_type, 'ymyl': bool(topics), 'ymyl_topics': topics}
+
+
+def select_sections(page):
+    """Guideline section keys for a classified page, core sections first"""
+    sections = CORE_SECTIONS + PAGE_TYPE_SECTIONS.get(page['page_type'], [])
+    if page['ymyl']:
+        sections = sections + YMYL_SECTIONS
+    return sections
@@ -0,0 +1,232 @@
+import json
+import os
+import threading
+import time
+
+from storage import data_path, sqlite_connection
+from eval_cache import prompt_fingerprint
+from prompts import PROMPT_VARIANTS, get_prompt
+from report import CATEGORY_KEYS, parse_scores
+from tiers import estimate_cost
+
+# Every completed evaluation, for history views and per-URL score trends
+HISTORY_PATH = os.getenv('HISTORY_PATH', data_path('history.sqlite3'))
+HISTORY_PAGE_SIZE = 500
+
+SCORE_COLUMNS = [f'{key}_score' for key in CATEGORY_KEYS]
+SUMMARY_COLUMNS = [
+    'id', 'url', 'title', 'evaluated_at', 'model', 'prompt_variant', 'tier', 'source', 'audit', 'cache_hit',
+    'overall_score', *SCORE_COLUMNS, 'prompt_tokens', 'cached_tokens', 'completion_tokens', 'cost_usd', 'latency_seconds',
+]
+
+
+def result_scores(result):
+    """{category key: score} and the overall score of an evaluation result.
+
+    Structured reports carry their scores; markdown is parsed here, once, so
+    reading history never has to. A triage-only cascade result has just an
+    overall score.
+    """
+    if result.get('report'):
+        scores = {key: result['report'][key]['score'] for key in CATEGORY_KEYS}
+    elif result.get('tier') == 'fast' and result.get('triage'):
+        return {}, float(result['triage']['score'])
+    else:
+        scores = parse_scores(result.get('evaluation') or '')
+    overall = round(sum(scores.values()) / len(scores), 1) if scores else None
+    return scores, overall
+
+
+class EvaluationHistory:
+    """SQLite record of every evaluation: scores, model, prompt, usage and latency per URL and time.
+
+    Summary rows live in a narrow, indexed table so filtering tens of
+    thousands of them stays fast; the full markdown and JSON reports live
+    in a side table and are only read when one report is opened.
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        scores = ''.join(f'{column} INTEGER,\n' for column in SCORE_COLUMNS)
+        with sqlite_connection(self.path) as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    title TEXT,
+                    evaluated_at REAL NOT NULL,
+                    model TEXT,
+                    prompt_variant TEXT,
+                    prompt_version TEXT,
+                    tier TEXT,
+                    source TEXT,
+                    audit TEXT,
+                    cache_hit INTEGER NOT NULL DEFAULT 0,
+                    overall_score REAL,
+                    {scores}prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                    cached_tokens INTEGER NOT NULL DEFAULT 0,
+                    completion_tokens INTEGER NOT NULL DEFAULT 0,
+                    cost_usd REAL,
+                    latency_seconds REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    id INTEGER PRIMARY KEY REFERENCES evaluations (id),
+                    evaluation TEXT NOT NULL,
+                    report TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_url ON evaluations (url, evaluated_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_date ON evaluations (evaluated_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_model ON evaluations (model)")
+
+    def record(self, content_data, result, source='app'):
+        """Store a successful evaluation; returns its id, or None for errors and pre-check-only results"""
+        if 'error' in result or result.get('model') == 'prechecks' or not result.get('evaluation'):
+            return None
+        scores, overall = result_scores(result)
+        usage = result.get('usage') or {}
+        tiers = result.get('tiers')
+        if tiers:
+            cost = sum(entry['cost_usd'] or 0.0 for entry in tiers.values())
+        elif usage and result.get('model'):
+            cost = estimate_cost(result['model'], usage)
+        else:
+            cost = None
+        row = {
+            'url': content_data.get('url', ''),
+            'title': content_data.get('title', ''),
+            'evaluated_at': time.time(),
+            'model': result.get('model'),
+            'prompt_variant': result.get('prompt_variant'),
+            'prompt_version': (prompt_fingerprint(get_prompt(result['prompt_variant'], content_data))
+                               if result.get('prompt_variant') in PROMPT_VARIANTS else None),
+            'tier': result.get('tier'),
+            'source': source,
+            'audit': result.get('audit'),
+            'cache_hit': int(bool(result.get('cache_hit'))),
+            'overall_score': overall,
+            **{f'{key}_score': scores.get(key) for key in CATEGORY_KEYS},
+            'prompt_tokens': usage.get('prompt_tokens', 0),
+            'cached_tokens': usage.get('cached_tokens', 0),
+            'completion_tokens': usage.get('completion_tokens', 0),
+            'cost_usd': cost,
+            'latency_seconds': result.get('latency_seconds'),
+        }
+        with sqlite_connection(self.path) as conn:
+            cursor = conn.execute(
+                f"INSERT INTO evaluations ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", list(row.values())
+            )
+            conn.execute(
+                "INSERT INTO reports VALUES (?, ?, ?)",
+                (cursor.lastrowid, result['evaluation'], json.dumps(result['report']) if result.get('report') else None)
+            )
+            return cursor.lastrowid
+
+    def _where(self, url=None, search=None, since=None, until=None, min_score=None, max_score=None, model=None):
+        clauses, params = [], []
+        for clause, value in (
+            ("url = ?", url), ("url LIKE ? ESCAPE '\\'", search), ("evaluated_at >= ?", since),
+            ("evaluated_at < ?", until), ("overall_score >= ?", min_score), ("overall_score <= ?", max_score),
+            ("model = ?", model),
+        ):
+            if value is None or value == '':
+                continue
+            if clause.startswith("url LIKE"):
+                value = '%' + value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            clauses.append(clause)
+            params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, limit=HISTORY_PAGE_SIZE, offset=0, **filters):
+        """Summary rows (no report text), newest first.
+
+        Filters: url (exact), search (URL substring), since/until (epoch
+        seconds), min_score/max_score (overall) and model.
+        """
+        where, params = self._where(**filters)
+        with sqlite_connection(self.path) as conn:
+            cursor = conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM evaluations{where} ORDER BY evaluated_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            )
+            return [dict(zip(SUMMARY_COLUMNS, row)) for row in cursor]
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        with sqlite_connection(self.path) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM evaluations{where}", params).fetchone()[0]
+
+    def trend(self, url):
+        """Every evaluation of url, oldest first: id, date, overall and per-category scores"""
+        columns = ['id', 'evaluated_at', 'overall_score', *SCORE_COLUMNS, 'model', 'tier']
+        with sqlite_connection(self.path) as conn:
+            cursor = conn.execute(
+                f"SELECT {', '.join(columns)} FROM evaluations WHERE url = ? ORDER BY evaluated_at", (url,)
+            )
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def get(self, evaluation_id):
+        """One summary row plus its 'evaluation' markdown and parsed 'report', or None"""
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(
+                f"SELECT {', '.join('e.' + column for column in SUMMARY_COLUMNS)}, r.evaluation, r.report "
+                "FROM evaluations e JOIN reports r ON r.id = e.id WHERE e.id = ?", (evaluation_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(SUMMARY_COLUMNS + ['evaluation', 'report'], row))
+        entry['report'] = json.loads(entry['report']) if entry['report'] else None
+        return entry
+
+    def export(self, **filters):
+        """Yield every matching entry with its 'evaluation' and parsed 'report', oldest first.
+
+        Rows are read from the database as they are consumed, so exporting
+        the whole history never holds it in memory. Filters as in query().
+        """
+        where, params = self._where(**filters)
+        columns = ', '.join('e.' + column for column in SUMMARY_COLUMNS)
+        with sqlite_connection(self.path) as conn:
+            cursor = conn.execute(
+                f"SELECT {columns}, r.evaluation, r.report FROM evaluations e JOIN reports r ON r.id = e.id{where} "
+                "ORDER BY e.evaluated_at", params
+            )
+            for row in cursor:
+                entry = dict(zip(SUMMARY_COLUMNS + ['evaluation', 'report'], row))
+                entry['report'] = json.loads(entry['report']) if entry['report'] else None
+                yield entry
+
+    def models(self):
+        with sqlite_connection(self.path) as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT model FROM evaluations WHERE model IS NOT NULL")]
+
+    def clear(self):
+        with sqlite_connection(self.path) as conn:
+            conn.execute("DELETE FROM reports")
+            conn.execute("DELETE FROM evaluations")
+
+
+def recording(evaluate_fn, source):
+    """Wrap evaluate_fn(content_data) so every successful result is written to the history.
+
+    Results come back with the 'history_id' of their entry (None if not stored).
+    """
+    def evaluate(content_data):
+        result = evaluate_fn(content_data)
+        return {**result, 'history_id': get_history().record(content_data, result, source)}
+    return evaluate
+
+
+_default_history = None
+_default_history_lock = threading.Lock()
+
+
+def get_history():
+    """Process-wide evaluation history"""
+    global _default_history
+    with _default_history_lock:
+        if _default_history is None:
+            _default_history = EvaluationHistory()
+        return _default_history
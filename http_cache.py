@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+
+from storage import data_path, sqlite_connection
+
+# Connection pooling: how many hosts to keep pools for, and max connections per host
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '32'))
+HTTP_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_CONNECTIONS_PER_HOST', '4'))
+HTTP_CACHE_PATH = os.getenv('HTTP_CACHE_PATH', data_path('http.sqlite3'))
+# Stored pages are dropped once this many are newer, or when not fetched or revalidated for this long
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', '10000'))
+HTTP_CACHE_MAX_AGE_DAYS = float(os.getenv('HTTP_CACHE_MAX_AGE_DAYS', '30'))
+# Page bodies stop downloading past this size, or this long after the headers arrived,
+# so a huge or endless response can't exhaust memory or hold a worker
+MAX_DOWNLOAD_BYTES = int(os.getenv('MAX_DOWNLOAD_BYTES', str(10 * 1024 * 1024)))
+DOWNLOAD_DEADLINE_SECONDS = float(os.getenv('DOWNLOAD_DEADLINE_SECONDS', '30'))
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_session = None
+_response_cache = None
+_lock = threading.Lock()
+
+
+def create_session(pool_hosts=HTTP_POOL_HOSTS, connections_per_host=HTTP_CONNECTIONS_PER_HOST):
+    """Build a keep-alive session with a bounded connection pool per host.
+
+    pool_block makes extra threads wait for a free connection instead of
+    opening more, which is what caps concurrency against any single host.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=connections_per_host, pool_block=True)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def get_session():
+    """Process-wide pooled session shared by every fetch"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+class ResponseCache:
+    """Stores HTTP validators and the extracted page data for conditional refetches, with size and age eviction"""
+
+    def __init__(self, path=HTTP_CACHE_PATH, max_entries=HTTP_CACHE_MAX_ENTRIES, max_age_days=HTTP_CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        with sqlite_connection(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    data TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_fetched ON responses (fetched_at)")
+            # Purge on open too, so a store left over from long crawls shrinks without a new write
+            self._evict(conn, time.time())
+
+    def get(self, url):
+        """Return {'etag', 'last_modified', 'data'} for url, or None"""
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, data FROM responses WHERE url = ? AND fetched_at >= ?",
+                (url, time.time() - self.max_age_seconds)
+            ).fetchone()
+        if not row:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'data': json.loads(row[2])}
+
+    def put(self, url, etag, last_modified, data):
+        """Remember a response's validators; responses without any are not worth caching"""
+        if not etag and not last_modified:
+            return
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(data), now)
+            )
+            self._evict(conn, now)
+
+    def touch(self, url):
+        """Mark a stored response as just revalidated (a 304), so eviction keeps it"""
+        with sqlite_connection(self.path) as conn:
+            conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE fetched_at < ?", (now - self.max_age_seconds,))
+        conn.execute("""
+            DELETE FROM responses WHERE url IN (
+                SELECT url FROM responses ORDER BY fetched_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def clear(self):
+        """Forget every stored response"""
+        with sqlite_connection(self.path) as conn:
+            conn.execute("DELETE FROM responses")
+
+
+class BoundedBody:
+    """The body of a response fetched with stream=True, as an iterator of byte chunks.
+
+    Iteration stops after max_bytes (of decoded content, so compressed
+    bombs count at full size) or deadline seconds, and 'truncated' says
+    which limit was hit. Iteration can stop and resume; it reads the
+    underlying stream only once.
+    """
+
+    def __init__(self, response, max_bytes=MAX_DOWNLOAD_BYTES, deadline=DOWNLOAD_DEADLINE_SECONDS):
+        self.response = response
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.bytes_read = 0
+        self.truncated = None
+        self._chunks = self._read()
+
+    def _read(self):
+        stop_at = time.monotonic() + self.deadline
+        raw = self.response.raw
+        sock = getattr(raw.connection, 'sock', None)
+        # The request timeout only bounds each gap between packets, so a body sent a
+        # byte at a time would never time out; each read also waits at most until the deadline
+        gap = sock.gettimeout() if sock else None
+        while True:
+            left = stop_at - time.monotonic()
+            if left <= 0:
+                self.truncated = 'time'
+                return
+            if sock:
+                sock.settimeout(min(gap, left) if gap else left)
+            try:
+                # read1 returns whatever arrived rather than waiting for a full chunk
+                chunk = raw.read1(DOWNLOAD_CHUNK_BYTES, decode_content=True)
+            except ReadTimeoutError:
+                if time.monotonic() < stop_at:
+                    raise
+                self.truncated = 'time'
+                return
+            if not chunk:
+                return
+            remaining = self.max_bytes - self.bytes_read
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+                self.truncated = 'size'
+            self.bytes_read += len(chunk)
+            if chunk:
+                yield chunk
+            if self.truncated:
+                return
+
+    def __iter__(self):
+        return self._chunks
+
+
+def get_response_cache():
+    """Process-wide response cache instance"""
+    global _response_cache
+    with _lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+def conditional_headers(entry):
+    """If-None-Match / If-Modified-Since headers for a cached entry"""
+    headers = {}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
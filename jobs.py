@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from storage import data_path, sqlite_connection
+
+# Background evaluation jobs, persisted so results outlive reruns and sessions
+JOBS_PATH = os.getenv('JOBS_PATH', data_path('jobs.sqlite3'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+# Bulk runs get a pool of their own, so a long audit can't take the workers single-page evaluations need
+BULK_JOB_WORKERS = int(os.getenv('BULK_JOB_WORKERS', '2'))
+JOB_MAX_AGE_DAYS = float(os.getenv('JOB_MAX_AGE_DAYS', '7'))
+# Minimum gap between progress writes from one job
+PROGRESS_INTERVAL = 0.5
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobQueue:
+    """SQLite job table drained by a local worker pool.
+
+    Handlers are registered per job kind and called as handler(payload, progress)
+    from a worker thread; progress(value) publishes partial results, and the
+    return value becomes the job result. Payloads, progress and results are JSON.
+    Kinds registered with their own worker count run on a separate pool;
+    the rest share one.
+    """
+
+    def __init__(self, path=JOBS_PATH, workers=JOB_WORKERS, max_age_days=JOB_MAX_AGE_DAYS):
+        self.path = path
+        self._handlers = {}
+        self._pools = {}
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+        with sqlite_connection(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            # Jobs left running belonged to a process that died; run them again
+            conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND updated_at < ?",
+                (time.time() - max_age_days * 86400,)
+            )
+
+    def register(self, kind, handler, workers=None):
+        """Set the handler for a job kind and start any of its jobs still queued.
+
+        With workers, the kind's jobs run on a pool of that many threads of
+        their own instead of the shared pool.
+        """
+        self._handlers[kind] = handler
+        with self._lock:
+            if workers and kind not in self._pools:
+                self._pools[kind] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'job-{kind}')
+        with sqlite_connection(self.path) as conn:
+            queued = conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND status = 'queued' ORDER BY created_at", (kind,)
+            ).fetchall()
+        for (job_id,) in queued:
+            self._dispatch(job_id, kind)
+
+    def submit(self, kind, payload):
+        """Queue a job and return its id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now)
+            )
+        if kind in self._handlers:
+            self._dispatch(job_id, kind)
+        return job_id
+
+    def _dispatch(self, job_id, kind):
+        with self._lock:
+            if job_id in self._in_flight:
+                return
+            self._in_flight.add(job_id)
+            pool = self._pools.get(kind, self._pool)
+        pool.submit(self._run, job_id)
+
+    def _update(self, job_id, **fields):
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                f"UPDATE jobs SET {columns}, updated_at = ? WHERE id = ?",
+                (*fields.values(), time.time(), job_id)
+            )
+
+    def _run(self, job_id):
+        try:
+            job = self.get(job_id)
+            if job is None or job['status'] != 'queued':
+                return
+            self._update(job_id, status='running')
+            last_write = 0.0
+            unwritten = None
+
+            def progress(value):
+                nonlocal last_write, unwritten
+                if time.monotonic() - last_write >= PROGRESS_INTERVAL:
+                    self._update(job_id, progress=json.dumps(value))
+                    last_write = time.monotonic()
+                    unwritten = None
+                else:
+                    unwritten = value
+
+            try:
+                result = self._handlers[job['kind']](job['payload'], progress)
+                self._update(job_id, status='done', result=json.dumps(result))
+            except Exception as e:
+                # Keep the latest partial output (such as streamed text) that throttling held back
+                if unwritten is not None:
+                    self._update(job_id, status='error', error=str(e), progress=json.dumps(unwritten))
+                else:
+                    self._update(job_id, status='error', error=str(e))
+        finally:
+            with self._lock:
+                self._in_flight.discard(job_id)
+
+    def get(self, job_id):
+        """The job as a dict with decoded payload, progress and result, or None"""
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, payload, progress, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'kind': row[1],
+            'status': row[2],
+            'payload': json.loads(row[3]),
+            'progress': json.loads(row[4]) if row[4] else None,
+            'result': json.loads(row[5]) if row[5] else None,
+            'error': row[6],
+            'created_at': row[7],
+            'updated_at': row[8],
+        }
+
+    def recent(self, limit=10):
+        """Newest jobs first, without their payloads or results"""
+        with sqlite_connection(self.path) as conn:
+            rows = conn.execute(
+                "SELECT id, kind, status, created_at FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{'id': row[0], 'kind': row[1], 'status': row[2], 'created_at': row[3]} for row in rows]
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide job queue, shared by every Streamlit session"""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+        return _default_queue
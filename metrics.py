@@ -0,0 +1,198 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ratelimit import get_limiter
+from tiers import estimate_cost
+
+# Serve the aggregate metrics at /metrics in Prometheus text format on this port (0 = off)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+# Append one JSON line per fetch and model call here, with its stage timings (empty = off)
+METRICS_TRACE_PATH = os.getenv('METRICS_TRACE_PATH', '')
+# Histogram bucket bounds in seconds, wide enough for both HTML parsing and slow model calls
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160)
+TOKEN_TYPES = ('prompt_tokens', 'cached_tokens', 'completion_tokens')
+METRIC_PREFIX = 'content_eval'
+
+
+@contextmanager
+def timed(timings, stage):
+    """Add the seconds spent in the with-block to timings[stage]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def rounded(timings):
+    """Stage timings rounded to the millisecond, for results and reports"""
+    return {stage: round(seconds, 3) for stage, seconds in timings.items()}
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_label_value(value)}"' for key, value in labels.items()) + '}'
+
+
+class Metrics:
+    """Process-wide stage-latency histograms and token counters.
+
+    Each fetch or model call reports its stage timings once it finishes
+    (kind is 'fetch', 'evaluation' or 'triage'). Histograms use fixed
+    buckets, so memory stays flat however long the process runs, and
+    quantiles are estimated from them the way Prometheus does.
+    """
+
+    def __init__(self, trace_path=METRICS_TRACE_PATH):
+        self.trace_path = trace_path
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._operations = {}
+        self._tokens = {}
+        self._cost = {}
+
+    def observe(self, kind, timings, outcome='ok', url=None, model=None, usage=None):
+        """Record one finished operation: seconds per stage, its outcome and token usage"""
+        with self._lock:
+            self._operations[(kind, outcome)] = self._operations.get((kind, outcome), 0) + 1
+            for stage, seconds in timings.items():
+                histogram = self._stages.setdefault(
+                    (kind, stage), {'buckets': [0] * (len(STAGE_BUCKETS) + 1), 'sum': 0.0, 'count': 0, 'max': 0.0}
+                )
+                histogram['buckets'][bisect.bisect_left(STAGE_BUCKETS, seconds)] += 1
+                histogram['sum'] += seconds
+                histogram['count'] += 1
+                histogram['max'] = max(histogram['max'], seconds)
+            if model and usage:
+                for token_type in TOKEN_TYPES:
+                    self._tokens[(model, token_type)] = self._tokens.get((model, token_type), 0) + usage.get(token_type, 0)
+                cost = estimate_cost(model, usage)
+                if cost:
+                    self._cost[model] = self._cost.get(model, 0.0) + cost
+            if self.trace_path:
+                entry = {'ts': round(time.time(), 3), 'kind': kind, 'outcome': outcome, 'url': url, 'model': model,
+                         'timings': rounded(timings), 'usage': usage}
+                with open(self.trace_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + '\n')
+
+    def quantile(self, kind, stage, q):
+        """Estimated q-quantile of a stage's seconds (linear within a bucket, capped at the
+        slowest sample), or None before any samples"""
+        with self._lock:
+            histogram = self._stages.get((kind, stage))
+            if not histogram or not histogram['count']:
+                return None
+            rank = q * histogram['count']
+            cumulative = 0
+            for index, count in enumerate(histogram['buckets']):
+                if count and cumulative + count >= rank:
+                    if index == len(STAGE_BUCKETS):
+                        return histogram['max']
+                    lower = STAGE_BUCKETS[index - 1] if index else 0.0
+                    return min(histogram['max'], lower + (STAGE_BUCKETS[index] - lower) * (rank - cumulative) / count)
+                cumulative += count
+            return histogram['max']
+
+    def summary(self):
+        """Per (kind, stage): count, mean and estimated p50/p95/p99 seconds"""
+        with self._lock:
+            stages = sorted((key, histogram['count'], histogram['sum']) for key, histogram in self._stages.items())
+        return [
+            {
+                'kind': kind,
+                'stage': stage,
+                'count': count,
+                'mean_seconds': round(total / count, 3),
+                **{f'p{int(q * 100)}_seconds': round(self.quantile(kind, stage, q), 3) for q in (0.5, 0.95, 0.99)},
+            }
+            for (kind, stage), count, total in stages
+        ]
+
+    def render_prometheus(self):
+        """All metrics, plus the rate limiter's gauges, in the Prometheus text exposition format"""
+        name = f'{METRIC_PREFIX}_stage_seconds'
+        lines = [f'# HELP {name} Seconds spent in each stage of a page fetch or model call.', f'# TYPE {name} histogram']
+        with self._lock:
+            for (kind, stage), histogram in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, count in zip(STAGE_BUCKETS + ('+Inf',), histogram['buckets']):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(kind=kind, stage=stage, le=bound)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(kind=kind, stage=stage)} {histogram["sum"]:.6f}')
+                lines.append(f'{name}_count{_labels(kind=kind, stage=stage)} {histogram["count"]}')
+
+            name = f'{METRIC_PREFIX}_operations_total'
+            lines += [f'# HELP {name} Finished fetches and model calls by outcome.', f'# TYPE {name} counter']
+            lines += [f'{name}{_labels(kind=kind, outcome=outcome)} {count}' for (kind, outcome), count in sorted(self._operations.items())]
+
+            name = f'{METRIC_PREFIX}_tokens_total'
+            lines += [f'# HELP {name} Tokens used per model (cached tokens are part of prompt tokens).', f'# TYPE {name} counter']
+            lines += [f'{name}{_labels(model=model, type=token_type.replace("_tokens", ""))} {count}'
+                      for (model, token_type), count in sorted(self._tokens.items())]
+
+            name = f'{METRIC_PREFIX}_cost_usd_total'
+            lines += [f'# HELP {name} Estimated spend per model.', f'# TYPE {name} counter']
+            lines += [f'{name}{_labels(model=model)} {cost:.6f}' for model, cost in sorted(self._cost.items())]
+
+        limiter = get_limiter().stats()
+        for key, kind, help_text in (
+            ('queue_depth', 'gauge', 'Model calls waiting for the rate limiter.'),
+            ('in_flight', 'gauge', 'Model calls in flight.'),
+            ('concurrency_limit', 'gauge', 'Current adaptive concurrency limit.'),
+            ('retries', 'counter', 'Retried model calls.'),
+            ('rate_limited', 'counter', 'Model calls answered with a 429.'),
+        ):
+            name = f'{METRIC_PREFIX}_api_{key}' + ('_total' if kind == 'counter' else '')
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {limiter[key]}']
+        return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = get_metrics().render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Process-wide metrics, starting the /metrics endpoint on first use when METRICS_PORT is set"""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+            if METRICS_PORT:
+                try:
+                    serve_metrics()
+                except OSError:
+                    # Another process (the app while a CLI run starts, say) already serves the port
+                    pass
+        return _default_metrics
@@ -0,0 +1,173 @@
+import json
+from urllib.parse import urlparse
+
+# Recommended lengths, in characters, for how search results display these
+TITLE_LENGTH = (30, 60)
+META_DESCRIPTION_LENGTH = (70, 160)
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+# Finding severity -> points off a category's 10-point pre-check score
+SEVERITY_PENALTY = {'High': 3, 'Medium': 2, 'Low': 1}
+
+
+def json_ld_types(scripts):
+    """Schema.org @type values declared in the text of application/ld+json scripts"""
+    types = []
+    for text in scripts:
+        try:
+            data = json.loads(text or '')
+        except ValueError:
+            types.append('invalid')
+            continue
+        items = data if isinstance(data, list) else data.get('@graph', [data]) if isinstance(data, dict) else []
+        for item in items:
+            item_type = item.get('@type') if isinstance(item, dict) else None
+            types.extend(item_type if isinstance(item_type, list) else [item_type] if item_type else [])
+    return types
+
+
+def link_kind(href, host):
+    """'internal' or 'external' for a link on a page served from host, or None if it is neither
+    (in-page anchors, mailto:, javascript: and the like)"""
+    target = urlparse(href)
+    if target.scheme in ('', 'http', 'https') and (not target.netloc or target.netloc.lower() == host):
+        return None if href.startswith('#') else 'internal'
+    return 'external' if target.scheme in ('http', 'https') else None
+
+
+def build_signals(url, title, description, canonical, robots, headings, images, images_with_alt, internal, external, ld_types):
+    """The signals dict from facts a parser gathered; headings is the list of heading levels in document order"""
+    parsed = urlparse(url)
+    skipped = sum(1 for previous, level in zip(headings, headings[1:]) if level > previous + 1)
+    return {
+        # None for saved or pasted pages, which weren't served over the web
+        'https': parsed.scheme == 'https' if parsed.scheme in ('http', 'https') else None,
+        'title_length': len(title.strip()) if title else 0,
+        'meta_description_length': len(description),
+        'h1_count': headings.count(1),
+        'heading_count': len(headings),
+        'first_heading_level': headings[0] if headings else None,
+        'skipped_heading_levels': skipped,
+        'image_count': images,
+        'image_alt_coverage': round(images_with_alt / images, 2) if images else None,
+        'json_ld_types': ld_types,
+        'canonical': bool(canonical),
+        'noindex': 'noindex' in (robots or '').lower(),
+        'internal_links': internal,
+        'external_links': external,
+    }
+
+
+def analyze_html(soup, url):
+    """Metadata and structure signals of a parsed page; run before extraction mutates the soup"""
+    title = soup.find('title')
+    meta_description = soup.find('meta', attrs={'name': 'description'})
+    canonical = soup.find('link', rel='canonical')
+    robots = soup.find('meta', attrs={'name': 'robots'})
+    images = soup.find_all('img')
+    host = urlparse(url).netloc.lower()
+    kinds = [link_kind(link['href'], host) for link in soup.find_all('a', href=True)]
+    return build_signals(
+        url,
+        title.get_text() if title else None,
+        (meta_description.get('content') or '').strip() if meta_description else '',
+        canonical.get('href') if canonical else None,
+        robots.get('content') if robots else None,
+        [int(tag.name[1]) for tag in soup.find_all(HEADING_TAGS)],
+        len(images),
+        sum(1 for image in images if (image.get('alt') or '').strip()),
+        kinds.count('internal'),
+        kinds.count('external'),
+        json_ld_types(script.string for script in soup.find_all('script', attrs={'type': 'application/ld+json'})),
+    )
+
+
+def precheck_findings(signals):
+    """Deterministic findings as (category key, severity, message) tuples"""
+    findings = []
+
+    def add(category, severity, message):
+        findings.append((category, severity, message))
+
+    low, high = TITLE_LENGTH
+    if not signals['title_length']:
+        add('metadata', 'High', "Page has no <title>.")
+    elif not low <= signals['title_length'] <= high:
+        add('metadata', 'Medium', f"Title is {signals['title_length']} characters; aim for {low}–{high}.")
+    low, high = META_DESCRIPTION_LENGTH
+    if not signals['meta_description_length']:
+        add('metadata', 'Medium', "Page has no meta description.")
+    elif not low <= signals['meta_description_length'] <= high:
+        add('metadata', 'Low', f"Meta description is {signals['meta_description_length']} characters; aim for {low}–{high}.")
+    if not signals['json_ld_types']:
+        add('metadata', 'Low', "No JSON-LD structured data.")
+    elif 'invalid' in signals['json_ld_types']:
+        add('metadata', 'Medium', "A JSON-LD block does not parse.")
+    if signals['image_alt_coverage'] is not None and signals['image_alt_coverage'] < 1:
+        missing = signals['image_count'] - round(signals['image_alt_coverage'] * signals['image_count'])
+        severity = 'Medium' if signals['image_alt_coverage'] < 0.5 else 'Low'
+        add('metadata', severity, f"{missing} of {signals['image_count']} images have no alt text.")
+    if not signals['canonical']:
+        add('metadata', 'Low', "No canonical link.")
+    if signals['noindex']:
+        add('metadata', 'High', "Page is marked noindex.")
+    if signals['https'] is False:
+        add('trust', 'High', "Page is not served over HTTPS.")
+
+    if signals['h1_count'] == 0:
+        add('structure', 'High', "Page has no H1.")
+    elif signals['h1_count'] > 1:
+        add('structure', 'Medium', f"Page has {signals['h1_count']} H1 headings; use one.")
+    if signals['first_heading_level'] not in (None, 1):
+        add('structure', 'Low', f"First heading is an H{signals['first_heading_level']}, not the H1.")
+    if signals['skipped_heading_levels']:
+        add('structure', 'Low', f"Heading hierarchy skips a level {signals['skipped_heading_levels']} time(s).")
+    if signals['internal_links'] == 0:
+        add('structure', 'Medium', "No internal links.")
+    return findings
+
+
+def precheck_scores(findings):
+    """10-point pre-check scores for the categories the findings cover"""
+    scores = {'metadata': 10, 'structure': 10}
+    for category, severity, _ in findings:
+        scores[category] = max(1, scores.get(category, 10) - SEVERITY_PENALTY[severity])
+    return scores
+
+
+def format_facts(signals):
+    """Compact one-line facts for the evaluator, measured rather than inferred from text"""
+    coverage = signals['image_alt_coverage']
+    facts = [
+        f"HTTPS: {'unknown' if signals['https'] is None else 'yes' if signals['https'] else 'no'}",
+        f"title {signals['title_length']} chars",
+        f"meta description {signals['meta_description_length']} chars",
+        f"H1 count {signals['h1_count']}",
+        f"headings {signals['heading_count']} (skipped levels: {signals['skipped_heading_levels']})",
+        f"images {signals['image_count']}" + (f" ({coverage:.0%} with alt text)" if coverage is not None else ""),
+        "JSON-LD: " + (', '.join(sorted(set(signals['json_ld_types']))) or "none"),
+        f"canonical: {'yes' if signals['canonical'] else 'no'}",
+        f"links {signals['internal_links']} internal / {signals['external_links']} external",
+    ]
+    if signals['noindex']:
+        facts.append("robots noindex")
+    return '; '.join(facts)
+
+
+def render_precheck_report(signals):
+    """Markdown report of the pre-checks alone (no model call)"""
+    findings = precheck_findings(signals)
+    scores = precheck_scores(findings)
+    lines = ["## Automated Pre-Checks", "", format_facts(signals), ""]
+    for category, name in (('structure', 'Structure'), ('metadata', 'Metadata'), ('trust', 'Trust')):
+        category_findings = [(severity, message) for key, severity, message in findings if key == category]
+        if category not in scores and not category_findings:
+            continue
+        heading = f"### {name}" + (f" (Pre-check score: {scores[category]}/10)" if category in scores else "")
+        lines.append(heading)
+        lines.append("")
+        lines.extend(f"- **{severity}:** {message}" for severity, message in category_findings)
+        if not category_findings:
+            lines.append("- No issues found.")
+        lines.append("")
+    lines.append("*Content quality, credibility, engagement, originality and overall page quality need the full AI evaluation.*")
+    return '\n'.join(lines)
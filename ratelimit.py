@@ -0,0 +1,277 @@
+import os
+import random
+import re
+import threading
+import time
+
+# Account limits (0 = unknown); learned from the x-ratelimit-* headers after the first response
+OPENAI_RPM = int(os.getenv('OPENAI_RPM', '0'))
+OPENAI_TPM = int(os.getenv('OPENAI_TPM', '0'))
+# Adaptive concurrency: starts at the maximum, halves on 429, grows back by ~1 per window of successes
+MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '8'))
+MIN_CONCURRENCY = 1
+MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '5'))
+BACKOFF_BASE_SECONDS = float(os.getenv('OPENAI_BACKOFF_BASE', '1'))
+BACKOFF_MAX_SECONDS = float(os.getenv('OPENAI_BACKOFF_MAX', '60'))
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+RETRY_ERRORS = {'APIConnectionError', 'APITimeoutError'}
+DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(value):
+    """Seconds in a reset header such as '6m0s', '1.5s' or '20ms' (None if unparseable)"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = DURATION_PART.findall(value)
+        return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts) if parts else None
+
+
+class _Bucket:
+    """Token bucket refilled continuously over a one-minute window (no limit while capacity is 0)"""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        if not self.capacity:
+            return
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount is available (requests bigger than the bucket wait for a full one)"""
+        self._refill(now)
+        if not self.capacity:
+            return 0.0
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) * 60 / self.capacity
+
+    def take(self, amount):
+        if self.capacity:
+            self.level -= min(amount, self.capacity)
+
+    def sync(self, limit, remaining):
+        """Adopt the server's view of the limit and what is left of it"""
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.level = float(remaining)
+        self.updated = time.monotonic()
+
+
+class HeldStream:
+    """A streamed response that holds its concurrency slot until it is read to the end, closed or dropped.
+
+    Releasing on close and on garbage collection too means a stream nobody
+    iterates (an error before the first chunk, a rerun dropping the
+    generator) can't keep its slot for the rest of the process.
+    """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._chunks = iter(stream)
+        self._release = release
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """Close the response and give the slot back; safe to call more than once"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            if hasattr(self._stream, 'close'):
+                self._stream.close()
+        finally:
+            self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+class RateLimiter:
+    """Schedules API calls under RPM/TPM budgets with AIMD concurrency and jittered retries.
+
+    call() takes a zero-argument function returning a raw response (the
+    with_raw_response variant of an openai method) so rate-limit headers can
+    be read before the body is parsed.
+    """
+
+    def __init__(self, rpm=OPENAI_RPM, tpm=OPENAI_TPM, max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._concurrency = float(max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._metrics = {'calls': 0, 'requests': 0, 'retries': 0, 'rate_limited': 0, 'errors': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+
+    def _acquire(self, tokens):
+        start = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        delay = self._paused_until - now
+                    elif self._in_flight >= int(self._concurrency):
+                        delay = None
+                    else:
+                        delay = max(self._requests.wait_time(1, now), self._tokens.wait_time(tokens, now))
+                        if delay <= 0:
+                            self._requests.take(1)
+                            self._tokens.take(tokens)
+                            self._in_flight += 1
+                            break
+                    self._cond.wait(delay)
+            finally:
+                self._waiting -= 1
+            waited = time.monotonic() - start
+            self._metrics['calls'] += 1
+            self._metrics['wait_seconds'] += waited
+            self._metrics['max_wait_seconds'] = max(self._metrics['max_wait_seconds'], waited)
+        return waited
+
+    def _release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _observe(self, headers):
+        """Sync the buckets with the x-ratelimit-* headers and grow concurrency additively"""
+        def number(name):
+            value = headers.get(name)
+            try:
+                return int(value) if value is not None else None
+            except ValueError:
+                return None
+
+        with self._cond:
+            self._requests.sync(number('x-ratelimit-limit-requests'), number('x-ratelimit-remaining-requests'))
+            self._tokens.sync(number('x-ratelimit-limit-tokens'), number('x-ratelimit-remaining-tokens'))
+            self._concurrency = min(self.max_concurrency, self._concurrency + 1 / self._concurrency)
+            self._metrics['requests'] += 1
+            self._cond.notify_all()
+
+    def _retry_delay(self, error, attempt):
+        """Seconds to wait before retrying error, or None if it shouldn't be retried"""
+        status = getattr(error, 'status_code', None)
+        retryable = status in RETRY_STATUSES if status is not None else type(error).__name__ in RETRY_ERRORS
+        # A 429 for an exhausted quota won't clear up by waiting
+        if not retryable or getattr(error, 'code', None) == 'insufficient_quota' or attempt >= self.max_retries:
+            return None
+
+        response = getattr(error, 'response', None)
+        headers = response.headers if response is not None else {}
+        if headers.get('retry-after-ms'):
+            retry_after = parse_duration(headers['retry-after-ms'] + 'ms')
+        else:
+            retry_after = parse_duration(headers.get('retry-after'))
+        if retry_after is None and status == 429:
+            retry_after = parse_duration(headers.get('x-ratelimit-reset-requests')) or parse_duration(headers.get('x-ratelimit-reset-tokens'))
+        # Full jitter keeps parallel workers from retrying in lockstep
+        backoff = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        delay = min(BACKOFF_MAX_SECONDS, retry_after + random.uniform(0, 0.25 * retry_after + 0.1)) if retry_after else backoff
+
+        with self._cond:
+            self._metrics['retries'] += 1
+            if status == 429:
+                self._metrics['rate_limited'] += 1
+                self._concurrency = max(MIN_CONCURRENCY, self._concurrency / 2)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def call(self, fn, tokens=1, stream=False, timings=None):
+        """Run fn under the limits, retrying transient failures; returns the parsed response.
+
+        tokens is the request's expected TPM cost (prompt plus max_tokens). A
+        stream comes back as a HeldStream, which keeps its concurrency slot
+        until it has been read to the end or closed.
+        With a timings dict, the seconds spent waiting for a slot or a retry
+        are added to timings['queue'].
+        """
+        timings = {} if timings is None else timings
+        attempt = 0
+        while True:
+            waited = self._acquire(tokens)
+            timings['queue'] = timings.get('queue', 0.0) + waited
+            try:
+                raw = fn()
+                self._observe(raw.headers)
+                result = raw.parse()
+            except Exception as e:
+                self._release()
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    with self._cond:
+                        self._metrics['errors'] += 1
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                timings['queue'] += delay
+                continue
+
+            if stream:
+                return HeldStream(result, self._release)
+            self._release()
+            return result
+
+    def stats(self):
+        """Queue depth, concurrency and wait-time metrics for this process"""
+        with self._cond:
+            metrics = dict(self._metrics)
+            waits = metrics.pop('wait_seconds')
+            acquired = metrics.pop('calls')
+            now = time.monotonic()
+            return {
+                **metrics,
+                'queue_depth': self._waiting,
+                'in_flight': self._in_flight,
+                'concurrency_limit': int(self._concurrency),
+                'mean_wait_seconds': round(waits / acquired, 3) if acquired else 0.0,
+                'max_wait_seconds': round(metrics['max_wait_seconds'], 3),
+                'paused_seconds': round(max(0.0, self._paused_until - now), 1),
+                'remaining_requests': int(self._requests.level),
+                'remaining_tokens': int(self._tokens.level),
+            }
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Process-wide limiter shared by every evaluation thread"""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+        return _default_limiter
@@ -0,0 +1,195 @@
+import json
+import re
+
+# The 8 rubric categories, in report order: (key, heading)
+CATEGORIES = [
+    ('content_quality', 'Content Quality'),
+    ('credibility', 'Credibility'),
+    ('engagement', 'Engagement'),
+    ('originality', 'Originality'),
+    ('structure', 'Structure'),
+    ('trust', 'Trust'),
+    ('metadata', 'Metadata'),
+    ('page_quality', 'Page Quality & Needs Met'),
+]
+CATEGORY_KEYS = [key for key, _ in CATEGORIES]
+CATEGORY_NAMES = dict(CATEGORIES)
+PRIORITY_LEVELS = ['High', 'Medium', 'Low']
+
+_CATEGORY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'score': {'type': 'integer', 'minimum': 1, 'maximum': 10},
+        'problems': {'type': 'array', 'items': {'type': 'string'}},
+        'fixes': {'type': 'array', 'items': {'type': 'string'}},
+    },
+    'required': ['score', 'problems', 'fixes'],
+    'additionalProperties': False,
+}
+
+# A report is a plain dict of this shape:
+#   {<category key>: {'score': int, 'problems': [str], 'fixes': [str]}, ...,
+#    'priorities': [{'level': 'High'|'Medium'|'Low', 'category': <category key>, 'fix': str}]}
+EVALUATION_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        **{key: _CATEGORY_SCHEMA for key in CATEGORY_KEYS},
+        'priorities': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'level': {'type': 'string', 'enum': PRIORITY_LEVELS},
+                    'category': {'type': 'string', 'enum': CATEGORY_KEYS},
+                    'fix': {'type': 'string'},
+                },
+                'required': ['level', 'category', 'fix'],
+                'additionalProperties': False,
+            },
+        },
+    },
+    'required': CATEGORY_KEYS + ['priorities'],
+    'additionalProperties': False,
+}
+
+# Function-calling tool that forces the model to answer in the schema
+EVALUATION_TOOL = {
+    'type': 'function',
+    'function': {
+        'name': 'submit_evaluation',
+        'description': 'Submit the complete evaluation: every category with score, problems and fixes, plus the prioritized fixes.',
+        'parameters': EVALUATION_SCHEMA,
+    },
+}
+EVALUATION_TOOL_CHOICE = {'type': 'function', 'function': {'name': 'submit_evaluation'}}
+
+STRUCTURED_INSTRUCTIONS = """
+Submit the evaluation with the submit_evaluation function instead of writing markdown.
+"""
+
+
+def string_list(value):
+    """A list of non-empty stripped strings from a string or list"""
+    if isinstance(value, str):
+        value = [value]
+    return [str(item).strip() for item in value or [] if str(item).strip()]
+
+
+def parse_report(arguments):
+    """Validate and normalize a report from the model's JSON arguments"""
+    data = json.loads(arguments) if isinstance(arguments, str) else dict(arguments)
+    report = {}
+    for key in CATEGORY_KEYS:
+        category = data.get(key)
+        if not isinstance(category, dict):
+            raise ValueError(f"Structured evaluation is missing category '{key}'")
+        report[key] = {
+            'score': min(10, max(1, int(category.get('score', 1)))),
+            'problems': string_list(category.get('problems')),
+            'fixes': string_list(category.get('fixes')),
+        }
+
+    report['priorities'] = []
+    for priority in data.get('priorities') or []:
+        level = str(priority.get('level', '')).capitalize()
+        report['priorities'].append({
+            'level': level if level in PRIORITY_LEVELS else 'Medium',
+            'category': priority.get('category') if priority.get('category') in CATEGORY_NAMES else '',
+            'fix': str(priority.get('fix', '')).strip(),
+        })
+    return report
+
+
+def overall_score(report):
+    """Mean of the category scores"""
+    return round(sum(report[key]['score'] for key in CATEGORY_KEYS) / len(CATEGORY_KEYS), 1)
+
+
+def render_markdown(report):
+    """Markdown for the UI and the downloadable report, in the rubric's layout"""
+    lines = []
+    for number, (key, name) in enumerate(CATEGORIES, 1):
+        category = report[key]
+        lines.append(f"### {number}. {name} (Score: {category['score']}/10)")
+        lines.append("")
+        lines.append("**Problems:**")
+        lines.extend(f"- {problem}" for problem in category['problems'] or ["None identified."])
+        lines.append("")
+        lines.append("**Fixes:**")
+        lines.extend(f"- {fix}" for fix in category['fixes'] or ["None needed."])
+        lines.append("")
+        lines.append("---")
+        lines.append("")
+
+    lines.append("### Priorities")
+    lines.append("")
+    for level in PRIORITY_LEVELS:
+        fixes = [priority for priority in report['priorities'] if priority['level'] == level]
+        if not fixes:
+            continue
+        lines.append(f"**{level}:**")
+        for priority in fixes:
+            label = CATEGORY_NAMES.get(priority['category'])
+            lines.append(f"- {priority['fix']}" + (f" *({label})*" if label else ""))
+        lines.append("")
+    lines.append(f"**Overall score:** {overall_score(report)}/10")
+    return '\n'.join(lines)
+
+
+def report_to_row(report):
+    """Flat, query-friendly columns for a report: one score per category plus priority counts"""
+    row = {f'{key}_score': report[key]['score'] for key in CATEGORY_KEYS}
+    row['overall_score'] = overall_score(report)
+    for level in PRIORITY_LEVELS:
+        row[f'{level.lower()}_priorities'] = sum(1 for priority in report['priorities'] if priority['level'] == level)
+    return row
+
+
+CATEGORY_HEADING = re.compile(r'^#+\s*(\d)\.\s*(.+)$', re.M)
+SCORE = re.compile(r'Score(?:\s*\(?1\s*[–-]\s*10\)?)?\W*(\d{1,2})\b(?!\s*[–-])', re.I)
+
+
+def parse_scores(markdown):
+    """{category key: score} scraped from a free-form markdown report (best effort)"""
+    scores = {}
+    headings = list(CATEGORY_HEADING.finditer(markdown))
+    for heading, following in zip(headings, headings[1:] + [None]):
+        number = int(heading.group(1))
+        section = markdown[heading.end():following.start() if following else len(markdown)]
+        # Skip "Score 1–10" style ranges; the first real score after the heading wins
+        match = SCORE.search(heading.group(2) + section)
+        if 1 <= number <= len(CATEGORIES) and match and 1 <= int(match.group(1)) <= 10:
+            scores[CATEGORY_KEYS[number - 1]] = int(match.group(1))
+    return scores
+
+
+PRIORITIES_HEADING = re.compile(r'^#+\s*\**\s*Priorit', re.M | re.I)
+PRIORITY_LINE = re.compile(r'^[\s#*_]*(High|Medium|Low)\b(?:\s+priority)?[*_]*\s*[:\-–—]?[*_]*\s*(.*)$', re.I)
+BULLET = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s+(.*\S)')
+
+
+def parse_priorities(markdown):
+    """[{'level', 'category', 'fix'}] scraped from a free-form report's Priorities section (best effort).
+
+    Handles fixes listed under High/Medium/Low labels or subheadings as well
+    as "- **High**: fix" bullets. The category isn't known here and is None.
+    """
+    headings = list(PRIORITIES_HEADING.finditer(markdown))
+    if not headings:
+        return []
+    priorities = []
+    level = None
+    for line in markdown[headings[-1].end():].splitlines()[1:]:
+        bullet = BULLET.match(line)
+        labeled = PRIORITY_LINE.match(bullet.group(1) if bullet else line)
+        if labeled:
+            level = labeled.group(1).capitalize()
+            fix = labeled.group(2).strip(' *_')
+        elif line.startswith('#'):
+            # The next section (an overall summary, say) ends the list
+            break
+        else:
+            fix = bullet.group(1).strip() if bullet and level else ''
+        if fix:
+            priorities.append({'level': level, 'category': None, 'fix': fix})
+    return priorities
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from storage import data_path, sqlite_connection
+from eval_cache import normalize_content
+
+# Per-URL baseline of the last evaluated content, for incremental re-audits
+AUDIT_PATH = os.getenv('SITE_AUDIT_PATH', data_path('site_audit.sqlite3'))
+# Share of word shingles that must change before a page is re-evaluated
+AUDIT_CHANGE_THRESHOLD = float(os.getenv('SITE_AUDIT_CHANGE_THRESHOLD', '0.1'))
+SHINGLE_WORDS = 3
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def content_digest(text):
+    """Exact fingerprint of the normalized text"""
+    return hashlib.sha256(normalize_content(text).encode('utf-8')).hexdigest()
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Set of overlapping word n-grams of the lowercased text"""
+    words = WORD_PATTERN.findall(text.lower())
+    return {' '.join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def change_ratio(old, new):
+    """1 - Jaccard resemblance of the two texts' shingle sets (0.0 identical, 1.0 disjoint)"""
+    old_shingles, new_shingles = shingles(old), shingles(new)
+    union = len(old_shingles | new_shingles)
+    return 1 - len(old_shingles & new_shingles) / union if union else 0.0
+
+
+class SiteAudit:
+    """SQLite store of each URL's last evaluated content and evaluation result.
+
+    The baseline is only replaced when a page is re-evaluated, so a run of
+    small edits is still caught once it adds up to a material change.
+    """
+
+    def __init__(self, path=AUDIT_PATH, change_threshold=AUDIT_CHANGE_THRESHOLD):
+        self.path = path
+        self.change_threshold = change_threshold
+
+        with sqlite_connection(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    config TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    evaluated_at REAL NOT NULL,
+                    checked_at REAL NOT NULL
+                )
+            """)
+
+    def check(self, url, content, config):
+        """(status, change, stored result) for content at url.
+
+        status is 'new', 'changed' or 'unchanged' and change the share of
+        shingles that differ from the baseline. A page evaluated under a
+        different config (model, prompt or output format) counts as changed.
+        """
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(
+                "SELECT digest, content, config, result FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return 'new', None, None
+        if row[2] != config:
+            return 'changed', None, None
+        change = 0.0 if row[0] == content_digest(content) else change_ratio(row[1], content)
+        if change > self.change_threshold:
+            return 'changed', change, None
+        return 'unchanged', change, json.loads(row[3])
+
+    def save(self, url, content, config, result):
+        """Make content and its evaluation result the new baseline for url"""
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, content_digest(content), content, config, json.dumps(result), now, now)
+            )
+
+    def touch(self, url):
+        """Record that url was checked and found unchanged"""
+        with sqlite_connection(self.path) as conn:
+            conn.execute("UPDATE pages SET checked_at = ? WHERE url = ?", (time.time(), url))
+
+    def clear(self):
+        with sqlite_connection(self.path) as conn:
+            conn.execute("DELETE FROM pages")
+
+
+_default_audit = None
+_default_audit_lock = threading.Lock()
+
+
+def get_site_audit():
+    """Process-wide site audit store"""
+    global _default_audit
+    with _default_audit_lock:
+        if _default_audit is None:
+            _default_audit = SiteAudit()
+        return _default_audit
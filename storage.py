@@ -0,0 +1,28 @@
+import contextlib
+import os
+import sqlite3
+
+# Default location for the local SQLite stores (caches, job tables, history)
+DATA_DIR = os.getenv('DATA_DIR', '.cache')
+
+
+def data_path(filename):
+    """Path of a store file inside DATA_DIR"""
+    return os.path.join(DATA_DIR, filename)
+
+
+@contextlib.contextmanager
+def sqlite_connection(path):
+    """Open a short-lived SQLite connection that commits on success and always closes.
+
+    A connection per operation keeps the stores safe to use from worker threads.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
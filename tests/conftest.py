@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# The stores (caches, crawl checkpoints, history) go to a throwaway directory,
+# and the modules under test are imported from the repository root
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='content-evaluator-tests-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,183 @@
+import itertools
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import batch
+from extraction import extract_page
+from history import get_history
+from report import CATEGORY_KEYS
+
+# Each test evaluates its own URLs, so cached evaluations from one test never answer another
+run_ids = itertools.count()
+
+
+class FakeClient:
+    """The files and batches endpoints of the OpenAI client, answering each request
+    line with respond(custom_id, body, attempt): a response body, or an error string"""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.files = SimpleNamespace(create=self.create_file, content=self.file_content)
+        self.batches = SimpleNamespace(create=self.create_batch, retrieve=self.retrieve_batch)
+        self.stored = {}
+        self.runs = {}
+        self.submitted = []
+
+    def create_file(self, file, purpose):
+        file_id = f'file-{len(self.stored)}'
+        self.stored[file_id] = file.read().decode('utf-8')
+        return SimpleNamespace(id=file_id)
+
+    def file_content(self, file_id):
+        return SimpleNamespace(text=self.stored[file_id])
+
+    def create_batch(self, input_file_id, **options):
+        lines = [json.loads(line) for line in self.stored[input_file_id].splitlines()]
+        self.submitted.append([line['custom_id'] for line in lines])
+        output = []
+        for line in lines:
+            attempt = sum(line['custom_id'] in ids for ids in self.submitted)
+            outcome = self.respond(line['custom_id'], line['body'], attempt)
+            if isinstance(outcome, str):
+                output.append({'custom_id': line['custom_id'], 'response': {'status_code': 500, 'body': {}},
+                               'error': {'message': outcome}})
+            else:
+                output.append({'custom_id': line['custom_id'], 'response': {'status_code': 200, 'body': outcome}})
+        output_id = f'file-{len(self.stored)}'
+        self.stored[output_id] = ''.join(json.dumps(entry) + '\n' for entry in output)
+        batch_id = f'batch-{len(self.runs)}'
+        self.runs[batch_id] = SimpleNamespace(id=batch_id, status='completed', output_file_id=output_id,
+                                              error_file_id=None, errors=None)
+        return self.runs[batch_id]
+
+    def retrieve_batch(self, batch_id):
+        return self.runs[batch_id]
+
+
+def completion(content, prompt_tokens=100, completion_tokens=20):
+    return {
+        'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': int(time.time()), 'model': batch.MODEL,
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+        'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                  'total_tokens': prompt_tokens + completion_tokens},
+    }
+
+
+def tool_call(report):
+    """A structured evaluation response carrying report as its tool call arguments"""
+    body = completion(None)
+    body['choices'][0]['message']['tool_calls'] = [{
+        'id': 'call-test', 'type': 'function',
+        'function': {'name': 'submit_evaluation', 'arguments': json.dumps(report)},
+    }]
+    return body
+
+
+def echo_title(custom_id, body, attempt):
+    """An evaluation naming the page it was asked about"""
+    title = next(line for line in body['messages'][-1]['content'].splitlines() if 'Page number' in line)
+    return completion(f"Evaluation of {title.strip()}")
+
+
+def pages(count):
+    run = next(run_ids)
+    return [f'https://example.com/run-{run}/page-{index}' for index in range(count)]
+
+
+def extract(url):
+    number = url.rsplit('-', 1)[1]
+    html = (f"<html><head><title>Page number {number}</title></head><body><main><h1>Page number {number}</h1>"
+            f"<p>Text written for page number {number} of the batch tests, long enough to evaluate.</p>"
+            f"</main></body></html>")
+    return extract_page(html.encode('utf-8'), url)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch, 'BATCH_DIR', str(tmp_path))
+
+    def install(respond):
+        fake = FakeClient(respond)
+        monkeypatch.setattr(batch, 'get_client', lambda: fake)
+        return fake
+    return install
+
+
+def run(urls, structured=False):
+    return {row['url']: row for row in batch.run_batch_evaluation(urls, extract, structured=structured, poll_seconds=0)}
+
+
+def test_split_batches_keeps_within_request_and_byte_limits(monkeypatch):
+    jobs = {f'page-{index}': {'body': {'text': 'x' * 100}} for index in range(10)}
+    monkeypatch.setattr(batch, 'BATCH_MAX_REQUESTS', 4)
+    assert [len(lines) for lines in batch.split_batches(jobs)] == [4, 4, 2]
+
+    monkeypatch.setattr(batch, 'BATCH_MAX_REQUESTS', 50000)
+    line_size = len(next(batch.split_batches({'page-0': jobs['page-0']}))[0])
+    monkeypatch.setattr(batch, 'BATCH_MAX_BYTES', line_size * 3)
+    files = list(batch.split_batches(jobs))
+    assert [len(lines) for lines in files] == [3, 3, 3, 1]
+    assert all(sum(len(line) for line in lines) <= line_size * 3 for lines in files)
+    assert [json.loads(line)['custom_id'] for lines in files for line in lines] == list(jobs)
+
+
+def test_results_map_back_to_their_pages(client):
+    fake = client(echo_title)
+    urls = pages(5)
+    rows = run(urls)
+    assert list(rows) == urls
+    for index, url in enumerate(urls):
+        row = rows[url]
+        assert row['status'] == 'ok'
+        assert row['evaluation'].endswith(f"Page number {index}")
+        assert (row['prompt_tokens'], row['completion_tokens']) == (100, 20)
+        assert get_history().get(row['history_id'])['url'] == url
+    assert len(fake.submitted) == 1
+
+    # A second run is answered from the evaluation cache without a batch
+    rows = run(urls)
+    assert all(row['cache_hit'] for row in rows.values())
+    assert len(fake.submitted) == 1
+
+
+def test_failed_requests_are_resubmitted(client):
+    fake = client(lambda custom_id, body, attempt: "Server error" if attempt == 1 and custom_id == 'page-1'
+                  else echo_title(custom_id, body, attempt))
+    urls = pages(3)
+    rows = run(urls)
+    assert all(row['status'] == 'ok' for row in rows.values())
+    assert fake.submitted == [['page-0', 'page-1', 'page-2'], ['page-1']]
+
+
+def test_attempts_stop_at_the_limit(client, monkeypatch):
+    monkeypatch.setattr(batch, 'BATCH_MAX_ATTEMPTS', 2)
+    fake = client(lambda custom_id, body, attempt: "Server error" if custom_id == 'page-0'
+                  else echo_title(custom_id, body, attempt))
+    urls = pages(2)
+    rows = run(urls)
+    assert rows[urls[0]]['status'] == 'error'
+    assert rows[urls[0]]['error'] == 'Server error'
+    assert rows[urls[1]]['status'] == 'ok'
+    assert fake.submitted == [['page-0', 'page-1'], ['page-0']]
+
+
+def test_empty_response_is_retried_without_counting_its_usage(client):
+    client(lambda custom_id, body, attempt: completion('') if attempt == 1 else echo_title(custom_id, body, attempt))
+    urls = pages(1)
+    row = run(urls)[urls[0]]
+    assert row['status'] == 'ok'
+    assert row['evaluation'].endswith("Page number 0")
+    assert (row['prompt_tokens'], row['completion_tokens']) == (100, 20)
+
+
+def test_unparsed_structured_response_is_retried_without_counting_its_usage(client):
+    report = {key: {'score': 7, 'problems': ['Thin'], 'fixes': ['Expand']} for key in CATEGORY_KEYS}
+    client(lambda custom_id, body, attempt: completion('Not a tool call') if attempt == 1 else tool_call(report))
+    urls = pages(1)
+    row = run(urls, structured=True)[urls[0]]
+    assert row['status'] == 'ok'
+    assert row['report'][CATEGORY_KEYS[0]]['score'] == 7
+    assert (row['prompt_tokens'], row['completion_tokens']) == (100, 20)
@@ -0,0 +1,162 @@
+import functools
+import http.server
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pytest
+
+from crawler import Crawler, CrawlCheckpoint, normalize_url
+from evaluator import extract_content_from_url
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures', 'site')
+
+
+class SiteHandler(http.server.SimpleHTTPRequestHandler):
+    """Static files with {origin} filled into robots.txt and sitemaps; logs the paths requested"""
+
+    def do_GET(self):
+        self.server.requested.append(self.path)
+        if self.path.endswith(('.txt', '.xml')):
+            path = self.translate_path(self.path)
+            if not os.path.isfile(path):
+                return self.send_error(404)
+            with open(path, encoding='utf-8') as f:
+                body = f.read().replace('{origin}', f"http://{self.headers['Host']}").encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain' if self.path.endswith('.txt') else 'application/xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    """Start a local server for a directory; returns (base URL, list of requested paths)"""
+    servers = []
+
+    def start(directory):
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(SiteHandler, directory=directory))
+        server.requested = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}", server.requested
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def expected_paths():
+    with open(os.path.join(FIXTURE_DIR, 'expected.txt'), encoding='utf-8') as f:
+        return set(f.read().split())
+
+
+def paths(pages):
+    return [urlsplit(page['url']).path for page in pages]
+
+
+def write_site(directory, pages):
+    for name, html in pages.items():
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            f.write(html)
+
+
+def page(title, canonical=None, links=()):
+    head = f'<link rel="canonical" href="{canonical}">' if canonical else ''
+    body = ''.join(f'<a href="{link}">{link}</a> ' for link in links)
+    return (f"<html><head><title>{title}</title>{head}</head><body><main><h1>{title}</h1>"
+            f"<p>Some text about {title} for the crawler tests.</p>{body}</main></body></html>")
+
+
+def test_normalize_url():
+    assert normalize_url('HTTP://Example.COM:80/a?b=2&utm_source=x&a=1#top') == 'http://example.com/a?a=1&b=2'
+    assert normalize_url('https://example.com') == 'https://example.com/'
+
+
+def test_fixture_site_finds_every_page_once(serve):
+    base, requested = serve(FIXTURE_DIR)
+    crawler = Crawler(base + '/', extract_content_from_url, workers=4)
+    found = paths(crawler.crawl())
+    assert sorted(found) == sorted(expected_paths())
+    # robots.txt disallows /private/; the print copy of an article names the article as canonical
+    assert not [path for path in requested if path.startswith('/private/')]
+    assert '/print/second.html' not in found
+    assert (crawler.stats['blocked'], crawler.stats['duplicates']) == (1, 1)
+
+
+def test_resume_continues_from_the_checkpoint(serve):
+    base, requested = serve(FIXTURE_DIR)
+    checkpoint = CrawlCheckpoint('resume-test')
+    first = paths(Crawler(base + '/', extract_content_from_url, max_pages=4, workers=2, checkpoint=checkpoint).crawl())
+    assert len(first) == 4
+    second = paths(Crawler(base + '/', extract_content_from_url, workers=2, resume=True, checkpoint=checkpoint).crawl())
+    assert set(first) | set(second) == expected_paths()
+    assert not set(first) & set(second)
+    pages_requested = [path for path in requested if not path.endswith(('.txt', '.xml'))]
+    assert len(pages_requested) == len(set(pages_requested))
+
+
+def test_per_host_limit_caps_concurrent_fetches(serve, tmp_path):
+    # An empty site: robots.txt is missing (everything allowed) and pages come from the fake extractor
+    base, _ = serve(str(tmp_path))
+    lock = threading.Lock()
+    running = {'now': 0, 'max': 0}
+
+    def extract(url):
+        index = int(urlsplit(url).path.split('-')[1].split('.')[0])
+        with lock:
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+        time.sleep(0.03)
+        with lock:
+            running['now'] -= 1
+        links = [f"{base}/page-{child}.html" for child in (2 * index + 1, 2 * index + 2) if child < 30]
+        return {'url': url, 'links': links}
+
+    crawler = Crawler(base + '/page-0.html', extract, max_pages=30, max_depth=30, workers=8, host_concurrency=2)
+    assert len(list(crawler.crawl())) == 30
+    assert running['max'] == 2
+
+
+def test_mutual_canonicals_crawl_one_of_the_pair(serve, tmp_path):
+    write_site(str(tmp_path), {
+        'index.html': page('Home', links=['/a.html', '/b.html']),
+        'a.html': page('Pair', canonical='/b.html'),
+        'b.html': page('Pair', canonical='/a.html'),
+    })
+    base, _ = serve(str(tmp_path))
+    crawler = Crawler(base + '/', extract_content_from_url, workers=4)
+    found = paths(crawler.crawl())
+    assert '/' in found
+    assert len([path for path in found if path in ('/a.html', '/b.html')]) == 1
+    assert crawler.stats['duplicates'] == 1
+
+
+def test_alias_found_first_waits_for_its_canonical_url(serve, tmp_path):
+    write_site(str(tmp_path), {
+        'index.html': page('Home', links=['/copy.html', '/original.html']),
+        'copy.html': page('Original', canonical='/original.html'),
+        'original.html': page('Original', canonical='/original.html'),
+    })
+    base, _ = serve(str(tmp_path))
+    crawler = Crawler(base + '/', extract_content_from_url, workers=1)
+    assert sorted(paths(crawler.crawl())) == ['/', '/original.html']
+
+
+def test_alias_stands_in_for_a_canonical_url_that_fails(serve, tmp_path):
+    write_site(str(tmp_path), {
+        'index.html': page('Home', links=['/copy.html', '/missing.html']),
+        'copy.html': page('Copy', canonical='/missing.html'),
+    })
+    base, _ = serve(str(tmp_path))
+    crawler = Crawler(base + '/', extract_content_from_url, workers=1)
+    assert sorted(paths(crawler.crawl())) == ['/', '/copy.html']
+    assert crawler.stats['errors'] == 1
@@ -0,0 +1,100 @@
+import gzip
+import http.server
+import threading
+import time
+
+import pytest
+
+from http_cache import BoundedBody, ResponseCache, conditional_headers, create_session
+
+
+class DripHandler(http.server.BaseHTTPRequestHandler):
+    """/fast sends a page at once; /gzip sends it compressed; /length, /close and /chunked
+    send one byte every 0.2s for a minute, with a Content-Length, until the connection
+    closes, or chunked"""
+
+    protocol_version = 'HTTP/1.1'
+    body = b'<html><body><p>' + b'x' * 5000 + b'</p></body></html>'
+
+    def do_GET(self):
+        if self.path in ('/fast', '/gzip'):
+            body = gzip.compress(self.body) if self.path == '/gzip' else self.body
+            self.send_response(200)
+            if self.path == '/gzip':
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.send_response(200)
+        if self.path == '/length':
+            self.send_header('Content-Length', '300')
+        elif self.path == '/chunked':
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        try:
+            for _ in range(300):
+                self.wfile.write(b'1\r\nx\r\n' if self.path == '/chunked' else b'x')
+                self.wfile.flush()
+                time.sleep(0.2)
+        except OSError:
+            # The client gave up, as it should
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def base():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), DripHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def read(url, **limits):
+    with create_session().get(url, timeout=10, stream=True) as response:
+        body = BoundedBody(response, **limits)
+        return b''.join(body), body
+
+
+@pytest.mark.parametrize('path', ['/length', '/close', '/chunked'])
+def test_slow_body_stops_at_the_deadline(base, path):
+    start = time.monotonic()
+    data, body = read(base + path, deadline=1.0)
+    assert time.monotonic() - start < 2.5
+    assert body.truncated == 'time'
+    assert 0 < len(data) < 300
+
+
+@pytest.mark.parametrize('path', ['/fast', '/gzip'])
+def test_whole_body_within_the_limits(base, path):
+    data, body = read(base + path, deadline=5.0)
+    assert data == DripHandler.body
+    assert body.truncated is None
+    assert body.bytes_read == len(DripHandler.body)
+
+
+def test_size_cap_counts_decoded_bytes(base):
+    data, body = read(base + '/gzip', max_bytes=1000)
+    assert len(data) == 1000
+    assert body.truncated == 'size'
+
+
+def test_response_cache_round_trip(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'http.sqlite3'), max_entries=2)
+    cache.put('https://example.com/none', None, None, {'title': 'no validators'})
+    assert cache.get('https://example.com/none') is None
+    for index in range(3):
+        cache.put(f'https://example.com/{index}', f'"v{index}"', None, {'title': index})
+        time.sleep(0.01)
+    assert cache.get('https://example.com/0') is None
+    entry = cache.get('https://example.com/2')
+    assert entry['data'] == {'title': 2}
+    assert conditional_headers(entry) == {'If-None-Match': '"v2"'}
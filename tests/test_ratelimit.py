@@ -0,0 +1,236 @@
+import gc
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import ratelimit
+from ratelimit import RateLimiter, _Bucket, parse_duration
+
+
+class FakeAPIError(Exception):
+    """Shaped like openai's APIStatusError: a status, the response headers and an error code"""
+
+    def __init__(self, status_code, headers=None, code=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+        self.code = code
+
+
+class APIConnectionError(Exception):
+    """Retried by name, like openai's connection errors"""
+
+
+def raw(value='ok', headers=None):
+    """A with_raw_response result"""
+    return SimpleNamespace(headers=headers or {}, parse=lambda: value)
+
+
+def responses(*outcomes):
+    """A call function returning or raising each outcome in turn; counts its calls"""
+    outcomes = list(outcomes)
+
+    def fn():
+        fn.calls += 1
+        outcome = outcomes.pop(0) if len(outcomes) > 1 else outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    fn.calls = 0
+    return fn
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(ratelimit, 'BACKOFF_BASE_SECONDS', 0.01)
+
+
+def test_parse_duration():
+    assert parse_duration('6m0s') == 360
+    assert parse_duration('1.5s') == 1.5
+    assert parse_duration('20ms') == pytest.approx(0.02)
+    assert parse_duration('2') == 2
+    assert parse_duration('') is None
+    assert parse_duration('soon') is None
+
+
+def test_bucket_without_capacity_never_waits():
+    bucket = _Bucket(0)
+    bucket.take(10 ** 6)
+    assert bucket.wait_time(10 ** 6, time.monotonic()) == 0.0
+
+
+def test_bucket_refills_over_a_minute():
+    bucket = _Bucket(60)
+    now = time.monotonic()
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0, abs=0.01)
+    assert bucket.wait_time(1, now + 1.0) == 0.0
+
+
+def test_oversized_request_waits_for_a_full_bucket():
+    bucket = _Bucket(100)
+    now = time.monotonic()
+    bucket.take(100)
+    assert bucket.wait_time(500, now) == pytest.approx(60.0, abs=0.01)
+
+
+def test_headers_sync_the_buckets():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    headers = {
+        'x-ratelimit-limit-requests': '100', 'x-ratelimit-remaining-requests': '5',
+        'x-ratelimit-limit-tokens': '40000', 'x-ratelimit-remaining-tokens': '1200',
+    }
+    assert limiter.call(responses(raw(headers=headers))) == 'ok'
+    stats = limiter.stats()
+    assert stats['remaining_requests'] == 5
+    assert stats['remaining_tokens'] == 1200
+
+
+def test_exhausted_request_budget_delays_the_next_call():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    # The server reports 60 a minute with none left: the next call waits about a second for the refill
+    limiter.call(responses(raw(headers={'x-ratelimit-limit-requests': '60', 'x-ratelimit-remaining-requests': '0'})))
+    timings = {}
+    limiter.call(responses(raw()), timings=timings)
+    assert 0.8 < timings['queue'] < 2.0
+
+
+def test_concurrency_never_exceeds_the_limit():
+    limiter = RateLimiter(rpm=0, tpm=0, max_concurrency=2)
+    lock = threading.Lock()
+    running = {'now': 0, 'max': 0}
+
+    def fn():
+        with lock:
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+        time.sleep(0.05)
+        with lock:
+            running['now'] -= 1
+        return raw()
+
+    threads = [threading.Thread(target=limiter.call, args=(fn,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert running['max'] == 2
+    assert limiter.stats()['in_flight'] == 0
+
+
+def test_429_halves_concurrency_and_successes_grow_it_back():
+    limiter = RateLimiter(rpm=0, tpm=0, max_concurrency=8)
+    fn = responses(FakeAPIError(429, {'retry-after-ms': '10'}), raw())
+    assert limiter.call(fn) == 'ok'
+    stats = limiter.stats()
+    assert fn.calls == 2
+    assert (stats['retries'], stats['rate_limited']) == (1, 1)
+    assert stats['concurrency_limit'] == 4
+    # Additive increase: about one slot per window of successes at the current limit
+    for _ in range(4):
+        limiter.call(responses(raw()))
+    assert limiter.stats()['concurrency_limit'] == 5
+
+
+def test_concurrency_never_drops_below_one():
+    limiter = RateLimiter(rpm=0, tpm=0, max_concurrency=2, max_retries=3)
+    with pytest.raises(FakeAPIError):
+        limiter.call(responses(FakeAPIError(429, {'retry-after-ms': '1'})))
+    assert limiter.stats()['concurrency_limit'] == 1
+
+
+def test_retry_after_pauses_every_caller():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    timings = {}
+    limiter.call(responses(FakeAPIError(429, {'retry-after': '0.3'}), raw()), timings=timings)
+    assert timings['queue'] >= 0.3
+    # Another caller arriving during the pause waits for it too
+    limiter._retry_delay(FakeAPIError(429, {'retry-after': '0.3'}), 0)
+    timings = {}
+    limiter.call(responses(raw()), timings=timings)
+    assert timings['queue'] >= 0.25
+
+
+def test_retry_after_gets_bounded_jitter():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    delays = [limiter._retry_delay(FakeAPIError(503, {'retry-after': '2'}), 0) for _ in range(200)]
+    assert all(2 <= delay <= 2 * 1.25 + 0.1 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_backoff_is_full_jitter_exponential():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    for attempt in range(4):
+        cap = ratelimit.BACKOFF_BASE_SECONDS * 2 ** attempt
+        delays = [limiter._retry_delay(FakeAPIError(503), attempt) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert max(delays) > cap / 2
+
+
+def test_429_without_retry_after_uses_the_reset_header():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    delay = limiter._retry_delay(FakeAPIError(429, {'x-ratelimit-reset-requests': '1.5s'}), 0)
+    assert 1.5 <= delay <= 1.5 * 1.25 + 0.1
+
+
+def test_transient_errors_retry_up_to_the_limit():
+    limiter = RateLimiter(rpm=0, tpm=0, max_retries=2)
+    fn = responses(FakeAPIError(503))
+    with pytest.raises(FakeAPIError):
+        limiter.call(fn)
+    assert fn.calls == 3
+    stats = limiter.stats()
+    assert (stats['retries'], stats['errors'], stats['in_flight']) == (2, 1, 0)
+
+
+def test_connection_errors_are_retried():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    fn = responses(APIConnectionError("reset"), raw())
+    assert limiter.call(fn) == 'ok'
+    assert fn.calls == 2
+
+
+@pytest.mark.parametrize('error', [FakeAPIError(400), FakeAPIError(429, code='insufficient_quota'), ValueError("bad")])
+def test_permanent_errors_are_not_retried(error):
+    limiter = RateLimiter(rpm=0, tpm=0)
+    fn = responses(error)
+    with pytest.raises(type(error)):
+        limiter.call(fn)
+    assert fn.calls == 1
+    assert limiter.stats()['in_flight'] == 0
+
+
+def test_stream_holds_its_slot_until_read():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    stream = limiter.call(responses(raw(iter(['a', 'b']))), stream=True)
+    assert limiter.stats()['in_flight'] == 1
+    assert list(stream) == ['a', 'b']
+    assert limiter.stats()['in_flight'] == 0
+
+
+def test_unread_stream_releases_its_slot_when_closed_or_dropped():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    stream = limiter.call(responses(raw(iter(['a']))), stream=True)
+    stream.close()
+    stream.close()
+    assert limiter.stats()['in_flight'] == 0
+
+    stream = limiter.call(responses(raw(iter(['a']))), stream=True)
+    del stream
+    gc.collect()
+    assert limiter.stats()['in_flight'] == 0
+
+
+def test_stream_error_releases_its_slot():
+    def chunks():
+        yield 'a'
+        raise ConnectionError("dropped")
+
+    limiter = RateLimiter(rpm=0, tpm=0)
+    stream = limiter.call(responses(raw(chunks())), stream=True)
+    with pytest.raises(ConnectionError):
+        list(stream)
+    assert limiter.stats()['in_flight'] == 0
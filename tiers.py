@@ -0,0 +1,145 @@
+import json
+import os
+
+from prompts import COMPACT_GUIDELINES
+
+# Fast tier: a cheap model triages every page before the premium model sees it
+FAST_MODEL = os.getenv('FAST_MODEL', 'gpt-4o-mini')
+FAST_MAX_TOKENS = int(os.getenv('FAST_MAX_TOKENS', '400'))
+# Triage reads at most this much of the page; the opening sections decide most verdicts
+TRIAGE_CONTENT_TOKENS = int(os.getenv('TRIAGE_CONTENT_TOKENS', '3000'))
+# Triage scores in this band (inclusive) are too uncertain to trust and get the full evaluation
+ESCALATE_MIN_SCORE = int(os.getenv('ESCALATE_MIN_SCORE', '4'))
+ESCALATE_MAX_SCORE = int(os.getenv('ESCALATE_MAX_SCORE', '7'))
+# YMYL pages (health, money, safety) always get the premium model
+ESCALATE_YMYL = os.getenv('ESCALATE_YMYL', 'true').lower() in ('1', 'true', 'yes')
+
+# USD per million (input, output) tokens, matched by longest model-name prefix;
+# provider-cached input tokens are billed at half the input price
+MODEL_PRICES = {
+    'gpt-4': (30.0, 60.0),
+    'gpt-4-32k': (60.0, 120.0),
+    'gpt-4-turbo': (10.0, 30.0),
+    'gpt-4o': (2.5, 10.0),
+    'gpt-4o-mini': (0.15, 0.6),
+    'gpt-4.1': (2.0, 8.0),
+    'gpt-4.1-mini': (0.4, 1.6),
+    'gpt-4.1-nano': (0.1, 0.4),
+    'gpt-3.5-turbo': (0.5, 1.5),
+}
+CACHED_INPUT_DISCOUNT = 0.5
+
+TRIAGE_PROMPT = COMPACT_GUIDELINES + """
+You are doing a quick first-pass triage, not the full evaluation. Judge the page as a
+whole and submit it with the submit_triage function:
+- score: overall page quality from 1 (lowest) to 10 (highest) under the guidelines above
+- ymyl: true if the topic could affect health, financial stability, safety or society welfare
+- page_type: a few words, such as "recipe", "product page", "news article", "thin affiliate page"
+- verdict: one sentence explaining the score
+- problems: up to 3 of the most important problems
+"""
+
+TRIAGE_TOOL = {
+    'type': 'function',
+    'function': {
+        'name': 'submit_triage',
+        'description': 'Submit the first-pass triage of the page.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'score': {'type': 'integer', 'minimum': 1, 'maximum': 10},
+                'ymyl': {'type': 'boolean'},
+                'page_type': {'type': 'string'},
+                'verdict': {'type': 'string'},
+                'problems': {'type': 'array', 'items': {'type': 'string'}, 'maxItems': 3},
+            },
+            'required': ['score', 'ymyl', 'page_type', 'verdict', 'problems'],
+            'additionalProperties': False,
+        },
+    },
+}
+
+
+def parse_triage(arguments):
+    """Validate and normalize a triage from the model's JSON arguments"""
+    data = json.loads(arguments) if isinstance(arguments, str) else dict(arguments)
+    if 'score' not in data:
+        raise ValueError("Triage is missing a score")
+    problems = data.get('problems') or []
+    return {
+        'score': min(10, max(1, int(data['score']))),
+        'ymyl': bool(data.get('ymyl')),
+        'page_type': str(data.get('page_type', '')).strip(),
+        'verdict': str(data.get('verdict', '')).strip(),
+        'problems': [str(problem).strip() for problem in (problems if isinstance(problems, list) else [problems])][:3],
+    }
+
+
+def escalation_reason(triage):
+    """Why a triaged page needs the premium model, or None if the triage can stand"""
+    if ESCALATE_YMYL and triage['ymyl']:
+        return 'ymyl'
+    if ESCALATE_MIN_SCORE <= triage['score'] <= ESCALATE_MAX_SCORE:
+        return 'uncertain'
+    return None
+
+
+def cascade_config():
+    """Everything about the fast tier that shapes a cascade result, as one string"""
+    return f"{FAST_MODEL}:{ESCALATE_MIN_SCORE}-{ESCALATE_MAX_SCORE}:{'ymyl' if ESCALATE_YMYL else ''}"
+
+
+def render_triage(triage, model):
+    """Markdown for a page the triage settled without the full evaluation"""
+    lines = [
+        f"## Quick Triage ({model})",
+        "",
+        f"**Overall score:** {triage['score']}/10 · **Page type:** {triage['page_type'] or 'unknown'} · "
+        f"**YMYL:** {'yes' if triage['ymyl'] else 'no'}",
+        "",
+        f"**Verdict:** {triage['verdict']}",
+    ]
+    if triage['problems']:
+        lines.append("")
+        lines.append("**Main problems:**")
+        lines.extend(f"- {problem}" for problem in triage['problems'])
+    lines.append("")
+    lines.append(f"*Not escalated to the full evaluation: the score is outside the uncertain band "
+                 f"{ESCALATE_MIN_SCORE}–{ESCALATE_MAX_SCORE}.*")
+    return '\n'.join(lines)
+
+
+def estimate_cost(model, usage):
+    """Estimated USD cost of usage on model, or None for models without a known price"""
+    matches = [prefix for prefix in MODEL_PRICES if model.startswith(prefix)]
+    if not matches:
+        return None
+    input_price, output_price = MODEL_PRICES[max(matches, key=len)]
+    uncached = usage['prompt_tokens'] - usage['cached_tokens']
+    cost = (uncached + usage['cached_tokens'] * CACHED_INPUT_DISCOUNT) * input_price + usage['completion_tokens'] * output_price
+    return round(cost / 1_000_000, 6)
+
+
+def tier_entry(model, usage, latency_seconds):
+    """Per-tier accounting for one page: model, usage, latency and estimated cost"""
+    return {'model': model, 'usage': usage, 'latency_seconds': latency_seconds, 'cost_usd': estimate_cost(model, usage)}
+
+
+def tier_summary(rows):
+    """Per-tier totals over bulk rows: pages, mean latency, tokens, cost and escalation rate"""
+    summary = {}
+    for row in rows:
+        for tier, entry in (row.get('tiers') or {}).items():
+            totals = summary.setdefault(tier, {'tier': tier, 'model': entry['model'], 'pages': 0, 'latency_seconds': 0.0,
+                                               'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0})
+            totals['pages'] += 1
+            totals['latency_seconds'] += entry['latency_seconds']
+            totals['prompt_tokens'] += entry['usage']['prompt_tokens']
+            totals['completion_tokens'] += entry['usage']['completion_tokens']
+            totals['cost_usd'] += entry['cost_usd'] or 0.0
+    triaged = summary.get('fast', {}).get('pages', 0)
+    for totals in summary.values():
+        totals['mean_latency_seconds'] = round(totals.pop('latency_seconds') / totals['pages'], 2)
+        totals['cost_usd'] = round(totals['cost_usd'], 4)
+        totals['share_of_triaged'] = round(totals['pages'] / triaged, 3) if triaged else None
+    return list(summary.values())